@@ -1,18 +1,21 @@
 # Rockbuzz Pay – GigFlow
 # Calculadora de custos de um show e emissão de contratos pequenos
 # -------------------------------------------------------------------------------
+import time
+_inicio = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from io import BytesIO
-import json
+from datetime import datetime
 import uuid
 
-# --- PDF (ReportLab)
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from gigflow import assets, catalog, geo, history_io, pdf, pricing, sensitivity, startup, tracing, versions
+from gigflow.pricing import default_rows
+from gigflow.render_queue import ERRO, NA_FILA, FilaCheia, FilaPDF
+from gigflow.store import COLUNAS_TABELA, ORDENACOES, HistoryStore
+from gigflow.utils import brl
+
+_fim_imports = time.perf_counter()
 
 st.set_page_config(
     page_title="Rockbuzz Gigflow | Calculadora de Custos e Emissão de Contratos",
@@ -20,6 +23,16 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Instrumentação das fases do rerun (gigflow/tracing.py): ROCKBUZZ_PERFIL=1 ou ?perfil=1,
+# conferido a cada execução; só as medições (o Rastro) ficam na sessão entre execuções
+if tracing.ativo(st.query_params):
+    if "rastro" not in st.session_state:
+        st.session_state.rastro = tracing.Rastro()
+    rastro = st.session_state.rastro
+else:
+    rastro = tracing.DESLIGADO
+rastro.abrir("rerun")
+
 # =========================
 # CSS Customizado
 # =========================
@@ -101,40 +114,21 @@ st.markdown("""
 # =========================
 # Helpers & Defaults
 # =========================
-def brl(x: float) -> str:
-    """Formata valor em Real Brasileiro"""
-    try:
-        return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
-        return "R$ 0,00"
-
-def default_rows():
-    """Retorna template padrão de itens do orçamento"""
-    return [
-        {"Item": "1. Músicos",              "Descrição": "Pagamento músicos",                                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "2. Ajudantes/Staff",      "Descrição": "Pagamento de ajudantes (roadies)",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "3. Transporte",           "Descrição": "Aluguel/combustível de carros próprios",           "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "4. Pedágio",              "Descrição": "Custos com pedágios (ida e volta)",                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "5. Combustível",          "Descrição": "Estimativa ida/volta (média 13 km/L)",             "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "6. Alimentação",          "Descrição": "Refeição completa para equipe",                    "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "7. Hospedagem",           "Descrição": "Caso haja necessidade de pernoite",                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "8. Som/Luz Kiko",         "Descrição": "PA até 100 pessoas + Monitoramento + Luz",         "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "9. PA Guilherme",         "Descrição": "PA para eventos acima de 100 pessoas",             "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "10. Estrutura Evento",    "Descrição": "Palco, som, luz, telão, treliças",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "11. Técnico de Som",      "Descrição": "Palco/FOH",                                        "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-        {"Item": "12. Outros Custos",       "Descrição": "Equipamentos extras, imprevistos",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
-    ]
-
 def ensure_state():
     """Inicializa estado da sessão com valores padrão"""
+    # Valores calculados (DataFrame, datas) ficam em lambdas: só rodam para chaves ausentes
     defaults = {
-        "df": pd.DataFrame(default_rows()),
-        "history": [],
+        "df": lambda: pd.DataFrame(default_rows()),
         "margem_pct": 30.0,
         "nome_evento": "",
-        "data_evento": datetime.today().date(),
+        "data_evento": lambda: datetime.today().date(),
         "cidade": "",
-        "numero_proposta": datetime.now().strftime("RB-%Y%m%d-%H%M"),
+        "desl_veiculos": 2,
+        "desl_consumo": 13.0,
+        "desl_preco_litro": 6.00,
+        "desl_pedagio_km": 0.12,
+        "desl_custo_km": 0.40,
+        "numero_proposta": lambda: datetime.now().strftime("RB-%Y%m%d-%H%M"),
         "validade_dias": 7,
         "forma_pagto": "50% na assinatura + 50% no dia do evento",
         "observacoes": "",
@@ -166,77 +160,124 @@ def ensure_state():
     }
     for key, value in defaults.items():
         if key not in st.session_state:
-            st.session_state[key] = value
-
-ensure_state()
+            st.session_state[key] = value() if callable(value) else value
+
+@st.cache_resource
+def get_store():
+    """Histórico persistente, compartilhado por todas as sessões do servidor"""
+    return HistoryStore()
+
+@st.cache_resource
+def get_fila():
+    """Fila de geração de PDFs, compartilhada por todas as sessões do servidor"""
+    return FilaPDF()
+
+@st.cache_resource
+def get_catalogo():
+    """Catálogo de preços de fornecedores, indexado uma vez por processo (recarrega sozinho quando o arquivo muda)"""
+    return catalog.Catalogo()
+
+with rastro.fase("estado"):
+    ensure_state()
+    store = get_store()
+    fila = get_fila()
+    catalogo = get_catalogo()
+_fim_estado = time.perf_counter()
 
 # =========================
 # Sidebar – Configurações
 # =========================
+# Cada grupo é um formulário: as alterações só disparam um rerun ao clicar em
+# "Aplicar", em vez de um rerun da página inteira a cada campo editado.
 with st.sidebar:
     try:
-        st.image("LOGO DEFINITIVO FUNDO ESCURO.png", use_column_width=True)
+        st.image(assets.logo_sidebar(), use_column_width=True)
     except Exception:
         st.markdown("### Rockbuzz GigFlow")
     
     st.markdown("---")
+    st.caption("As alterações de cada grupo valem ao clicar em **Aplicar**.")
     
-    with st.expander("Parâmetros Gerais", expanded=True):
+    with st.expander("Parâmetros Gerais", expanded=True), st.form("form_parametros", border=False):
         margem_pct = st.number_input("Margem de Lucro (%)", min_value=0.0, max_value=200.0, step=5.0, key="margem_pct")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Dados do Evento", expanded=True):
+    with st.expander("Dados do Evento", expanded=True), st.form("form_evento", border=False):
         nome_evento = st.text_input("Evento/Cliente", placeholder="Ex: Festa Corporativa XYZ", key="nome_evento")
         data_evento = st.date_input("Data do evento", key="data_evento")
         cidade = st.text_input("Cidade/Local", placeholder="Ex: Jundiaí/SP", key="cidade")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Informações do Orçamento", expanded=False):
+    with st.expander("Deslocamento", expanded=False), st.form("form_deslocamento", border=False):
+        st.number_input("Veículos", min_value=1, step=1, key="desl_veiculos")
+        st.number_input("Consumo (km/L)", min_value=1.0, step=0.5, key="desl_consumo")
+        st.number_input("Preço do combustível (R$/L)", min_value=0.0, step=0.10, format="%.2f", key="desl_preco_litro")
+        st.number_input("Pedágio (R$/km)", min_value=0.0, step=0.01, format="%.2f", key="desl_pedagio_km")
+        st.number_input("Desgaste/aluguel do veículo (R$/km)", min_value=0.0, step=0.05, format="%.2f", key="desl_custo_km")
+        st.form_submit_button("Aplicar", use_container_width=True)
+    
+    with st.expander("Informações do Orçamento", expanded=False), st.form("form_orcamento", border=False):
         numero_proposta = st.text_input("Nº da Proposta", key="numero_proposta")
         validade_dias = st.number_input("Validade (dias)", min_value=1, max_value=90, step=1, key="validade_dias")
         forma_pagto = st.text_input("Condições de Pagamento", key="forma_pagto")
         observacoes = st.text_area("Observações", height=100, key="observacoes")
         enviado = st.checkbox("Marcar como ENVIADO", key="enviado")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Dados do Contratante", expanded=False):
+    with st.expander("Dados do Contratante", expanded=False), st.form("form_contratante", border=False):
         contratante_nome = st.text_input("Nome/Razão Social", key="contratante_nome")
         contratante_doc = st.text_input("CNPJ/CPF", key="contratante_doc")
         contratante_email = st.text_input("E-mail", key="contratante_email")
         contratante_tel = st.text_input("Telefone", key="contratante_tel")
         contratante_end = st.text_area("Endereço", height=80, key="contratante_end")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Dados da Banda", expanded=False):
+    with st.expander("Dados da Banda", expanded=False), st.form("form_banda", border=False):
         banda_razao = st.text_input("Razão Social", key="banda_razao")
         banda_cnpj = st.text_input("CNPJ", key="banda_cnpj")
         banda_resp_legal = st.text_input("Representante Legal", key="banda_resp_legal")
         banda_resp_banda = st.text_input("Responsável pela Banda", key="banda_resp_banda")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Detalhes do Evento", expanded=False):
+    with st.expander("Detalhes do Evento", expanded=False), st.form("form_detalhes", border=False):
         num_convidados = st.number_input("Número de Convidados", min_value=0, step=10, key="num_convidados")
         hora_montagem = st.text_input("Horário de Montagem", placeholder="Ex: 18:00", key="hora_montagem")
         hora_show = st.text_input("Horário do Show", placeholder="Ex: 21:00", key="hora_show")
         local_apresentacao = st.text_input("Local de Apresentação", key="local_apresentacao")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Equipamentos e Responsabilidades", expanded=False):
+    with st.expander("Equipamentos e Responsabilidades", expanded=False), st.form("form_responsabilidades", border=False):
         resp_banda = st.text_area("Responsabilidade da Banda", height=80, key="resp_banda")
         resp_contratante = st.text_area("Responsabilidade da Contratante", height=80, key="resp_contratante")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Composição da Equipe", expanded=False):
+    with st.expander("Composição da Equipe", expanded=False), st.form("form_equipe", border=False):
         num_integrantes = st.number_input("Integrantes", min_value=0, key="num_integrantes")
         num_apoio = st.number_input("Equipe de Apoio", min_value=0, key="num_apoio")
         num_acomp = st.number_input("Acompanhantes", min_value=0, key="num_acomp")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Requisitos de Energia (NBR 5410)", expanded=False):
+    with st.expander("Requisitos de Energia (NBR 5410)", expanded=False), st.form("form_energia", border=False):
         energia_tomada = st.text_input("Tomada", key="energia_tomada")
         energia_tensao = st.text_input("Tensão", key="energia_tensao")
         energia_aterramento = st.text_input("Aterramento", key="energia_aterramento")
         energia_dist_max = st.text_input("Distância máx. do palco", key="energia_dist_max")
+        st.form_submit_button("Aplicar", use_container_width=True)
     
-    with st.expander("Cláusulas Contratuais", expanded=False):
+    with st.expander("Cláusulas Contratuais", expanded=False), st.form("form_clausulas", border=False):
         multa_perc = st.number_input("Multa por descumprimento (%)", min_value=0, max_value=100, key="multa_perc")
         foro = st.text_input("Foro", key="foro")
+        st.form_submit_button("Aplicar", use_container_width=True)
 
 # =========================
 # Conteúdo Principal
 # =========================
+# A página é dividida em fragmentos que rodam de forma independente: editar a
+# tabela só recalcula o editor e o resumo; gerar um PDF só reexecuta a seção de
+# documentos (o render roda na fila em segundo plano, gigflow/render_queue.py, e
+# só o indicador de andamento é reexecutado até os bytes ficarem prontos);
+# filtrar, paginar ou salvar só reexecuta o histórico. O estado que
+# passa de um para outro (o cálculo atual) fica no st.session_state.
 st.title("🎸 Rockbuzz Pay")
 st.markdown("**Calculadora de Cachê e Gerador de Contratos Profissionais**")
 st.markdown("---")
@@ -244,7 +285,7 @@ st.markdown("---")
 # Instruções
 with st.expander("ℹ️ Como usar", expanded=False):
     st.markdown("""
-    1. **Configure os parâmetros** na barra lateral (margem de lucro, dados do evento, etc.)
+    1. **Configure os parâmetros** na barra lateral (margem de lucro, dados do evento, etc.) e clique em **Aplicar**
     2. **Edite a tabela abaixo** com as quantidades e valores dos itens
     3. **Marque "Incluir"** nos itens que devem ser considerados no cálculo
     4. **Visualize o resumo** com os valores calculados automaticamente
@@ -252,474 +293,643 @@ with st.expander("ℹ️ Como usar", expanded=False):
     6. **Salve no histórico** para consultas futuras
     """)
 
-st.subheader("💼 Itens do Orçamento")
-st.caption("Adicione, remova ou edite os itens conforme necessário. Marque 'Incluir' para considerar no cálculo.")
-
-# Editor de itens
-edited_df = st.data_editor(
-    st.session_state.df,
-    num_rows="dynamic",
-    use_container_width=True,
-    column_order=["Item", "Descrição", "Quantidade", "Custo Unitário (R$)", "Incluir"],
-    column_config={
-        "Item": st.column_config.TextColumn("Item", width="small"),
-        "Descrição": st.column_config.TextColumn("Descrição", width="large"),
-        "Quantidade": st.column_config.NumberColumn("Qtd", format="%.0f", step=1.0, min_value=0.0, width="small"),
-        "Custo Unitário (R$)": st.column_config.NumberColumn("Valor Unit.", format="R$ %.2f", step=50.0, min_value=0.0, width="medium"),
-        "Incluir": st.column_config.CheckboxColumn("Incluir", width="small"),
-    },
-    hide_index=True,
-)
-
 # =========================
-# Cálculos com tratamento de NaN
+# Registro da proposta
 # =========================
-df_calc = edited_df.copy()
-df_calc["Quantidade"] = pd.to_numeric(df_calc["Quantidade"], errors="coerce").fillna(0)
-df_calc["Custo Unitário (R$)"] = pd.to_numeric(df_calc["Custo Unitário (R$)"], errors="coerce").fillna(0)
-df_calc["Incluir"] = df_calc["Incluir"].fillna(False).astype(bool)
-df_calc["Total (R$)"] = df_calc["Quantidade"] * df_calc["Custo Unitário (R$)"]
-df_calc["Total (R$)"] = df_calc["Total (R$)"].where(df_calc["Incluir"], 0.0)
-
-custo_total = float(df_calc["Total (R$)"].sum())
-margem_valor = custo_total * (st.session_state.margem_pct / 100.0)
-cache_proposto = custo_total + margem_valor
-data_validade = datetime.today().date() + timedelta(days=int(st.session_state.validade_dias))
+# campo -> valor a partir do session_state (os derivados do cálculo vêm de st.session_state.calculo)
+CAMPOS_REGISTRO = {
+    "numero_proposta": lambda ss: ss.numero_proposta,
+    "enviado": lambda ss: ss.enviado,
+    "evento": lambda ss: ss.nome_evento,
+    "data_evento": lambda ss: str(ss.data_evento),
+    "cidade": lambda ss: ss.cidade,
+    "custo_total": lambda ss: ss.calculo[1].em_reais()[0],
+    "margem_pct": lambda ss: float(ss.margem_pct),
+    "cache_proposto": lambda ss: ss.calculo[1].em_reais()[2],
+    "validade_dias": lambda ss: int(ss.validade_dias),
+    "validade_ate": lambda ss: str(ss.calculo[1].data_validade),
+    "cond_pagto": lambda ss: ss.forma_pagto,
+    "observacoes": lambda ss: ss.observacoes,
+    "contratante": lambda ss: {
+        "nome": ss.contratante_nome,
+        "doc": ss.contratante_doc,
+        "email": ss.contratante_email,
+        "tel": ss.contratante_tel,
+        "end": ss.contratante_end
+    },
+    "banda": lambda ss: {
+        "razao": ss.banda_razao,
+        "cnpj": ss.banda_cnpj,
+        "resp_legal": ss.banda_resp_legal,
+        "resp_banda": ss.banda_resp_banda
+    },
+    "evento_info": lambda ss: {
+        "num_convidados": ss.num_convidados,
+        "hora_montagem": ss.hora_montagem,
+        "hora_show": ss.hora_show,
+        "local_apresentacao": ss.local_apresentacao
+    },
+    "responsabilidades": lambda ss: {
+        "banda": ss.resp_banda,
+        "contratante": ss.resp_contratante
+    },
+    "equipe": lambda ss: {
+        "integrantes": ss.num_integrantes,
+        "apoio": ss.num_apoio,
+        "acompanhantes": ss.num_acomp
+    },
+    "energia": lambda ss: {
+        "tomada": ss.energia_tomada,
+        "tensao": ss.energia_tensao,
+        "aterramento": ss.energia_aterramento,
+        "dist_max": ss.energia_dist_max
+    },
+    "multa_perc": lambda ss: ss.multa_perc,
+    "foro": lambda ss: ss.foro,
+    "itens": lambda ss: ss.calculo[0].to_dict(orient="records"),
+}
 
-# =========================
-# Resumo Financeiro
-# =========================
-st.markdown("---")
-st.subheader("💰 Resumo Financeiro")
-
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    st.metric("Custo Total", brl(custo_total))
-with col2:
-    st.metric("Margem de Lucro", brl(margem_valor), f"{st.session_state.margem_pct:.0f}%")
-with col3:
-    st.metric("Cachê Proposto", brl(cache_proposto))
-with col4:
-    st.metric("Validade", f"{st.session_state.validade_dias} dias", f"até {data_validade.strftime('%d/%m/%Y')}")
-
-# Informações adicionais
-info_cols = st.columns(3)
-with info_cols[0]:
-    st.info(f"**Evento:** {st.session_state.nome_evento or 'Não informado'}")
-with info_cols[1]:
-    st.info(f"**Data:** {st.session_state.data_evento.strftime('%d/%m/%Y')}")
-with info_cols[2]:
-    st.info(f"**Local:** {st.session_state.cidade or 'Não informado'}")
+def campos_registro(campos):
+    """Só os `campos` pedidos do registro, sem montar o resto"""
+    return {campo: CAMPOS_REGISTRO[campo](st.session_state) for campo in campos}
+
+def make_record():
+    return {
+        "id": str(uuid.uuid4()),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        **campos_registro(CAMPOS_REGISTRO),
+    }
+
+TIPOS_PDF = ("orcamento", "contrato")
+
+def invalidar_documentos():
+    """Descarta PDFs liberados para download que não batem mais com os dados atuais
+
+    Retorna True se algum foi descartado (a seção de documentos precisa ser redesenhada).
+    """
+    gerados = [tipo for tipo in TIPOS_PDF if st.session_state.get(f"pdf_{tipo}_chave")]
+    if not gerados:
+        return False
+    # só os campos que entram nos documentos liberados, não o registro inteiro
+    campos = {campo for tipo in gerados for campo in (pdf.CAMPOS_ORCAMENTO if tipo == "orcamento" else pdf.CAMPOS_CONTRATO)}
+    rec = campos_registro(campos)
+    desatualizados = [tipo for tipo in gerados if st.session_state[f"pdf_{tipo}_chave"] != pdf.chave_documento(tipo, rec)]
+    for tipo in desatualizados:
+        del st.session_state[f"pdf_{tipo}_chave"]
+    return bool(desatualizados)
 
 # =========================
-# Geração de PDFs
+# Itens, cálculos e resumo (fragmento)
 # =========================
-def _pdf_doc_setup():
-    doc_kwargs = dict(pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
-    small = ParagraphStyle(name="small", parent=styles["Normal"], fontSize=9, leading=11)
-    small_bold = ParagraphStyle(name="small_bold", parent=styles["Normal"], fontSize=9, leading=11, fontName="Helvetica-Bold")
-    title_style = ParagraphStyle(name="title", parent=styles["Title"], fontSize=18, leading=22, textColor=colors.HexColor("#FF4B4B"))
-    return doc_kwargs, small, small_bold, title_style
-
-def gerar_pdf_orcamento(df, custo_total, margem_valor, cache_proposto):
-    buffer = BytesIO()
-    doc_kwargs, small, small_bold, title_style = _pdf_doc_setup()
-    doc = SimpleDocTemplate(buffer, **doc_kwargs)
-
-    elementos = []
-    elementos.append(Paragraph("<b>Rockbuzz Pay – Orçamento</b>", title_style))
-    elementos.append(Spacer(1, 6))
-    
-    status_text = "ENVIADO" if st.session_state.enviado else "RASCUNHO"
-    topo = (
-        f"<b>No Proposta:</b> {st.session_state.numero_proposta} &nbsp;&nbsp; "
-        f"<b>Status:</b> {status_text}<br/>"
-        f"<b>Evento:</b> {st.session_state.nome_evento or '-'} &nbsp;&nbsp; "
-        f"<b>Data:</b> {st.session_state.data_evento.strftime('%d/%m/%Y')} &nbsp;&nbsp; "
-        f"<b>Cidade:</b> {st.session_state.cidade or '-'}<br/>"
-        f"<b>Validade:</b> {st.session_state.validade_dias} dia(s) (ate {data_validade.strftime('%d/%m/%Y')})"
+def deslocamento_atual():
+    ss = st.session_state
+    return geo.estimar(ss.cidade, ss.desl_veiculos, ss.desl_consumo, ss.desl_preco_litro, ss.desl_pedagio_km, ss.desl_custo_km)
+
+def preencher_deslocamento(desl):
+    """Atualiza as linhas de deslocamento da tabela (callback: roda antes do editor ser criado)"""
+    df_calc, _ = st.session_state.calculo
+    st.session_state.df = geo.preencher(df_calc.drop(columns=["Total (R$)"]), desl)
+
+def preencher_precos():
+    """Aplica os preços do catálogo (faixa pelo número de convidados) à tabela (callback)"""
+    df_calc, _ = st.session_state.calculo
+    st.session_state.df = catalog.preencher(
+        df_calc.drop(columns=["Total (R$)"]), catalogo, st.session_state.num_convidados, st.session_state.data_evento,
     )
-    elementos.append(Paragraph(topo, small))
-    elementos.append(Spacer(1, 10))
-
-    dados = [[
-        Paragraph("<b>Item</b>", small_bold),
-        Paragraph("<b>Descrição</b>", small_bold),
-        Paragraph("<b>Qtd</b>", small_bold),
-        Paragraph("<b>Valor Unit.</b>", small_bold),
-        Paragraph("<b>Total</b>", small_bold),
-    ]]
-    
-    for _, row in df[df["Incluir"]].iterrows():
-        dados.append([
-            Paragraph(str(row["Item"]), small),
-            Paragraph(str(row["Descrição"]), small),
-            Paragraph(f"{row['Quantidade']:.0f}", small),
-            Paragraph(brl(row["Custo Unitário (R$)"]), small),
-            Paragraph(brl(row["Total (R$)"]), small),
-        ])
-    
-    dados += [
-        ["", "", "", Paragraph("<b>Custo Total</b>", small_bold), Paragraph(brl(custo_total), small_bold)],
-        ["", "", "", Paragraph("<b>Margem de Lucro ({:.0f}%)</b>".format(st.session_state.margem_pct), small_bold), Paragraph(brl(margem_valor), small_bold)],
-        ["", "", "", Paragraph("<b>Cache Proposto</b>", small_bold), Paragraph(brl(cache_proposto), small_bold)],
-    ]
-
-    col_widths = [60, 210, 40, 90, 90]
-    tabela = Table(dados, colWidths=col_widths, repeatRows=1)
-    tabela.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FF4B4B")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-        ("ALIGN", (2, 1), (-1, -1), "CENTER"),
-        ("ALIGN", (1, 1), (1, -1), "LEFT"),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.gray),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -4), [colors.whitesmoke, colors.white]),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    elementos += [tabela, Spacer(1, 12)]
-
-    elementos.append(Paragraph(f"<b>Condicoes de Pagamento:</b> {st.session_state.forma_pagto or '-'}", small))
-    if st.session_state.observacoes:
-        elementos.append(Spacer(1, 6))
-        elementos.append(Paragraph(f"<b>Observacoes:</b> {st.session_state.observacoes}", small))
-    
-    elementos.append(Spacer(1, 20))
-    elementos.append(Paragraph("<i>Desenvolvido por Aditivo Media</i>", small))
-
-    doc.build(elementos)
-    buffer.seek(0)
-    return buffer
-
-def gerar_pdf_contrato():
-    buffer = BytesIO()
-    doc_kwargs, small, small_bold, title_style = _pdf_doc_setup()
-    doc = SimpleDocTemplate(buffer, **doc_kwargs)
-
-    elementos = []
-    elementos.append(Paragraph("<b>Contrato de Prestação de Serviços Musicais</b>", title_style))
-    elementos.append(Spacer(1, 8))
-
-    partes = (
-        f"<b>CONTRATANTE:</b> {st.session_state.contratante_nome or '-'} - CPF/CNPJ: {st.session_state.contratante_doc or '-'}<br/>"
-        f"Endereco: {st.session_state.contratante_end or '-'}<br/>"
-        f"E-mail: {st.session_state.contratante_email or '-'} - Telefone: {st.session_state.contratante_tel or '-'}<br/><br/>"
-        f"<b>CONTRATADA:</b> {st.session_state.banda_razao} - CNPJ: {st.session_state.banda_cnpj}<br/>"
-        f"Representante Legal: {st.session_state.banda_resp_legal or '-'}<br/>"
-        f"Responsavel pela Banda: {st.session_state.banda_resp_banda or '-'}"
-    )
-    elementos.append(Paragraph(partes, small))
-    elementos.append(Spacer(1, 10))
-
-    info_evento = (
-        f"<b>INFORMACOES DO EVENTO</b><br/>"
-        f"Data: {st.session_state.data_evento.strftime('%d/%m/%Y')} | Local: {st.session_state.cidade or '-'} | No Convidados: {st.session_state.num_convidados}<br/>"
-        f"Horario Montagem: {st.session_state.hora_montagem or '-'} | Horario Show: {st.session_state.hora_show or '-'}<br/>"
-        f"Local de Apresentacao: {st.session_state.local_apresentacao or '-'}"
-    )
-    elementos.append(Paragraph(info_evento, small))
-    elementos.append(Spacer(1, 8))
-
-    elementos.append(Paragraph("<b>EQUIPAMENTOS E RESPONSABILIDADES</b>", small_bold))
-    elementos.append(Paragraph(f"<b>Responsabilidade da Banda:</b> {st.session_state.resp_banda}", small))
-    elementos.append(Paragraph(f"<b>Responsabilidade da Contratante:</b> {st.session_state.resp_contratante}", small))
-    elementos.append(Spacer(1, 8))
 
-    equipe = (
-        f"<b>COMPOSICAO DA EQUIPE:</b> Integrantes: {st.session_state.num_integrantes} | "
-        f"Apoio: {st.session_state.num_apoio} | Acompanhantes: {st.session_state.num_acomp}"
+def incluir_do_catalogo(preco):
+    """Aplica um preço escolhido na busca do catálogo à tabela (callback)"""
+    df_calc, _ = st.session_state.calculo
+    st.session_state.df = catalog.incluir_preco(df_calc.drop(columns=["Total (R$)"]), preco)
+    st.session_state.catalogo_busca = ""
+
+def catalogo_de_precos():
+    """Preenchimento e busca de preços de fornecedores (índice em memória: gigflow/catalog.py)"""
+    catalogo.recarregar()
+    if catalogo.erro:
+        st.caption(f"📒 Catálogo de fornecedores com erro, usando a última versão lida: {catalogo.erro}")
+    if not len(catalogo):
+        return
+    convidados = st.session_state.num_convidados
+    st.button(
+        f"💲 Preencher preços do catálogo ({f'{convidados} convidados' if convidados else 'público não informado'})",
+        on_click=preencher_precos, key="preencher_precos",
+        help="Custo unitário e descrição dos fornecedores para as linhas da tabela; a faixa de PA/estrutura "
+             "vem do Número de Convidados (Detalhes do Evento)",
     )
-    elementos.append(Paragraph(equipe, small))
-    elementos.append(Spacer(1, 10))
-
-    elementos.append(Paragraph("<b>CLAUSULAS CONTRATUAIS</b>", small_bold))
-    elementos.append(Spacer(1, 4))
-    
-    clausulas = [
-        f"<b>1a.</b> Valor total do servico: <b>{brl(cache_proposto)}</b> - Pagamento: {st.session_state.forma_pagto or '-'}.",
-        "<b>2a.</b> Despesas de transporte: responsabilidade da Contratada.",
-        "<b>3a.</b> Alimentacao de banda e equipe: responsabilidade da Contratante.",
-        "<b>4a.</b> Alteracao de data: deve ser comunicada por escrito ao responsavel indicado.",
-        "<b>5a.</b> O responsavel que assina pela Contratante e fiador solidario.",
-        "<b>6a.</b> A Contratante responde por danos aos equipamentos ou integrantes por problemas no local.",
-        (f"<b>7a.</b> Energia eletrica conforme NBR 5410: tomada {st.session_state.energia_tomada}, {st.session_state.energia_tensao}, "
-         f"aterramento {st.session_state.energia_aterramento}; distancia maxima do palco: {st.session_state.energia_dist_max}."),
-        f"<b>8a.</b> Multa por descumprimento: {st.session_state.multa_perc}% do valor total.",
-        f"<b>9a.</b> Foro: {st.session_state.foro}.",
-    ]
-    
-    for c in clausulas:
-        elementos.append(Paragraph(c, small))
-        elementos.append(Spacer(1, 3))
-    
-    elementos.append(Spacer(1, 15))
-
-    assinatura_tbl = Table(
-        [
-            [Paragraph(f"<b>Contratante:</b><br/><br/>{st.session_state.contratante_nome or '________________________________'}<br/>{st.session_state.contratante_doc or ''}", small),
-             Paragraph(f"<b>Banda RockBuzz / {st.session_state.banda_razao}:</b><br/><br/>{st.session_state.banda_resp_banda or '________________________________'}", small)]
-        ],
-        colWidths=[240, 240]
+    busca = st.text_input(
+        "📒 Buscar no catálogo de fornecedores", placeholder="Item, fornecedor ou descrição (ex.: pa, kiko, palco)",
+        key="catalogo_busca",
     )
-    assinatura_tbl.setStyle(TableStyle([
-        ("LINEABOVE", (0, 0), (0, 0), 1, colors.black),
-        ("LINEABOVE", (1, 0), (1, 0), 1, colors.black),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-    ]))
-    elementos.append(assinatura_tbl)
-    
-    elementos.append(Spacer(1, 15))
-    elementos.append(Paragraph("<i>Desenvolvido por Aditivo Media</i>", small))
-
-    doc.build(elementos)
-    buffer.seek(0)
-    return buffer
-
-# Botões de download
-st.markdown("---")
-st.subheader("📥 Gerar Documentos")
+    if busca.strip():
+        precos = catalogo.buscar(busca, convidados, st.session_state.data_evento)
+        if not precos:
+            st.caption("Nenhum preço vigente no catálogo para essa busca.")
+        for i, preco in enumerate(precos):
+            st.button(f"➕ {preco.rotulo}", on_click=incluir_do_catalogo, args=(preco,), key=f"catalogo_preco_{i}", help=preco.descricao)
+
+@st.fragment
+@rastro.medir("fragmento_editor")
+def editor_e_resumo():
+    st.subheader("💼 Itens do Orçamento")
+    st.caption("Adicione, remova ou edite os itens conforme necessário. Marque 'Incluir' para considerar no cálculo.")
+
+    # Transporte, pedágio e combustível estimados pela cidade (índice offline: gigflow/geo.py)
+    if st.session_state.cidade.strip():
+        desl = deslocamento_atual()
+        if desl is None:
+            st.caption(f"📍 \"{st.session_state.cidade}\" não está no índice de cidades: preencha o deslocamento manualmente.")
+        else:
+            st.button(
+                f"🚐 Preencher deslocamento: {desl.origem.rotulo} → {desl.destino.rotulo} ({desl.km:.0f} km)",
+                on_click=preencher_deslocamento, args=(desl,), key="preencher_deslocamento",
+                help="Estimativa por veículo, ida e volta, com os parâmetros de Deslocamento da barra lateral",
+            )
+
+    with rastro.fase("catalogo"):
+        catalogo_de_precos()
+
+    # Editor de itens
+    with rastro.fase("data_editor"):
+        edited_df = st.data_editor(
+            st.session_state.df,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_order=["Item", "Descrição", "Quantidade", "Custo Unitário (R$)", "Incluir"],
+            column_config={
+                "Item": st.column_config.TextColumn("Item", width="small"),
+                "Descrição": st.column_config.TextColumn("Descrição", width="large"),
+                "Quantidade": st.column_config.NumberColumn("Qtd", format="%.0f", step=1.0, min_value=0.0, width="small"),
+                "Custo Unitário (R$)": st.column_config.NumberColumn("Valor Unit.", format="R$ %.2f", step=50.0, min_value=0.0, width="medium"),
+                "Incluir": st.column_config.CheckboxColumn("Incluir", width="small"),
+            },
+            hide_index=True,
+            key="editor_itens",
+        )
+
+    # Cálculos (motor em centavos: gigflow/pricing.py). A tabela base do editor
+    # fica fixa em st.session_state.df e o estado do widget traz as edições
+    # relativas a ela: só as linhas alteradas desde o último rerun são recalculadas
+    with rastro.fase("calculo"):
+        calc = st.session_state.get("calc_itens")
+        if calc is None or calc.base is not st.session_state.df:
+            calc = st.session_state.calc_itens = pricing.CalculoIncremental(st.session_state.df)
+        calc.aplicar(st.session_state.get("editor_itens"))
+        orcamento = calc.orcamento(st.session_state.margem_pct, st.session_state.validade_dias)
+        df_calc = calc.df_calc(edited_df)
+    st.session_state.calculo = (df_calc, orcamento)
+    # Um PDF já liberado com os valores antigos não pode continuar disponível na
+    # seção de documentos, que não reexecuta junto com este fragmento
+    if invalidar_documentos():
+        st.rerun()
+    custo_total, margem_valor, cache_proposto = orcamento.em_reais()
 
-col_btn1, col_btn2 = st.columns(2)
-with col_btn1:
-    pdf_orc = gerar_pdf_orcamento(df_calc, custo_total, margem_valor, cache_proposto)
-    st.download_button(
-        label="📄 Baixar PDF – Orçamento",
-        data=pdf_orc,
-        file_name=f"Rockbuzz_Orcamento_{numero_proposta}.pdf",
-        mime="application/pdf",
-        use_container_width=True,
+    # Resumo Financeiro
+    st.markdown("---")
+    st.subheader("💰 Resumo Financeiro")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Custo Total", brl(custo_total))
+    with col2:
+        st.metric("Margem de Lucro", brl(margem_valor), f"{st.session_state.margem_pct:.0f}%")
+    with col3:
+        st.metric("Cachê Proposto", brl(cache_proposto))
+    with col4:
+        st.metric("Validade", f"{st.session_state.validade_dias} dias", f"até {orcamento.data_validade.strftime('%d/%m/%Y')}")
+
+    # Informações adicionais
+    info_cols = st.columns(3)
+    with info_cols[0]:
+        st.info(f"**Evento:** {st.session_state.nome_evento or 'Não informado'}")
+    with info_cols[1]:
+        st.info(f"**Data:** {st.session_state.data_evento.strftime('%d/%m/%Y')}")
+    with info_cols[2]:
+        st.info(f"**Local:** {st.session_state.cidade or 'Não informado'}")
+
+    with rastro.fase("agenda"):
+        alerta_conflitos()
+
+    with rastro.fase("simulador"):
+        simulador(df_calc, orcamento)
+
+def alerta_conflitos():
+    """Avisa se a banda já tem proposta enviada no mesmo dia/horário (agenda indexada: gigflow/schedule.py)"""
+    conflitos = store.conflitos(
+        {"razao": st.session_state.banda_razao, "cnpj": st.session_state.banda_cnpj},
+        st.session_state.data_evento, st.session_state.hora_montagem, st.session_state.hora_show,
+        ignorar_numero=st.session_state.numero_proposta,
     )
-with col_btn2:
-    pdf_ctr = gerar_pdf_contrato()
+    if conflitos:
+        linhas = [
+            f"- **{r.numero_proposta or '-'}** · {r.evento or 'Sem nome'} · {r.cidade or '-'} · "
+            f"{r.inicio.strftime('%d/%m %H:%M')} – {r.fim.strftime('%d/%m %H:%M')}"
+            for r in conflitos
+        ]
+        st.warning("⚠️ Conflito de agenda: a banda já tem proposta enviada nesse horário\n" + "\n".join(linhas))
+
+def simulador(df_calc, orcamento):
+    """Cachê para uma grade de margens x cenários de itens (grade memorizada por tabela: gigflow/sensitivity.py)"""
+    with st.expander("🔍 Simulador de cenários (margem × itens)"):
+        nomes = df_calc["Item"].fillna("").astype(str).tolist()
+        variaveis = st.multiselect(
+            "Itens a variar", options=range(len(nomes)), format_func=lambda i: nomes[i],
+            max_selections=sensitivity.MAX_VARIAVEIS, key="sim_itens",
+            help="Cada cenário combina um fator para cada item escolhido (0 = retirar o item)",
+        )
+        fatores = st.multiselect(
+            "Fatores", options=sensitivity.FATORES, default=[0.0, 1.0], key="sim_fatores",
+            format_func=lambda f: "retirar" if f == 0 else f"×{f:g}".replace(".", ","),
+        )
+        col_faixa, col_alvo = st.columns(2)
+        faixa = col_faixa.slider("Faixa de margem (%)", 0, 100, (0, 60), key="sim_faixa")
+        alvo = col_alvo.number_input(
+            "Valor alvo / oferta do contratante (R$)", min_value=0.0, step=100.0, key="sim_alvo",
+            value=float(orcamento.cache_proposto) / 100,
+        )
+
+        itens_ok = [i for i in variaveis if i < len(nomes)]
+        grade = sensitivity.simular(orcamento.itens, itens_ok, sorted(set(fatores or [1.0])))
+        rotulos = [sensitivity.rotulo(nomes, itens_ok, linha) for linha in grade.fatores]
+        margem_atual = min(100, max(0, round(st.session_state.margem_pct)))
+        equilibrio = grade.margem_para(round(alvo * 100))
+
+        tabela = pd.DataFrame({
+            "Cenário": rotulos,
+            "Custo Total": grade.custo_total / 100,
+            f"Cachê ({margem_atual}%)": grade.cache_proposto[:, margem_atual] / 100,
+            "Margem p/ alvo (%)": equilibrio,
+        }).sort_values("Custo Total", kind="stable")
+        st.dataframe(
+            tabela, hide_index=True, use_container_width=True,
+            column_config={
+                "Custo Total": st.column_config.NumberColumn(format="R$ %.2f"),
+                f"Cachê ({margem_atual}%)": st.column_config.NumberColumn(format="R$ %.2f"),
+                "Margem p/ alvo (%)": st.column_config.NumberColumn(
+                    format="%.2f", help="Menor margem que atinge o valor alvo (negativa: o alvo não cobre o custo)"),
+            },
+        )
+
+        # curvas cachê x margem dos cenários mais baratos, com o alvo como referência
+        mostrar = tabela.index[:sensitivity.MAX_CURVAS]
+        inicio, fim = faixa
+        curvas = pd.DataFrame(
+            grade.cache_proposto[mostrar, inicio:fim + 1].T / 100,
+            index=pd.Index(grade.margens_pct[inicio:fim + 1], name="Margem (%)"),
+            columns=[rotulos[i] for i in mostrar],
+        )
+        curvas["Alvo"] = alvo
+        st.line_chart(curvas, y_label="Cachê (R$)")
+        if len(rotulos) > sensitivity.MAX_CURVAS:
+            st.caption(f"Gráfico com os {sensitivity.MAX_CURVAS} cenários de menor custo (de {len(rotulos)}).")
+
+editor_e_resumo()
+
+# =========================
+# Geração de PDFs (fragmento)
+# =========================
+def botao_pdf(tipo, icone, rotulo, arquivo, rec):
+    """Enfileira o PDF só quando solicitado e libera o download quando os bytes ficam prontos"""
+    chave = pdf.chave_documento(tipo, rec)
+    estado = f"pdf_{tipo}_chave"
+    clicado = st.session_state.get(estado) != chave
+    if clicado:
+        if not st.button(f"{icone} Gerar {rotulo}", key=f"gerar_{tipo}", use_container_width=True):
+            return
+        st.session_state[estado] = chave
+    trabalho = fila.situacao(chave)
+    if trabalho is None or (clicado and trabalho.estado == ERRO):
+        # ainda não enviado, já saiu do cache ou falhou numa tentativa anterior (erro já
+        # mostrado): a geração roda no pool, fora deste script
+        try:
+            with rastro.fase(f"pdf_{tipo}"):
+                trabalho = fila.enviar(tipo, rec, chave)
+        except FilaCheia:
+            del st.session_state[estado]
+            st.warning("⏳ Muitos documentos sendo gerados agora. Tente de novo em instantes.")
+            return
+    if trabalho.estado == ERRO:
+        del st.session_state[estado]
+        st.error(f"❌ Falha ao gerar o {rotulo}: {trabalho.erro}")
+        return
+    if trabalho.pendente:
+        aguardar_pdf(tipo, chave, icone, rotulo)
+        return
     st.download_button(
-        label="📝 Baixar PDF – Contrato",
-        data=pdf_ctr,
-        file_name=f"Rockbuzz_Contrato_{numero_proposta}.pdf",
+        label=f"{icone} Baixar {rotulo}",
+        data=trabalho.dados,
+        file_name=arquivo,
         mime="application/pdf",
         use_container_width=True,
     )
 
-# =========================
-# Histórico
-# =========================
-st.markdown("---")
-st.subheader("📜 Histórico de Propostas")
+@st.fragment(run_every=0.5)
+def aguardar_pdf(tipo, chave, icone, rotulo):
+    """Situação do PDF na fila; quando ele fica pronto (ou falha) a página é redesenhada com o download"""
+    trabalho = fila.situacao(chave)
+    if trabalho is None or not trabalho.pendente:
+        st.rerun()
+    if trabalho.estado == NA_FILA:
+        situacao = f"na fila ({fila.posicao(trabalho) + 1}º)"
+    else:
+        situacao = f"gerando… {trabalho.segundos:.1f} s"
+    st.button(f"{icone} {rotulo}: {situacao}", key=f"aguardando_{tipo}", disabled=True, use_container_width=True)
+
+@st.fragment
+@rastro.medir("fragmento_documentos")
+def documentos():
+    # Botões de download
+    st.markdown("---")
+    st.subheader("📥 Gerar Documentos")
 
-def make_record():
-    return {
-        "id": str(uuid.uuid4()),
-        "created_at": datetime.now().isoformat(timespec="seconds"),
-        "numero_proposta": st.session_state.numero_proposta,
-        "enviado": st.session_state.enviado,
-        "evento": st.session_state.nome_evento,
-        "data_evento": str(st.session_state.data_evento),
-        "cidade": st.session_state.cidade,
-        "custo_total": custo_total,
-        "margem_pct": float(st.session_state.margem_pct),
-        "cache_proposto": cache_proposto,
-        "validade_ate": str(data_validade),
-        "cond_pagto": st.session_state.forma_pagto,
-        "observacoes": st.session_state.observacoes,
-        "contratante": {
-            "nome": st.session_state.contratante_nome, 
-            "doc": st.session_state.contratante_doc,
-            "email": st.session_state.contratante_email, 
-            "tel": st.session_state.contratante_tel, 
-            "end": st.session_state.contratante_end
-        },
-        "banda": {
-            "razao": st.session_state.banda_razao, 
-            "cnpj": st.session_state.banda_cnpj,
-            "resp_legal": st.session_state.banda_resp_legal, 
-            "resp_banda": st.session_state.banda_resp_banda
-        },
-        "evento_info": {
-            "num_convidados": st.session_state.num_convidados, 
-            "hora_montagem": st.session_state.hora_montagem,
-            "hora_show": st.session_state.hora_show, 
-            "local_apresentacao": st.session_state.local_apresentacao
-        },
-        "responsabilidades": {
-            "banda": st.session_state.resp_banda, 
-            "contratante": st.session_state.resp_contratante
-        },
-        "equipe": {
-            "integrantes": st.session_state.num_integrantes, 
-            "apoio": st.session_state.num_apoio, 
-            "acompanhantes": st.session_state.num_acomp
-        },
-        "energia": {
-            "tomada": st.session_state.energia_tomada, 
-            "tensao": st.session_state.energia_tensao,
-            "aterramento": st.session_state.energia_aterramento, 
-            "dist_max": st.session_state.energia_dist_max
-        },
-        "multa_perc": st.session_state.multa_perc, 
-        "foro": st.session_state.foro,
-        "itens": df_calc.to_dict(orient="records"),
-    }
+    rec_atual = make_record()
+    numero_proposta = st.session_state.numero_proposta
+    col_btn1, col_btn2 = st.columns(2)
+    with col_btn1:
+        botao_pdf("orcamento", "📄", "PDF – Orçamento", f"Rockbuzz_Orcamento_{numero_proposta}.pdf", rec_atual)
+    with col_btn2:
+        botao_pdf("contrato", "📝", "PDF – Contrato", f"Rockbuzz_Contrato_{numero_proposta}.pdf", rec_atual)
 
-colA, colB, colC = st.columns([1,1,2])
+documentos()
 
-if colA.button("💾 Salvar no Histórico", use_container_width=True):
-    st.session_state.history.append(make_record())
-    st.success("✅ Proposta salva com sucesso!")
+# =========================
+# Histórico (fragmento)
+# =========================
+def carregar_no_editor(rec_id):
+    """Restaura uma proposta no editor (callback: roda antes de os widgets serem criados)"""
+    rec = store.obter(rec_id)
+    if not rec:
+        return
+    # Restaurar DataFrame de itens
+    itens_df = pd.DataFrame(rec["itens"])
+    if "Total (R$)" in itens_df.columns:
+        itens_df = itens_df.drop(columns=["Total (R$)"])
+    st.session_state.df = itens_df
+    
+    # Restaurar todos os campos usando session_state
+    st.session_state.margem_pct = rec.get("margem_pct", 30.0)
+    st.session_state.nome_evento = rec.get("evento", "")
+    
+    try:
+        st.session_state.data_evento = datetime.fromisoformat(rec.get("data_evento", "")).date()
+    except (ValueError, TypeError):
+        st.session_state.data_evento = datetime.today().date()
+    
+    st.session_state.cidade = rec.get("cidade", "")
+    st.session_state.numero_proposta = rec.get("numero_proposta", "")
+    st.session_state.forma_pagto = rec.get("cond_pagto", "")
+    st.session_state.observacoes = rec.get("observacoes", "")
+    st.session_state.enviado = rec.get("enviado", False)
+    
+    # Contratante
+    contratante = rec.get("contratante", {})
+    st.session_state.contratante_nome = contratante.get("nome", "")
+    st.session_state.contratante_doc = contratante.get("doc", "")
+    st.session_state.contratante_email = contratante.get("email", "")
+    st.session_state.contratante_tel = contratante.get("tel", "")
+    st.session_state.contratante_end = contratante.get("end", "")
+    
+    # Banda
+    banda = rec.get("banda", {})
+    st.session_state.banda_razao = banda.get("razao", "Aditivo Media Management")
+    st.session_state.banda_cnpj = banda.get("cnpj", "40.157.297/0001-18")
+    st.session_state.banda_resp_legal = banda.get("resp_legal", "")
+    st.session_state.banda_resp_banda = banda.get("resp_banda", "")
+    
+    # Evento info
+    ev = rec.get("evento_info", {})
+    st.session_state.num_convidados = ev.get("num_convidados", 0)
+    st.session_state.hora_montagem = ev.get("hora_montagem", "")
+    st.session_state.hora_show = ev.get("hora_show", "")
+    st.session_state.local_apresentacao = ev.get("local_apresentacao", "")
+    
+    # Responsabilidades
+    resp = rec.get("responsabilidades", {})
+    st.session_state.resp_banda = resp.get("banda", "Sonorização e iluminação do show")
+    st.session_state.resp_contratante = resp.get("contratante", "Som mecânico para a festa")
+    
+    # Equipe
+    equipe = rec.get("equipe", {})
+    st.session_state.num_integrantes = equipe.get("integrantes", 0)
+    st.session_state.num_apoio = equipe.get("apoio", 0)
+    st.session_state.num_acomp = equipe.get("acompanhantes", 0)
+    
+    # Energia
+    eng = rec.get("energia", {})
+    st.session_state.energia_tomada = eng.get("tomada", "20A")
+    st.session_state.energia_tensao = eng.get("tensao", "220V")
+    st.session_state.energia_aterramento = eng.get("aterramento", "Adequado, conforme NBR 5410")
+    st.session_state.energia_dist_max = eng.get("dist_max", "10 metros")
+    
+    # Multa/foro
+    st.session_state.multa_perc = rec.get("multa_perc", 50)
+    st.session_state.foro = rec.get("foro", "Comarca de Jundiaí/SP")
+    st.session_state.aviso_historico = "Proposta carregada!"
+
+def apagar_proposta(rec_id):
+    """Remove a proposta antes de o fragmento redesenhar a listagem (callback)"""
+    if store.apagar(rec_id):
+        st.session_state.aviso_historico = "Proposta removida do histórico!"
+
+@st.fragment
+@rastro.medir("fragmento_historico")
+def historico():
+    st.markdown("---")
+    st.subheader("📜 Histórico de Propostas")
+
+    aviso = st.session_state.pop("aviso_historico", None)
+    if aviso:
+        st.success(aviso)
+
+    colA, colB, colC = st.columns([1,1,2])
+
+    if colA.button("💾 Salvar no Histórico", use_container_width=True):
+        store.salvar(make_record())
+        st.success("✅ Proposta salva com sucesso!")
+
+    # Exportação só é serializada quando o botão é clicado
+    with colB:
+        formato_exp = st.selectbox(
+            "Formato da exportação",
+            options=list(history_io.FORMATOS_EXPORTACAO),
+            format_func=lambda f: history_io.FORMATOS_EXPORTACAO[f][0],
+            key="formato_exportacao",
+            label_visibility="collapsed",
+        )
+        if st.button("⬇️ Exportar Histórico", use_container_width=True):
+            _, arquivo_exp, mime_exp = history_io.FORMATOS_EXPORTACAO[formato_exp]
+            with rastro.fase("historico_exportacao"):
+                dados_exp = history_io.exportar_bytes(store.listar(), formato_exp)
+            st.download_button(
+                "💾 Baixar arquivo",
+                data=dados_exp,
+                file_name=arquivo_exp,
+                mime=mime_exp,
+                use_container_width=True,
+            )
+
+    with colC:
+        uploaded = st.file_uploader("📤 Importar Histórico (JSON, NDJSON, .gz ou Parquet .zip)", type=["json", "ndjson", "gz", "zip"])
+        politica_imp = st.selectbox(
+            "Propostas que já existem no histórico",
+            options=list(history_io.POLITICAS_MESCLA),
+            format_func=history_io.POLITICAS_MESCLA.get,
+            key="politica_importacao",
+        )
+
+    # O uploader mantém o arquivo entre reruns: cada arquivo é importado uma única vez
+    if uploaded and st.session_state.get("importacao_arquivo") != uploaded.file_id:
+        st.session_state.importacao_arquivo = uploaded.file_id
+        try:
+            relatorio = history_io.importar(uploaded, store, politica_imp)
+        except Exception as e:
+            st.error(f"❌ Falha ao importar: {e}")
+        else:
+            st.success(
+                f"✅ Histórico importado: {relatorio.inseridos} nova(s), "
+                f"{relatorio.atualizados} atualizada(s), {relatorio.ignorados} mantida(s)."
+            )
+            if relatorio.erros:
+                with st.expander(f"⚠️ {len(relatorio.erros)} registro(s) com erro não foram importados"):
+                    st.dataframe(pd.DataFrame(relatorio.erros, columns=["Registro", "Erro"]), hide_index=True, use_container_width=True)
 
-hist_json = json.dumps(st.session_state.history, ensure_ascii=False, indent=2)
-colB.download_button(
-    "⬇️ Exportar Histórico",
-    data=hist_json.encode("utf-8"),
-    file_name="rockbuzz_historico.json",
-    mime="application/json",
-    use_container_width=True
-)
+    st.markdown("---")
 
-uploaded = colC.file_uploader("📤 Importar Histórico (JSON)", type=["json"])
-if uploaded:
-    try:
-        st.session_state.history = json.loads(uploaded.read().decode("utf-8"))
-        st.success("✅ Histórico importado com sucesso!")
-        st.rerun()
-    except Exception as e:
-        st.error(f"❌ Falha ao importar: {e}")
+    # Listagem do histórico (filtros, ordenação e paginação no SQLite)
+    if not len(store):
+        st.info("Nenhuma proposta salva ainda. Crie um orçamento e clique em **Salvar no Histórico**.")
+        return
 
-st.markdown("---")
+    texto_busca = st.text_input(
+        "🔎 Buscar no histórico", placeholder="Evento, cidade, contratante, nº da proposta, itens...",
+        key="hist_busca", help="Sem diferenciar acentos; palavras incompletas também valem (ex.: \"camp casam\")",
+    )
 
-# Listagem do histórico
-if st.session_state.history:
-    # Criar DataFrame com campo datetime real para ordenação
-    hist_data = []
-    for r in st.session_state.history:
-        created_dt = datetime.fromisoformat(r["created_at"])
-        hist_data.append({
-            "_created_dt": created_dt,  # Campo interno para ordenação
-            "Criado em": created_dt.strftime("%d/%m/%Y %H:%M"),
-            "No Proposta": r["numero_proposta"],
-            "Evento": r["evento"] or "-",
-            "Data": datetime.fromisoformat(r["data_evento"]).strftime("%d/%m/%Y"),
-            "Cidade": r["cidade"] or "-",
-            "Status": "Enviado" if r["enviado"] else "Rascunho",
-            "Custo Total": brl(r["custo_total"]),
-            "Margem": f"{r['margem_pct']:.0f}%",
-            "Cache": brl(r["cache_proposto"]),
-            "Validade": datetime.fromisoformat(r["validade_ate"]).strftime("%d/%m/%Y"),
-            "id": r["id"],
-        })
-    hist_df = pd.DataFrame(hist_data).sort_values("_created_dt", ascending=False).drop(columns=["_created_dt"])
-
-    st.dataframe(
-        hist_df.drop(columns=["id"]), 
-        use_container_width=True, 
-        hide_index=True,
-        column_config={
-            "Criado em": st.column_config.TextColumn("Criado em", width="medium"),
-            "No Proposta": st.column_config.TextColumn("No Proposta", width="medium"),
-            "Evento": st.column_config.TextColumn("Evento", width="large"),
-            "Data": st.column_config.TextColumn("Data", width="small"),
-            "Cidade": st.column_config.TextColumn("Cidade", width="medium"),
-            "Status": st.column_config.TextColumn("Status", width="small"),
-            "Custo Total": st.column_config.TextColumn("Custo Total", width="small"),
-            "Margem": st.column_config.TextColumn("Margem", width="small"),
-            "Cache": st.column_config.TextColumn("Cache", width="small"),
-            "Validade": st.column_config.TextColumn("Validade", width="small"),
-        }
+    with st.expander("⚙️ Filtros e ordenação", expanded=False):
+        f1, f2, f3 = st.columns(3)
+        status_filtro = f1.selectbox("Status", ["Todos", "Enviado", "Rascunho"], key="hist_status")
+        cidades_filtro = f2.multiselect("Cidade", store.cidades(), key="hist_cidades")
+        ordem = f3.selectbox("Ordenar por", list(ORDENACOES), format_func=ORDENACOES.get, key="hist_ordem")
+        f4, f5, f6, f7 = st.columns(4)
+        data_de = f4.date_input("Evento a partir de", value=None, format="DD/MM/YYYY", key="hist_data_de")
+        data_ate = f5.date_input("Evento até", value=None, format="DD/MM/YYYY", key="hist_data_ate")
+        valor_min = f6.number_input("Cachê mínimo (R$)", min_value=0.0, value=None, step=500.0, key="hist_valor_min")
+        valor_max = f7.number_input("Cachê máximo (R$)", min_value=0.0, value=None, step=500.0, key="hist_valor_max")
+        f8, f9 = st.columns(2)
+        decrescente = f8.toggle("Ordem decrescente", value=True, key="hist_desc")
+        por_pagina = f9.selectbox("Propostas por página", [25, 50, 100], key="hist_por_pagina")
+
+    filtros = dict(
+        texto=texto_busca,
+        enviado={"Todos": None, "Enviado": True, "Rascunho": False}[status_filtro],
+        cidades=cidades_filtro, data_de=data_de, data_ate=data_ate,
+        valor_min=valor_min, valor_max=valor_max,
     )
+    with rastro.fase("historico_consulta"):
+        total_filtrado = store.contar(**filtros)
+    n_paginas = max(1, -(-total_filtrado // por_pagina))
+    pg1, pg2 = st.columns([1, 3])
+    pagina = pg1.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1, key="hist_pagina")
+    pagina = min(pagina, n_paginas)
+    pg2.caption(f"{total_filtrado} proposta(s) encontrada(s) · página {pagina} de {n_paginas}")
+
+    # Só a página visível é formatada e enviada ao navegador
+    with rastro.fase("historico_consulta"):
+        ids_pagina = store.consultar(
+            ordem=ordem, desc=decrescente, limite=por_pagina, offset=(pagina - 1) * por_pagina, **filtros
+        )
+    with rastro.fase("historico_serializacao"):
+        hist_df = pd.DataFrame(store.linhas_tabela(ids_pagina), columns=COLUNAS_TABELA)
+
+    with rastro.fase("historico_render"):
+        st.dataframe(
+            hist_df.drop(columns=["id"]), 
+            use_container_width=True, 
+            hide_index=True,
+            column_config={
+                "Criado em": st.column_config.TextColumn("Criado em", width="medium"),
+                "No Proposta": st.column_config.TextColumn("No Proposta", width="medium"),
+                "Evento": st.column_config.TextColumn("Evento", width="large"),
+                "Data": st.column_config.TextColumn("Data", width="small"),
+                "Cidade": st.column_config.TextColumn("Cidade", width="medium"),
+                "Status": st.column_config.TextColumn("Status", width="small"),
+                "Custo Total": st.column_config.TextColumn("Custo Total", width="small"),
+                "Margem": st.column_config.TextColumn("Margem", width="small"),
+                "Cache": st.column_config.TextColumn("Cache", width="small"),
+                "Validade": st.column_config.TextColumn("Validade", width="small"),
+            }
+        )
 
     st.markdown("#### Gerenciar Propostas")
-    ids = hist_df["id"].tolist()
     escolha = st.selectbox(
         "Selecione uma proposta:",
-        options=["- Selecione -"] + ids,
-        format_func=lambda x: "- Selecione -" if x == "- Selecione -" else hist_df[hist_df["id"]==x]["No Proposta"].values[0] + f" - {hist_df[hist_df['id']==x]['Evento'].values[0]}"
+        options=["- Selecione -"] + hist_df["id"].tolist(),
+        format_func=lambda x: "- Selecione -" if x == "- Selecione -" else store.rotulo(x)
     )
     
     ac1, ac2 = st.columns([1, 1])
     
     if escolha != "- Selecione -":
-        if ac1.button("Carregar no Editor", use_container_width=True):
-            rec = next((r for r in st.session_state.history if r["id"] == escolha), None)
-            if rec:
-                # Restaurar DataFrame de itens
-                itens_df = pd.DataFrame(rec["itens"])
-                if "Total (R$)" in itens_df.columns:
-                    itens_df = itens_df.drop(columns=["Total (R$)"])
-                st.session_state.df = itens_df
-                
-                # Restaurar todos os campos usando session_state
-                st.session_state.margem_pct = rec.get("margem_pct", 30.0)
-                st.session_state.nome_evento = rec.get("evento", "")
-                
-                try:
-                    st.session_state.data_evento = datetime.fromisoformat(rec.get("data_evento", "")).date()
-                except (ValueError, TypeError):
-                    st.session_state.data_evento = datetime.today().date()
-                
-                st.session_state.cidade = rec.get("cidade", "")
-                st.session_state.numero_proposta = rec.get("numero_proposta", "")
-                st.session_state.forma_pagto = rec.get("cond_pagto", "")
-                st.session_state.observacoes = rec.get("observacoes", "")
-                st.session_state.enviado = rec.get("enviado", False)
-                
-                # Contratante
-                contratante = rec.get("contratante", {})
-                st.session_state.contratante_nome = contratante.get("nome", "")
-                st.session_state.contratante_doc = contratante.get("doc", "")
-                st.session_state.contratante_email = contratante.get("email", "")
-                st.session_state.contratante_tel = contratante.get("tel", "")
-                st.session_state.contratante_end = contratante.get("end", "")
-                
-                # Banda
-                banda = rec.get("banda", {})
-                st.session_state.banda_razao = banda.get("razao", "Aditivo Media Management")
-                st.session_state.banda_cnpj = banda.get("cnpj", "40.157.297/0001-18")
-                st.session_state.banda_resp_legal = banda.get("resp_legal", "")
-                st.session_state.banda_resp_banda = banda.get("resp_banda", "")
-                
-                # Evento info
-                ev = rec.get("evento_info", {})
-                st.session_state.num_convidados = ev.get("num_convidados", 0)
-                st.session_state.hora_montagem = ev.get("hora_montagem", "")
-                st.session_state.hora_show = ev.get("hora_show", "")
-                st.session_state.local_apresentacao = ev.get("local_apresentacao", "")
-                
-                # Responsabilidades
-                resp = rec.get("responsabilidades", {})
-                st.session_state.resp_banda = resp.get("banda", "Sonorização e iluminação do show")
-                st.session_state.resp_contratante = resp.get("contratante", "Som mecânico para a festa")
-                
-                # Equipe
-                equipe = rec.get("equipe", {})
-                st.session_state.num_integrantes = equipe.get("integrantes", 0)
-                st.session_state.num_apoio = equipe.get("apoio", 0)
-                st.session_state.num_acomp = equipe.get("acompanhantes", 0)
-                
-                # Energia
-                eng = rec.get("energia", {})
-                st.session_state.energia_tomada = eng.get("tomada", "20A")
-                st.session_state.energia_tensao = eng.get("tensao", "220V")
-                st.session_state.energia_aterramento = eng.get("aterramento", "Adequado, conforme NBR 5410")
-                st.session_state.energia_dist_max = eng.get("dist_max", "10 metros")
-                
-                # Multa/foro
-                st.session_state.multa_perc = rec.get("multa_perc", 50)
-                st.session_state.foro = rec.get("foro", "Comarca de Jundiaí/SP")
-                
-                st.success("Proposta carregada! Atualizando...")
-                st.rerun()
-        
-        if ac2.button("Apagar Proposta", use_container_width=True):
-            st.session_state.history = [r for r in st.session_state.history if r["id"] != escolha]
-            st.success("Proposta removida do histórico!")
+        # Carregar altera a barra lateral e o editor: precisa de um rerun da página inteira
+        if ac1.button("Carregar no Editor", use_container_width=True, on_click=carregar_no_editor, args=(escolha,)):
             st.rerun()
-else:
-    st.info("Nenhuma proposta salva ainda. Crie um orçamento e clique em **Salvar no Histórico**.")
+        
+        ac2.button("Apagar Proposta", use_container_width=True, on_click=apagar_proposta, args=(escolha,))
+
+        versoes_proposta = store.versoes(escolha)
+        if len(versoes_proposta) > 1:
+            comparar_versoes(versoes_proposta, escolha)
+
+def comparar_versoes(ids, escolha):
+    """Diferenças campo a campo entre duas versões da mesma proposta"""
+    def rotulo_versao(rec_id):
+        rec = store.obter(rec_id)
+        criado = datetime.fromisoformat(rec["created_at"]).strftime("%d/%m/%Y %H:%M")
+        return f"v{ids.index(rec_id) + 1} · {criado} · {brl(rec['cache_proposto'])}"
+
+    with st.expander(f"🕓 Versões da proposta {store.obter(escolha).get('numero_proposta')} ({len(ids)})"):
+        atual = ids.index(escolha)
+        v1, v2 = st.columns(2)
+        de = v1.selectbox("De", ids, index=max(0, atual - 1), format_func=rotulo_versao, key="versao_de")
+        para = v2.selectbox("Para", ids, index=atual, format_func=rotulo_versao, key="versao_para")
+        mudancas = [
+            (campo, "" if antes is None else str(antes), "" if depois is None else str(depois))
+            for campo, antes, depois in versions.comparar(store.obter(de), store.obter(para))
+            if campo not in ("id", "created_at")
+        ]
+        if mudancas:
+            st.dataframe(pd.DataFrame(mudancas, columns=["Campo", "Antes", "Depois"]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Sem diferenças entre as versões escolhidas.")
+
+historico()
 
-# Manter estado de itens editados
-st.session_state.df = edited_df
+# =========================
+# Desempenho (admin, só com a instrumentação ligada)
+# =========================
+@st.fragment
+def painel_desempenho():
+    with st.expander("⏱️ Desempenho (admin)", expanded=False):
+        p1, p2 = st.columns(2)
+        # O clique já reexecuta o fragmento com os spans mais recentes
+        p1.button("🔄 Atualizar", key="perfil_atualizar", use_container_width=True)
+        preparar = p2.button("🧾 Preparar trace (Chrome/Perfetto)", key="perfil_trace", use_container_width=True)
+        st.caption(f"{len(rastro.spans)} fase(s) medida(s) nas execuções recentes desta sessão.")
+        st.markdown("**Fases (ms)**")
+        st.dataframe(pd.DataFrame(rastro.percentis()), hide_index=True, use_container_width=True)
+        st.markdown("**Execuções recentes (ms)**")
+        st.dataframe(pd.DataFrame(rastro.execucoes()), hide_index=True, use_container_width=True)
+        if preparar:
+            st.download_button(
+                "⬇️ Baixar trace",
+                data=rastro.chrome_trace(),
+                file_name="gigflow_trace.json",
+                mime="application/json",
+                use_container_width=True,
+            )
+
+if rastro.ativo:
+    painel_desempenho()
 
 # =========================
 # Footer
@@ -730,6 +940,12 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Tempo de início da sessão (imports / estado / primeiro render), só na primeira execução
+if "inicio_sessao" not in st.session_state:
+    st.session_state.inicio_sessao = startup.registrar(_inicio, _fim_imports, _fim_estado, time.perf_counter())
+
+rastro.fechar()
+
 
 
 
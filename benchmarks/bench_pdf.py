@@ -0,0 +1,36 @@
+# Benchmark de render dos PDFs (Orçamento e Contrato)
+# -------------------------------------------------------------------------------
+# Uso: python -m benchmarks.bench_pdf [--repeticoes 50] [--itens 12]
+# Mede o tempo mediano por documento (sem o cache de bytes de gigflow.pdf) e o
+# tamanho do arquivo gerado, com uma proposta sintética fixa.
+import argparse
+import statistics
+import time
+
+from benchmarks.dados import proposta_exemplo
+from gigflow import pdf
+
+
+def medir(gerador, rec, repeticoes: int):
+    """(mediana em ms, tamanho em bytes) de `repeticoes` renders"""
+    tamanho = len(gerador(rec).getvalue())  # aquecimento: estilos e trechos fixos
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        gerador(rec)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), tamanho
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de render dos PDFs")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--itens", type=int, default=12)
+    args = parser.parse_args(argv)
+    rec = proposta_exemplo(args.itens)
+    for nome, gerador in (("orcamento", pdf.gerar_pdf_orcamento), ("contrato", pdf.gerar_pdf_contrato)):
+        ms, tamanho = medir(gerador, rec, args.repeticoes)
+        print(f"{nome:<10} {ms:7.2f} ms/doc  {tamanho / 1024:6.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Benchmark do início a frio do app
+# -------------------------------------------------------------------------------
+# Uso: python -m benchmarks.bench_startup [--repeticoes 5]
+# Cada repetição sobe um interpretador novo (como um container recém-criado),
+# importa o Streamlit (o servidor já o tem carregado antes da primeira sessão) e
+# executa a primeira sessão do app com o AppTest. Imprime as fases medidas por
+# gigflow.startup: imports, estado e primeiro render.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+SCRIPT = RAIZ / "RockBuzz – GigFlow.py"
+
+_SESSAO = """
+import json, time
+t = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+streamlit_ms = (time.perf_counter() - t) * 1000
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.run()
+print(json.dumps({{"streamlit_ms": round(streamlit_ms, 1), **at.session_state["inicio_sessao"]}}))
+"""
+
+
+def primeira_sessao(db: str) -> dict:
+    """Roda a primeira sessão num processo novo; retorna o relatório de gigflow.startup"""
+    env = {**os.environ, "PYTHONPATH": str(RAIZ), "ROCKBUZZ_DB": db}
+    saida = subprocess.run(
+        [sys.executable, "-c", _SESSAO.format(script=str(SCRIPT))],
+        env=env, cwd=RAIZ, capture_output=True, text=True, check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do início a frio do app")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as pasta:
+        db = os.path.join(pasta, "historico.db")
+        relatorios = [primeira_sessao(db) for _ in range(args.repeticoes)]
+    for campo in ("streamlit_ms", "imports_ms", "estado_ms", "primeiro_render_ms", "total_ms"):
+        print(f"{campo:<20} {statistics.median(r[campo] for r in relatorios):8.1f} ms (mediana)")
+    print(f"{'reportlab_carregado':<20} {any(r['reportlab_carregado'] for r in relatorios)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Teste de carga da API HTTP (gigflow/api.py) em localhost
+# -------------------------------------------------------------------------------
+# Uso:
+#   python -m benchmarks.carga_api                                  # sobe a API nesta mesma execução
+#   python -m benchmarks.carga_api --rota /orcamento.pdf --requisicoes 200 --concorrencia 16
+#   python -m benchmarks.carga_api --url http://127.0.0.1:8600 --saida carga.json
+#
+# Cada cliente é uma thread com uma conexão keep-alive que envia requisições em
+# sequência até o total ser atingido. Com --variar cada requisição leva um número
+# de proposta diferente (PDFs sempre gerados, sem acerto no cache); sem ele todas
+# pedem o mesmo documento (pedidos agrupados na fila e cache). O resultado traz a
+# vazão (requisições/s), a latência p50/p95/p99 das respostas 200 e a contagem
+# por status (503 = recusada pelo limite de concorrência ou pela fila cheia).
+import argparse
+import http.client
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmarks import dados
+from benchmarks.suite import ambiente
+
+ROTAS = ("/cotacao", "/orcamento.pdf", "/contrato.pdf")
+
+
+def percentil(valores, p):
+    """Percentil pelo posto mais próximo (valores já ordenados)"""
+    if not valores:
+        return None
+    return valores[min(len(valores) - 1, max(0, math.ceil(p / 100 * len(valores)) - 1))]
+
+def _cliente(host, porta, rota, corpos, proximo, resultados):
+    conn = http.client.HTTPConnection(host, porta, timeout=60)
+    while (i := next(proximo, None)) is not None:
+        inicio = time.perf_counter()
+        try:
+            conn.request("POST", rota, body=corpos[i % len(corpos)], headers={"Content-Type": "application/json"})
+            resposta = conn.getresponse()
+            resposta.read()
+            status = resposta.status
+            if resposta.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = "falha"
+            conn.close()
+        resultados.append((status, time.perf_counter() - inicio))
+    conn.close()
+
+def executar(args) -> dict:
+    servidor = None
+    if args.url:
+        partes = urlsplit(args.url)
+        host, porta = partes.hostname, partes.port or 80
+    else:
+        from gigflow import api
+        from gigflow.render_queue import FilaPDF
+        servico = api.Servico(FilaPDF(args.trabalhadores), args.max_requisicoes)
+        servidor = api.criar_servidor("127.0.0.1", 0, servico, silencioso=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        host, porta = "127.0.0.1", servidor.server_port
+
+    base = dados.proposta_exemplo()
+    n_corpos = args.requisicoes if args.variar else 1
+    corpos = [json.dumps(dict(base, numero_proposta=f"CARGA-{i}")).encode("utf-8") for i in range(n_corpos)]
+    lock = threading.Lock()
+    contador = iter(range(args.requisicoes))
+
+    def proximo_seguro():
+        while True:
+            with lock:
+                i = next(contador, None)
+            if i is None:
+                return
+            yield i
+
+    resultados = []
+    # aquecimento: imports do ReportLab, estilos e logo fora da medição
+    _cliente(host, porta, args.rota, corpos[:1], iter([0]), [])
+    inicio = time.perf_counter()
+    clientes = [
+        threading.Thread(target=_cliente, args=(host, porta, args.rota, corpos, proximo_seguro(), resultados))
+        for _ in range(args.concorrencia)
+    ]
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+    decorrido = time.perf_counter() - inicio
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+        servico.fila.encerrar()
+
+    ok = sorted(segundos for status, segundos in resultados if status == 200)
+    ms = lambda s: None if s is None else round(s * 1000, 2)
+    return {
+        "ambiente": ambiente(),
+        "rota": args.rota, "requisicoes": args.requisicoes, "concorrencia": args.concorrencia,
+        "variar": args.variar, "servidor": args.url or "local",
+        "segundos": round(decorrido, 3),
+        "vazao_rps": round(len(ok) / decorrido, 1) if decorrido else None,
+        "status": {str(status): n for status, n in Counter(status for status, _ in resultados).items()},
+        "latencia_ms": {"p50": ms(percentil(ok, 50)), "p95": ms(percentil(ok, 95)),
+                        "p99": ms(percentil(ok, 99)), "max": ms(ok[-1] if ok else None)},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API HTTP de cotação/PDFs em localhost")
+    parser.add_argument("--url", help="API já em execução (padrão: sobe uma nesta execução)")
+    parser.add_argument("--rota", choices=ROTAS, default="/cotacao")
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--concorrencia", type=int, default=8, help="clientes simultâneos")
+    parser.add_argument("--variar", action="store_true", help="um documento diferente por requisição (sem cache)")
+    parser.add_argument("--trabalhadores", type=int, default=2, help="threads de PDF da API local")
+    parser.add_argument("--max-requisicoes", type=int, default=8, help="limite de concorrência da API local")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: stdout)")
+    args = parser.parse_args(argv)
+    resultado = executar(args)
+    latencia = resultado["latencia_ms"]
+    print(
+        f"{args.rota}: {resultado['vazao_rps']} req/s em {resultado['segundos']} s · "
+        f"p50 {latencia['p50']} ms · p95 {latencia['p95']} ms · p99 {latencia['p99']} ms · status {resultado['status']}",
+        file=sys.stderr,
+    )
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        Path(args.saida).write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
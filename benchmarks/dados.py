@@ -0,0 +1,146 @@
+# Dados sintéticos e reprodutíveis para os benchmarks
+# -------------------------------------------------------------------------------
+# Tudo sai de um random.Random com semente fixa: a mesma semente gera as mesmas
+# propostas (ids, datas, valores) em qualquer máquina, para comparar execuções.
+# Os itens têm o formato dos gravados pelo app: quantidade e valores em float,
+# como saem do st.data_editor.
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from gigflow.pricing import default_rows
+
+SEMENTE = 20240501
+
+CIDADES = (
+    "Jundiaí/SP", "Campinas/SP", "São Paulo/SP", "Itu/SP", "Sorocaba/SP", "Valinhos/SP",
+    "Vinhedo/SP", "Itatiba/SP", "Atibaia/SP", "Bragança Paulista/SP", "Indaiatuba/SP", "Louveira/SP",
+)
+EVENTOS = ("Casamento", "Aniversário", "Festa Corporativa", "Formatura", "Bar", "Festival", "Confraternização")
+
+
+def proposta_exemplo(n_itens: int = 12):
+    """Proposta sintética no formato de make_record()"""
+    itens = [
+        {
+            "Item": f"{i + 1}. Item {i + 1}",
+            "Descrição": "Descrição do item de orçamento com texto suficiente para quebrar linha na tabela",
+            "Quantidade": float(1 + i % 4),
+            "Custo Unitário (R$)": 150.0 + 25 * i,
+            "Incluir": True,
+            "Total (R$)": (1 + i % 4) * (150.0 + 25 * i),
+        }
+        for i in range(n_itens)
+    ]
+    custo = sum(item["Total (R$)"] for item in itens)
+    return {
+        "id": "00000000-0000-0000-0000-000000000000",
+        "created_at": "2026-01-10T10:00:00",
+        "numero_proposta": "RB-20260110-1000",
+        "enviado": True,
+        "evento": "Festa Corporativa XYZ",
+        "data_evento": "2026-02-14",
+        "cidade": "Jundiaí/SP",
+        "custo_total": custo,
+        "margem_pct": 30.0,
+        "cache_proposto": round(custo * 1.3, 2),
+        "validade_dias": 7,
+        "validade_ate": "2026-01-17",
+        "cond_pagto": "50% na assinatura + 50% no dia do evento",
+        "observacoes": "Inclui passagem de som no dia anterior.",
+        "contratante": {"nome": "Empresa XYZ Ltda", "doc": "12.345.678/0001-90", "email": "eventos@xyz.com.br", "tel": "(11) 99999-0000", "end": "Av. Principal, 1000 - Jundiaí/SP"},
+        "banda": {"razao": "Aditivo Media Management", "cnpj": "40.157.297/0001-18", "resp_legal": "Fulano de Tal", "resp_banda": "Ciclano"},
+        "evento_info": {"num_convidados": 150, "hora_montagem": "18:00", "hora_show": "21:00", "local_apresentacao": "Salão principal"},
+        "responsabilidades": {"banda": "Sonorização e iluminação do show", "contratante": "Som mecânico para a festa"},
+        "equipe": {"integrantes": 5, "apoio": 2, "acompanhantes": 1},
+        "energia": {"tomada": "20A", "tensao": "220V", "aterramento": "Adequado, conforme NBR 5410", "dist_max": "10 metros"},
+        "multa_perc": 50,
+        "foro": "Comarca de Jundiaí/SP",
+        "itens": itens,
+    }
+
+def tabela_itens(n_linhas: int = 12, semente: int = SEMENTE) -> pd.DataFrame:
+    """Tabela do editor: default_rows() preenchido e, acima de 12 linhas, itens extras"""
+    rng = random.Random(semente)
+    linhas = default_rows()
+    for i in range(len(linhas), n_linhas):
+        linhas.append({"Item": f"{i + 1}. Extra {i + 1}", "Descrição": "Item adicional", "Quantidade": 0.0,
+                       "Custo Unitário (R$)": 0.0, "Incluir": True})
+    for linha in linhas[:n_linhas]:
+        linha["Quantidade"] = float(rng.randint(0, 6))
+        linha["Custo Unitário (R$)"] = round(rng.uniform(0, 2500), 2)
+        linha["Incluir"] = rng.random() > 0.1
+    return pd.DataFrame(linhas[:n_linhas])
+
+def propostas(n: int, semente: int = SEMENTE):
+    """Gera `n` registros no formato de make_record(), com ids, datas e valores variados"""
+    rng = random.Random(semente)
+    base = datetime(2024, 1, 1, 9, 0)
+    for i in range(n):
+        rec = proposta_exemplo(rng.randint(4, 16))
+        criado = base + timedelta(minutes=37 * i)
+        evento = criado.date() + timedelta(days=rng.randint(7, 240))
+        for item in rec["itens"]:
+            item["Quantidade"] = float(rng.randint(1, 6))
+            item["Custo Unitário (R$)"] = round(rng.uniform(50, 2500), 2)
+            item["Total (R$)"] = round(item["Quantidade"] * item["Custo Unitário (R$)"], 2)
+        custo = round(sum(item["Total (R$)"] for item in rec["itens"]), 2)
+        margem = rng.choice((20.0, 25.0, 30.0, 35.0, 40.0))
+        rec.update(
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            created_at=criado.isoformat(timespec="seconds"),
+            numero_proposta=criado.strftime("RB-%Y%m%d-%H%M"),
+            enviado=rng.random() < 0.6,
+            evento=f"{rng.choice(EVENTOS)} {i}",
+            data_evento=evento.isoformat(),
+            cidade=rng.choice(CIDADES),
+            custo_total=custo,
+            margem_pct=margem,
+            cache_proposto=round(custo * (1 + margem / 100), 2),
+            validade_ate=(criado.date() + timedelta(days=7)).isoformat(),
+        )
+        yield rec
+
+def propostas_versionadas(n: int, versoes: int = 10, semente: int = SEMENTE):
+    """`n` propostas salvas `versoes` vezes cada, com pequenas mudanças entre versões (negociação)"""
+    rng = random.Random(semente)
+    for rec in propostas(n, semente):
+        criado = datetime.fromisoformat(rec["created_at"])
+        for v in range(versoes):
+            if v:
+                rec = dict(rec, itens=[dict(item) for item in rec["itens"]])
+                item = rng.choice(rec["itens"])
+                item["Quantidade"] = float(rng.randint(1, 6))
+                item["Total (R$)"] = round(item["Quantidade"] * item["Custo Unitário (R$)"], 2)
+                rec["custo_total"] = round(sum(i["Total (R$)"] for i in rec["itens"]), 2)
+                rec["margem_pct"] = rng.choice((20.0, 25.0, 30.0, 35.0, 40.0))
+                rec["cache_proposto"] = round(rec["custo_total"] * (1 + rec["margem_pct"] / 100), 2)
+                if rng.random() < 0.3:
+                    rec["observacoes"] = f"Revisão {v}: ajuste de valores."
+            rec.update(
+                id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                created_at=(criado + timedelta(minutes=5 * v)).isoformat(timespec="seconds"),
+            )
+            yield rec
+
+FORNECEDORES = ("Kiko Som e Luz", "Guilherme PA", "Palco & Cia Estruturas", "Buffet Sabor da Serra", "Hotel Parada da Serra",
+                "Rockbuzz", "Locadora Jundiaí", "Luz & Cena", "Audio Prime", "Trelicas Brasil")
+TERMOS_DESCRICAO = ("PA", "line array", "monitoramento", "luz", "moving head", "palco", "treliça", "telão LED",
+                    "gerador", "técnico", "FOH", "refeição", "quarto", "roadie", "microfone", "backline", "mesa digital")
+
+def catalogo_csv(n: int, semente: int = SEMENTE) -> str:
+    """Catálogo de preços (formato de gigflow/data/catalogo.csv) com `n` preços em faixas de público"""
+    rng = random.Random(semente)
+    linhas = [item["Item"].split(". ", 1)[1] for item in default_rows()]
+    faixas = (("", ""), ("0", "100"), ("101", "300"), ("301", "800"), ("801", ""))
+    saida = ["linha,fornecedor,descricao,custo_unitario,quantidade,convidados_min,convidados_max,valido_de,valido_ate"]
+    for i in range(n):
+        minimo, maximo = rng.choice(faixas)
+        descricao = " + ".join(rng.sample(TERMOS_DESCRICAO, 3)) + f" modelo {i}"
+        saida.append(
+            f"{rng.choice(linhas)},{rng.choice(FORNECEDORES)},{descricao},{rng.uniform(50, 8000):.2f},"
+            f"{rng.randint(0, 4)},{minimo},{maximo},2026-01-01,2027-12-31"
+        )
+    return "\n".join(saida) + "\n"
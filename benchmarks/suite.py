@@ -0,0 +1,387 @@
+# Suíte de benchmarks dos caminhos quentes do app
+# -------------------------------------------------------------------------------
+# Uso:
+#   python -m benchmarks.suite --saida antes.json
+#   python -m benchmarks.suite --tamanhos 10 1000 --repeticoes 10 --grupos calculo pdf
+#
+# Cobre o cálculo do cachê (default_rows() e tabelas com centenas de linhas,
+# completo e incremental com uma célula editada; grade do simulador), o render
+# dos PDFs (tempo, tamanho, bytes idênticos entre dois builds, células de
+# texto iguais às do parser e envio à fila em segundo plano), listagem/busca/agenda/seleção/exportação do histórico com
+# 10, 1k e 100k propostas, o histórico com versões em delta (espaço em
+# banco/memória/exportação), a importação de JSON e do arquivo Parquet e a
+# carga de cada um para análise (tempo e pico de memória) e o catálogo de
+# preços com 10, 1k e 100k preços (índice, busca, preenchimento da tabela e
+# recarga incremental). Os dados são sintéticos e reprodutíveis
+# (benchmarks/dados.py). O resultado é um JSON com o ambiente (versões, CPU,
+# commit) e uma lista de medições {grupo, caso, n, ...} para comparar
+# execuções; o resumo legível vai para o stderr.
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import pyarrow as pa
+from reportlab.platypus import Paragraph
+
+from benchmarks import dados
+from gigflow import archive, catalog, history_io, pdf, pdf_layout, pricing, sensitivity
+from gigflow.render_queue import FilaPDF
+from gigflow.store import HistoryStore
+
+RAIZ = Path(__file__).resolve().parent.parent
+GRUPOS = ("calculo", "pdf", "historico", "versoes", "importacao", "catalogo")
+LINHAS_CALCULO = (12, 100, 500)
+TAMANHOS_PADRAO = (10, 1_000, 100_000)
+LOTE_CARGA = 500
+VERSOES_POR_PROPOSTA = 10
+
+
+def cronometrar(funcao, repeticoes: int, aquecimento: int = 1) -> dict:
+    """Executa `funcao` e resume os tempos (ms)"""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        if gc_ativo:
+            gc.enable()
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "mediana_ms": round(statistics.median(tempos), 4),
+        "min_ms": round(tempos[0], 4),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))], 4),
+    }
+
+def uma_vez(funcao):
+    """(resultado, ms) de uma única execução (operações caras ou que mudam estado)"""
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, round((time.perf_counter() - inicio) * 1000, 4)
+
+def ambiente() -> dict:
+    """Versões e máquina, para saber se duas execuções são comparáveis"""
+    import numpy
+    import pandas
+    import reportlab
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "reportlab": reportlab.Version,
+        "semente": dados.SEMENTE,
+    }
+
+
+# =========================
+# Grupos de medições
+# =========================
+def bench_calculo(args):
+    for n in LINHAS_CALCULO:
+        df = dados.tabela_itens(n)
+        caso = "default_rows" if n == len(pricing.default_rows()) else "tabela_grande"
+        yield {"grupo": "calculo", "caso": caso, "n": n,
+               **cronometrar(lambda: pricing.calcular_df(df, 30.0, 7), args.repeticoes)}
+        # rerun do editor com uma célula editada: só essa linha é recalculada
+        calc = pricing.CalculoIncremental(df)
+        edicoes = [{"edited_rows": {0: {"Quantidade": k % 5}}} for k in range(2)]
+        contador = iter(range(10**9))
+        yield {"grupo": "calculo", "caso": f"{caso}_incremental", "n": n,
+               **cronometrar(lambda: (calc.aplicar(edicoes[next(contador) % 2]), calc.orcamento(30.0, 7)), args.repeticoes)}
+
+    # simulador: 6 itens x 4 fatores = 4096 cenários x 101 margens, sem a memorização
+    itens = pricing.calcular_df(dados.tabela_itens(12), 30.0)[1].itens
+    def grade():
+        sensitivity._simular.cache_clear()
+        return sensitivity.simular(itens, range(6), (0.0, 0.5, 1.0, 1.5))
+    yield {"grupo": "calculo", "caso": "simulador_grade", "n": 4096, **cronometrar(grade, args.repeticoes)}
+
+def bench_pdf(args):
+    rec = dados.proposta_exemplo()
+    for tipo, gerador in (("orcamento", pdf.gerar_pdf_orcamento), ("contrato", pdf.gerar_pdf_contrato)):
+        dados_pdf = gerador(rec).getvalue()
+        time.sleep(1.1)   # CreationDate tem resolução de segundos
+        identico = gerador(rec).getvalue() == dados_pdf
+        yield {"grupo": "pdf", "caso": tipo, "n": len(rec["itens"]), "bytes": len(dados_pdf), "identico": identico,
+               **cronometrar(lambda: gerador(rec), args.repeticoes)}
+
+    # células sem marcação são montadas sem o parser: têm de sair iguais a Paragraph(escape(texto))
+    textos = ["Som/Luz Kiko", "  espaços   múltiplos \n quebra\tTab ", "€ ç ã — …", "", "R$ 1.234,56",
+              "Som & Luz <b>x</b>", "a &amp; b<br/>c"]
+    rec_textos = dict(rec, itens=[dict(item, Item=texto, Descrição=texto[::-1]) for item, texto in zip(rec["itens"], textos)])
+    montado = pdf_layout.gerar_pdf_orcamento(rec_textos).getvalue()
+    texto_original = pdf_layout._texto
+    pdf_layout._texto = lambda texto, estilo: Paragraph(escape(str(texto)), estilo)
+    try:
+        referencia = pdf_layout.gerar_pdf_orcamento(rec_textos).getvalue()
+    finally:
+        pdf_layout._texto = texto_original
+    yield {"grupo": "pdf", "caso": "texto_literal", "n": len(textos), "identico": montado == referencia}
+
+    # fila em segundo plano: o script só espera o envio; 8 documentos distintos até o último ficar pronto
+    fila = FilaPDF(max_pendentes=10**6)
+    contador = iter(range(10**9))
+    def enviar():
+        return fila.enviar("orcamento", dict(rec, numero_proposta=f"FILA-{next(contador)}"))
+    yield {"grupo": "pdf", "caso": "fila_envio", "n": 1, **cronometrar(enviar, args.repeticoes)}
+    while fila.pendentes():
+        time.sleep(0.01)
+    def oito():
+        trabalhos = [enviar() for _ in range(8)]
+        while any(t.pendente for t in trabalhos):
+            time.sleep(0.005)
+    _, ms = uma_vez(oito)
+    yield {"grupo": "pdf", "caso": "fila_8_documentos", "n": 8, "ms": ms, "trabalhadores": fila.trabalhadores}
+    fila.encerrar()
+
+def _carregar(store, n):
+    lote = []
+    for rec in dados.propostas(n):
+        lote.append(rec)
+        if len(lote) >= LOTE_CARGA:
+            store.mesclar(lote)
+            lote.clear()
+    if lote:
+        store.mesclar(lote)
+
+def bench_historico(args, n, pasta):
+    caminho = os.path.join(pasta, f"historico_{n}.db")
+    store = HistoryStore(caminho)
+    _, ms = uma_vez(lambda: _carregar(store, n))
+    yield {"grupo": "historico", "caso": "carga", "n": n, "ms": ms, "bytes": os.path.getsize(caminho)}
+
+    # store novo, como num processo recém-iniciado: a primeira consulta carrega o índice
+    store = HistoryStore(caminho)
+    _, ms = uma_vez(lambda: len(store))
+    yield {"grupo": "historico", "caso": "indice_frio", "n": n, "ms": ms}
+
+    def pagina(**filtros):
+        total = store.contar(**filtros)
+        ids = store.consultar(ordem="created_at", desc=True, limite=50, offset=0, **filtros)
+        return total, store.linhas_tabela(ids)
+
+    filtros = dict(enviado=True, cidades=list(dados.CIDADES[:3]), valor_min=5_000.0)
+    _, ms = uma_vez(pagina)
+    yield {"grupo": "historico", "caso": "listagem_fria", "n": n, "ms": ms}
+    yield {"grupo": "historico", "caso": "listagem", "n": n, **cronometrar(pagina, args.repeticoes)}
+    yield {"grupo": "historico", "caso": "listagem_filtrada", "n": n,
+           **cronometrar(lambda: pagina(**filtros), args.repeticoes)}
+
+    _, ms = uma_vez(lambda: store.buscar("campinas"))
+    yield {"grupo": "historico", "caso": "busca_indice_frio", "n": n, "ms": ms}
+    yield {"grupo": "historico", "caso": "busca_termos", "n": n,
+           **cronometrar(lambda: store.buscar("camp casam"), args.repeticoes)}
+    yield {"grupo": "historico", "caso": "listagem_busca", "n": n,
+           **cronometrar(lambda: pagina(texto="jundiai casam", enviado=True), args.repeticoes)}
+
+    banda = {"razao": "Aditivo Media Management", "cnpj": "40.157.297/0001-18"}
+    datas = [store.obter(rec_id)["data_evento"] for rec_id in store.consultar(limite=100)]
+    _, ms = uma_vez(lambda: store.conflitos(banda, datas[0], "18:00", "21:00"))
+    yield {"grupo": "historico", "caso": "agenda_indice_frio", "n": n, "ms": ms}
+
+    def conflitos():
+        for data in datas:
+            store.conflitos(banda, data, "18:00", "21:00")
+    yield {"grupo": "historico", "caso": "conflitos_100", "n": n, **cronometrar(conflitos, args.repeticoes)}
+
+    ids = store.consultar(limite=-1)
+    passo = max(1, len(ids) // 100)
+    amostra = ids[::passo][:100]
+
+    def selecionar():
+        for rec_id in amostra:
+            store.rotulo(rec_id)
+            store.obter(rec_id)
+    yield {"grupo": "historico", "caso": "selecao_100", "n": n, **cronometrar(selecionar, args.repeticoes)}
+
+    repeticoes = max(1, min(args.repeticoes, 3)) if n > 10_000 else args.repeticoes
+    for formato in ("ndjson.gz", "versoes.ndjson.gz", "parquet.zip", "json"):
+        tamanho = len(history_io.exportar_bytes(store.listar(), formato))
+        yield {"grupo": "historico", "caso": f"exportacao_{formato}", "n": n, "bytes": tamanho,
+               **cronometrar(lambda: history_io.exportar_bytes(store.listar(), formato), repeticoes, aquecimento=0)}
+
+def bench_versoes(args, n, pasta):
+    """`n` registros = n/10 propostas salvas 10 vezes cada (cadeias de versões em delta)"""
+    registros = list(dados.propostas_versionadas(max(1, n // VERSOES_POR_PROPOSTA), VERSOES_POR_PROPOSTA))
+    n = len(registros)
+    completos = sum(len(json.dumps(rec, ensure_ascii=False).encode("utf-8")) for rec in registros)
+    caminho = os.path.join(pasta, f"versoes_{n}.db")
+    store = HistoryStore(caminho)
+    _, ms = uma_vez(lambda: store.mesclar(registros))
+    conn = store._conn()
+    gravados = sum(conn.execute(f"SELECT COALESCE(SUM(LENGTH(dados)), 0) FROM {tabela}").fetchone()[0]
+                   for tabela in ("propostas", "blocos"))
+    yield {"grupo": "versoes", "caso": "carga", "n": n, "ms": ms, "bytes": gravados, "bytes_json_completo": completos}
+
+    store = HistoryStore(caminho)
+    _, ms = uma_vez(lambda: len(store))
+    yield {"grupo": "versoes", "caso": "indice_frio", "n": n, "ms": ms}
+
+    # memória do índice reconstruído x os mesmos registros como cópias completas
+    gc.collect()
+    tracemalloc.start()
+    medido = HistoryStore(caminho)
+    len(medido)
+    memoria = tracemalloc.get_traced_memory()[0]
+    copias = [json.loads(json.dumps(rec)) for rec in registros]
+    memoria_copias = tracemalloc.get_traced_memory()[0] - memoria
+    tracemalloc.stop()
+    del medido, copias
+    yield {"grupo": "versoes", "caso": "memoria_indice", "n": n, "bytes": memoria, "bytes_copias_completas": memoria_copias}
+
+    for formato in ("ndjson.gz", "versoes.ndjson.gz"):
+        tamanho = len(history_io.exportar_bytes(store.listar(), formato))
+        yield {"grupo": "versoes", "caso": f"exportacao_{formato}", "n": n, "bytes": tamanho,
+               **cronometrar(lambda: history_io.exportar_bytes(store.listar(), formato), 1, aquecimento=0)}
+
+def _memoria_pico(funcao):
+    """(resultado, pico de memória em bytes: Python via tracemalloc + buffers do Arrow)"""
+    gc.collect()
+    arrow_antes = pa.total_allocated_bytes()
+    tracemalloc.start()
+    resultado = funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, pico + max(0, pa.total_allocated_bytes() - arrow_antes)
+
+def bench_importacao(args, n, pasta):
+    for formato in ("json", "parquet.zip"):
+        buffer = BytesIO()
+        history_io.exportar(dados.propostas(n), buffer, formato)
+        conteudo = buffer.getvalue()
+        del buffer
+        store = HistoryStore(os.path.join(pasta, f"importacao_{formato}_{n}.db"))
+        relatorio, ms = uma_vez(lambda: history_io.importar(BytesIO(conteudo), store))
+        yield {"grupo": "importacao", "caso": formato, "n": n, "bytes": len(conteudo), "ms": ms,
+               "registros_por_s": round(relatorio.lidos / (ms / 1000), 1) if ms else None,
+               "erros": len(relatorio.erros)}
+
+        # carga para análise: o arquivo inteiro em memória, sem gravar no histórico
+        if formato == "json":
+            carregar = lambda: json.loads(conteudo)
+            filtrar = lambda: [
+                (rec["id"], rec["cidade"], rec["cache_proposto"]) for rec in json.loads(conteudo)
+                if rec["enviado"] and rec["cidade"] == dados.CIDADES[0] and rec["data_evento"] >= "2025-01-01"
+            ]
+        else:
+            carregar = lambda: archive.ler_propostas(conteudo)
+            filtrar = lambda: archive.ler_propostas(conteudo, ["id", "cidade", "cache_proposto"], [
+                ("enviado", "=", True), ("cidade", "=", dados.CIDADES[0]), ("data_evento", ">=", date(2025, 1, 1)),
+            ])
+        nome = formato.split(".")[0]
+        for caso, funcao in ((f"analise_{nome}", carregar), (f"analise_filtro_{nome}", filtrar)):
+            _, memoria = _memoria_pico(funcao)
+            yield {"grupo": "importacao", "caso": caso, "n": n, "memoria_pico_bytes": memoria,
+                   **cronometrar(funcao, max(1, min(args.repeticoes, 5)), aquecimento=0)}
+
+
+def bench_catalogo(args, n, pasta):
+    caminho = Path(pasta) / f"catalogo_{n}.csv"
+    conteudo = dados.catalogo_csv(n)
+    caminho.write_text(conteudo, encoding="utf-8")
+    cat, ms = uma_vez(lambda: catalog.Catalogo(caminho, intervalo=0))
+    yield {"grupo": "catalogo", "caso": "indice", "n": n, "ms": ms, "bytes": len(conteudo.encode("utf-8"))}
+
+    dia = date(2026, 11, 20)
+    yield {"grupo": "catalogo", "caso": "busca_prefixo", "n": n,
+           **cronometrar(lambda: cat.buscar("pa kiko", 200, dia), args.repeticoes)}
+    yield {"grupo": "catalogo", "caso": "busca_aproximada", "n": n,
+           **cronometrar(lambda: cat.buscar("guilhrme", 200, dia), args.repeticoes)}
+    tabela = pd.DataFrame(pricing.default_rows())
+    yield {"grupo": "catalogo", "caso": "preencher_tabela", "n": n,
+           **cronometrar(lambda: catalog.preencher(tabela, cat, 200, dia), args.repeticoes)}
+    yield {"grupo": "catalogo", "caso": "recarga_sem_mudanca", "n": n,
+           **cronometrar(cat.recarregar, args.repeticoes)}
+
+    # um preço reajustado no arquivo: só ele sai e volta ao índice
+    linhas = conteudo.splitlines(keepends=True)
+    campos = linhas[1].split(",")
+    campos[3] = f"{float(campos[3]) + 10:.2f}"
+    linhas[1] = ",".join(campos)
+    caminho.write_text("".join(linhas), encoding="utf-8")
+    (incluidos, removidos), ms = uma_vez(cat.recarregar)
+    yield {"grupo": "catalogo", "caso": "recarga_1_preco", "n": n, "ms": ms, "incluidos": incluidos, "removidos": removidos}
+
+
+def _resumo(medicao) -> str:
+    tempo = medicao.get("mediana_ms", medicao.get("ms"))
+    tempo = f"{tempo:12.3f} ms" if tempo is not None else " " * 15
+    extra = f"  {medicao['bytes'] / 1024:10.1f} KB" if "bytes" in medicao else ""
+    if "identico" in medicao:
+        extra += "  bytes idênticos" if medicao["identico"] else "  BYTES DIFERENTES"
+    if "memoria_pico_bytes" in medicao:
+        extra += f"  pico {medicao['memoria_pico_bytes'] / 2**20:8.1f} MB"
+    return f"{medicao['grupo']:<11} {medicao['caso']:<26} n={medicao['n']:<7} {tempo}{extra}"
+
+def executar(args) -> dict:
+    resultado = {"ambiente": ambiente(), "medicoes": []}
+
+    def registrar(medicoes):
+        for medicao in medicoes:
+            resultado["medicoes"].append(medicao)
+            print(_resumo(medicao), file=sys.stderr, flush=True)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if "calculo" in args.grupos:
+            registrar(bench_calculo(args))
+        if "pdf" in args.grupos:
+            registrar(bench_pdf(args))
+        for n in args.tamanhos:
+            if "historico" in args.grupos:
+                registrar(bench_historico(args, n, pasta))
+            if "versoes" in args.grupos:
+                registrar(bench_versoes(args, n, pasta))
+            if "importacao" in args.grupos:
+                registrar(bench_importacao(args, n, pasta))
+            if "catalogo" in args.grupos:
+                registrar(bench_catalogo(args, n, pasta))
+            gc.collect()
+    return resultado
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de cálculo, PDFs e histórico (saída em JSON)")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO), help="tamanhos do histórico")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--grupos", nargs="+", choices=GRUPOS, default=list(GRUPOS))
+    args = parser.parse_args(argv)
+    resultado = executar(args)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        Path(args.saida).write_text(texto + "\n", encoding="utf-8")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# Rockbuzz Pay – GigFlow
+# Módulos de apoio ao app Streamlit (importáveis sem rodar a interface)
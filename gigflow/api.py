@@ -0,0 +1,335 @@
+# API HTTP local de cotação e documentos
+# -------------------------------------------------------------------------------
+# Uso:
+#   python -m gigflow.api --porta 8600
+#   curl -X POST --data @proposta.json http://127.0.0.1:8600/cotacao
+#   curl -X POST --data @proposta.json http://127.0.0.1:8600/orcamento.pdf -o orcamento.pdf
+#
+# Serviço leve (só biblioteca padrão) para a planilha de bookings e o formulário
+# do site obterem preço e PDFs sem abrir o app. O corpo é uma proposta no
+# formato de make_record(); itens, custo, margem, cachê e validade são
+# recalculados aqui com gigflow.pricing, como no editor; campos ausentes (id,
+# created_at, blocos do contrato...) recebem valores padrão vazios e itens sem
+# "Incluir" contam como incluídos. Números não finitos ou fora dos limites
+# (MAX_*), itens com campos de tipo errado e blocos que não são objetos são
+# recusados com 422.
+#   POST /cotacao        -> JSON com os itens (com "Total (R$)") e os totais
+#   POST /orcamento.pdf  -> PDF do Orçamento
+#   POST /contrato.pdf   -> PDF do Contrato
+#   GET  /saude          -> situação do serviço e da fila de PDFs
+#
+# Cada conexão tem uma thread, mas no máximo MAX_REQUISICOES requisições são
+# processadas ao mesmo tempo; as demais recebem 503 com Retry-After em vez de
+# enfileirar sem limite. Os PDFs saem da mesma fila de renderização do app
+# (gigflow/render_queue.py): pool fixo, pedidos iguais agrupados e cache LRU.
+# O teste de carga fica em benchmarks/carga_api.py.
+import argparse
+import json
+import re
+import sys
+import threading
+import uuid
+from datetime import date, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import pandas as pd
+
+from gigflow import history_io, pricing
+from gigflow.render_queue import MAX_TRABALHADORES, FilaCheia, FilaPDF
+from gigflow.utils import json_default
+
+MAX_REQUISICOES = 8
+MAX_CORPO_BYTES = 2 * 1024 * 1024
+TIMEOUT_PDF_S = 30.0
+VALIDADE_PADRAO = 7
+MAX_MARGEM_PCT = 1000.0
+MAX_QUANTIDADE = 1_000_000
+MAX_CUSTO_UNITARIO = 1_000_000_000.0
+MAX_CUSTO_TOTAL = 1e12   # reais; em centavos fica ordens de grandeza abaixo do limite do int64
+
+DOCUMENTOS = {"/orcamento.pdf": "orcamento", "/contrato.pdf": "contrato"}
+
+
+class ErroRequisicao(ValueError):
+    """Erro do cliente, respondido com o status e a lista de problemas"""
+
+    def __init__(self, status: HTTPStatus, problemas):
+        super().__init__("; ".join(problemas))
+        self.status = status
+        self.problemas = list(problemas)
+
+
+def _numero(valor, minimo, maximo) -> bool:
+    """Número JSON (não bool) dentro de [minimo, maximo]; NaN falha na comparação"""
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and minimo <= valor <= maximo
+
+def validar_payload(payload) -> list[str]:
+    """Problemas do payload que o cálculo não pode aceitar (lista vazia = ok)"""
+    itens = payload.get("itens")
+    if not isinstance(itens, list) or not itens or not all(isinstance(item, dict) for item in itens):
+        return ["itens: lista de objetos não vazia"]
+    problemas = []
+    if not _numero(payload.get("margem_pct", 0.0), 0, MAX_MARGEM_PCT):
+        problemas.append(f"margem_pct: número entre 0 e {MAX_MARGEM_PCT:.0f}")
+    validade = payload.get("validade_dias", VALIDADE_PADRAO)
+    if not isinstance(validade, int) or isinstance(validade, bool) or validade < 0:
+        problemas.append("validade_dias: inteiro >= 0")
+    for bloco in history_io.ESQUEMA_SUBCAMPOS:
+        if bloco in payload and not isinstance(payload[bloco], dict):
+            problemas.append(f"{bloco}: objeto")
+    total = 0.0
+    for i, item in enumerate(itens):
+        # células vazias do editor chegam como null (ou ausentes) e contam como 0
+        qtd, unit = item.get("Quantidade"), item.get("Custo Unitário (R$)")
+        if qtd is not None and not _numero(qtd, 0, MAX_QUANTIDADE):
+            problemas.append(f"item {i}: Quantidade deve ser número entre 0 e {MAX_QUANTIDADE}")
+        if unit is not None and not _numero(unit, 0, MAX_CUSTO_UNITARIO):
+            problemas.append(f"item {i}: Custo Unitário (R$) deve ser número entre 0 e {MAX_CUSTO_UNITARIO:.0f}")
+        for campo in ("Item", "Descrição"):
+            if item.get(campo) is not None and not isinstance(item[campo], str):
+                problemas.append(f"item {i}: {campo} deve ser texto")
+        if "Incluir" in item and not isinstance(item["Incluir"], bool):
+            problemas.append(f"item {i}: Incluir deve ser true/false")
+        if len(problemas) >= 20:
+            problemas.append("... (demais problemas omitidos)")
+            return problemas
+        if not problemas:
+            total += (qtd or 0) * (unit or 0)
+    if not problemas and total > MAX_CUSTO_TOTAL:
+        # os centavos são int64: limitar o total mantém o cálculo longe do estouro
+        problemas.append(f"itens: custo total acima de R$ {MAX_CUSTO_TOTAL:,.0f}")
+    return problemas
+
+def completar(payload, hoje: date | None = None) -> dict:
+    """Registro no formato de make_record() a partir do payload, com itens e totais recalculados"""
+    if not isinstance(payload, dict):
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, ["o corpo deve ser um objeto JSON"])
+    problemas = validar_payload(payload)
+    if problemas:
+        raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, problemas)
+    itens = payload["itens"]
+    margem = payload.get("margem_pct", 0.0)
+    validade = payload.get("validade_dias", VALIDADE_PADRAO)
+
+    df = pd.DataFrame([{"Incluir": True, **item} for item in itens]).reindex(columns=list(history_io.CAMPOS_ITEM))
+    try:
+        df_calc, orcamento = pricing.calcular_df(df, margem, validade, hoje)
+    except OverflowError:
+        raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, ["validade_dias: data de validade fora do calendário"]) from None
+    custo_total, _, cache_proposto = orcamento.em_reais()
+    agora = datetime.now()
+    return {
+        "id": str(uuid.uuid4()),
+        "created_at": agora.isoformat(timespec="seconds"),
+        "numero_proposta": agora.strftime("RB-%Y%m%d-%H%M"),
+        "enviado": False,
+        "evento": "",
+        "data_evento": str(hoje or date.today()),
+        "cidade": "",
+        "cond_pagto": "",
+        "observacoes": "",
+        "foro": "",
+        "multa_perc": 0,
+        **payload,
+        **{
+            bloco: {**dict.fromkeys(subcampos, ""), **payload.get(bloco, {})}
+            for bloco, subcampos in history_io.ESQUEMA_SUBCAMPOS.items()
+            if isinstance(payload.get(bloco, {}), dict)
+        },
+        "custo_total": custo_total,
+        "margem_pct": float(margem),
+        "cache_proposto": cache_proposto,
+        "validade_dias": validade,
+        "validade_ate": str(orcamento.data_validade),
+        "itens": df_calc.to_dict(orient="records"),
+    }
+
+def cotacao(rec) -> dict:
+    """Resposta de /cotacao: itens calculados e totais (em reais)"""
+    custo_total, cache_proposto = rec["custo_total"], rec["cache_proposto"]
+    return {
+        "itens": rec["itens"],
+        "custo_total": custo_total,
+        "margem_pct": rec["margem_pct"],
+        "margem_valor": round(cache_proposto - custo_total, 2),
+        "cache_proposto": cache_proposto,
+        "validade_ate": rec["validade_ate"],
+    }
+
+
+def content_disposition(nome: str) -> str:
+    """Cabeçalho de anexo só com ASCII: filename reduzido a [A-Za-z0-9._-] e o nome original em filename* (RFC 5987)"""
+    nome = "".join(c for c in nome if c.isprintable())
+    seguro = re.sub(r"[^A-Za-z0-9._-]+", "_", nome)
+    return f"attachment; filename=\"{seguro}\"; filename*=UTF-8''{quote(nome, safe='')}"
+
+
+class Servico:
+    """Estado compartilhado pelas requisições: fila de PDFs e limite de concorrência"""
+
+    def __init__(self, fila: FilaPDF | None = None, max_requisicoes: int = MAX_REQUISICOES,
+                 timeout_pdf: float = TIMEOUT_PDF_S):
+        self.fila = fila or FilaPDF()
+        self.max_requisicoes = max_requisicoes
+        self.timeout_pdf = timeout_pdf
+        self._vagas = threading.BoundedSemaphore(max_requisicoes)
+        self._lock = threading.Lock()
+        self.ativas = 0
+        self.atendidas = 0
+        self.recusadas = 0
+
+    def entrar(self) -> bool:
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.recusadas += 1
+            return False
+        with self._lock:
+            self.ativas += 1
+        return True
+
+    def sair(self):
+        with self._lock:
+            self.ativas -= 1
+            self.atendidas += 1
+        self._vagas.release()
+
+    def saude(self) -> dict:
+        return {
+            "status": "ok",
+            "requisicoes": {"ativas": self.ativas, "atendidas": self.atendidas, "recusadas": self.recusadas,
+                            "max": self.max_requisicoes},
+            "fila_pdf": {"pendentes": self.fila.pendentes(), "trabalhadores": self.fila.trabalhadores,
+                         "max_pendentes": self.fila.max_pendentes, "agrupados": self.fila.agrupados,
+                         "recusados": self.fila.recusados},
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: o cliente reaproveita a conexão
+    server_version = "GigFlowAPI/1"
+    servico: Servico = None
+    silencioso = False
+
+    def _responder(self, status, corpo: bytes, tipo: str, cabecalhos=None):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, status, obj, cabecalhos=None):
+        corpo = json.dumps(obj, ensure_ascii=False, default=json_default).encode("utf-8")
+        self._responder(status, corpo, "application/json; charset=utf-8", cabecalhos)
+
+    def _erro(self, status, problemas, cabecalhos=None):
+        self._json(status, {"erro": status.phrase, "problemas": list(problemas)}, cabecalhos)
+
+    def _ler_corpo(self) -> bytes:
+        cabecalho = (self.headers.get("Content-Length") or "0").strip()
+        if not cabecalho.isdigit():
+            # sem tamanho válido não dá para saber onde o corpo termina: a conexão é encerrada
+            self.close_connection = True
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, [f"Content-Length inválido: {cabecalho!r}"])
+        tamanho = int(cabecalho)
+        if tamanho > MAX_CORPO_BYTES:
+            self.close_connection = True
+            raise ErroRequisicao(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, [f"corpo acima de {MAX_CORPO_BYTES} bytes"])
+        return self.rfile.read(tamanho)
+
+    def _ler_json(self):
+        corpo = self._ler_corpo()
+        try:
+            return json.loads(corpo or b"null")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, [f"JSON inválido: {e}"]) from None
+
+    def do_GET(self):
+        if self.path == "/saude":
+            self._json(HTTPStatus.OK, self.servico.saude())
+        else:
+            self._erro(HTTPStatus.NOT_FOUND, [f"rota desconhecida: {self.path}"])
+
+    def do_POST(self):
+        # recusas também leem o corpo: a conexão keep-alive continua utilizável
+        if self.path != "/cotacao" and self.path not in DOCUMENTOS:
+            self._recusar(HTTPStatus.NOT_FOUND, [f"rota desconhecida: {self.path}"])
+            return
+        if not self.servico.entrar():
+            self._recusar(HTTPStatus.SERVICE_UNAVAILABLE, ["servidor ocupado, tente de novo"], {"Retry-After": "1"})
+            return
+        try:
+            self._atender()
+        except ErroRequisicao as e:
+            self._erro(e.status, e.problemas)
+        except FilaCheia as e:
+            self._erro(HTTPStatus.SERVICE_UNAVAILABLE, [str(e)], {"Retry-After": "1"})
+        except TimeoutError as e:
+            self._erro(HTTPStatus.GATEWAY_TIMEOUT, [str(e)])
+        except Exception as e:
+            self._erro(HTTPStatus.INTERNAL_SERVER_ERROR, [f"{type(e).__name__}: {e}"])
+        finally:
+            self.servico.sair()
+
+    def _recusar(self, status, problemas, cabecalhos=None):
+        try:
+            self._ler_corpo()
+        except ErroRequisicao:
+            pass
+        self._erro(status, problemas, cabecalhos)
+
+    def _atender(self):
+        rec = completar(self._ler_json())
+        if self.path == "/cotacao":
+            self._json(HTTPStatus.OK, cotacao(rec))
+            return
+        problemas = history_io.validar_registro(rec)
+        if problemas:
+            raise ErroRequisicao(HTTPStatus.UNPROCESSABLE_ENTITY, problemas)
+        tipo = DOCUMENTOS[self.path]
+        # montado antes da renderização: nenhum status é enviado com um cabeçalho inválido
+        disposicao = content_disposition(f"Rockbuzz_{'Orcamento' if tipo == 'orcamento' else 'Contrato'}_{rec['numero_proposta']}.pdf")
+        dados = self.servico.fila.gerar(tipo, rec, timeout=self.servico.timeout_pdf)
+        self._responder(HTTPStatus.OK, dados, "application/pdf", {"Content-Disposition": disposicao})
+
+    def log_message(self, formato, *args):
+        if not self.silencioso:
+            sys.stderr.write(f"[api] {self.address_string()} {formato % args}\n")
+
+
+def criar_servidor(host: str = "127.0.0.1", porta: int = 8600, servico: Servico | None = None,
+                   silencioso: bool = False) -> ThreadingHTTPServer:
+    """Servidor HTTP pronto para serve_forever() (porta 0: escolhe uma livre)"""
+    handler = type("Handler", (_Handler,), {"servico": servico or Servico(), "silencioso": silencioso})
+    servidor = ThreadingHTTPServer((host, porta), handler)
+    servidor.daemon_threads = True
+    return servidor
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="API HTTP local de cotação e PDFs de Orçamento/Contrato.")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço (padrão: %(default)s)")
+    parser.add_argument("--porta", type=int, default=8600, help="porta (padrão: %(default)s)")
+    parser.add_argument("--trabalhadores", type=int, default=MAX_TRABALHADORES, help="threads de renderização de PDF")
+    parser.add_argument("--max-requisicoes", type=int, default=MAX_REQUISICOES, help="requisições processadas ao mesmo tempo")
+    parser.add_argument("--silencioso", action="store_true", help="não registra cada requisição no stderr")
+    args = parser.parse_args(argv)
+    servico = Servico(FilaPDF(args.trabalhadores), args.max_requisicoes)
+    servidor = criar_servidor(args.host, args.porta, servico, args.silencioso)
+    print(f"API em http://{args.host}:{servidor.server_port} "
+          f"({args.trabalhadores} trabalhador(es) de PDF, até {args.max_requisicoes} requisições simultâneas)",
+          file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.fila.encerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
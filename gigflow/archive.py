@@ -0,0 +1,306 @@
+# Arquivo colunar do histórico (Parquet)
+# -------------------------------------------------------------------------------
+# Alternativa ao JSON para arquivar e analisar o histórico: um .zip com duas
+# tabelas Parquet,
+#   - propostas.parquet: uma linha por proposta, com os campos de topo e os
+#     sub-campos (contratante, banda, evento_info...) achatados em colunas
+#     tipadas (datas como date32/timestamp, valores como float64);
+#   - itens.parquet: uma linha por item, ligada à proposta por proposta_id.
+# Cada lote de LINHAS_POR_GRUPO propostas vira um row group (e os itens dele, o
+# row group de mesmo número em itens.parquet), com estatísticas
+# (mín./máx.) por coluna: ler_propostas() lê só as colunas pedidas (projeção) e
+# pula os row groups que os filtros descartam (predicate pushdown), ex.:
+#   ler_propostas(arq, ["id", "cidade", "cache_proposto"],
+#                 [("enviado", "=", True), ("cidade", "=", "Campinas/SP"),
+#                  ("data_evento", ">=", date(2026, 1, 1))])
+#
+# O arquivo é sem perdas: valores que não cabem no tipo da coluna (ou campos
+# fora do formato de make_record()) vão para a coluna `extras` como operações
+# no estilo de gigflow/versions.py (["=", caminho, valor] / ["-", caminho]).
+import io
+import json
+import zipfile
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from gigflow.utils import json_default
+
+ASSINATURA = b"PK\x03\x04"
+ARQUIVO_PROPOSTAS = "propostas.parquet"
+ARQUIVO_ITENS = "itens.parquet"
+LINHAS_POR_GRUPO = 4096
+COMPRESSAO = "zstd"
+
+_TEXTO, _INTEIRO, _REAL, _LOGICO = pa.string(), pa.int64(), pa.float64(), pa.bool_()
+_DATA, _MOMENTO = pa.date32(), pa.timestamp("s")
+
+# coluna -> (caminho no registro, tipo)
+COLUNAS_PROPOSTA = {
+    "id": (("id",), _TEXTO),
+    "created_at": (("created_at",), _MOMENTO),
+    "numero_proposta": (("numero_proposta",), _TEXTO),
+    "enviado": (("enviado",), _LOGICO),
+    "evento": (("evento",), _TEXTO),
+    "data_evento": (("data_evento",), _DATA),
+    "cidade": (("cidade",), _TEXTO),
+    "custo_total": (("custo_total",), _REAL),
+    "margem_pct": (("margem_pct",), _REAL),
+    "cache_proposto": (("cache_proposto",), _REAL),
+    "validade_dias": (("validade_dias",), _INTEIRO),
+    "validade_ate": (("validade_ate",), _DATA),
+    "cond_pagto": (("cond_pagto",), _TEXTO),
+    "observacoes": (("observacoes",), _TEXTO),
+    "contratante_nome": (("contratante", "nome"), _TEXTO),
+    "contratante_doc": (("contratante", "doc"), _TEXTO),
+    "contratante_email": (("contratante", "email"), _TEXTO),
+    "contratante_tel": (("contratante", "tel"), _TEXTO),
+    "contratante_end": (("contratante", "end"), _TEXTO),
+    "banda_razao": (("banda", "razao"), _TEXTO),
+    "banda_cnpj": (("banda", "cnpj"), _TEXTO),
+    "banda_resp_legal": (("banda", "resp_legal"), _TEXTO),
+    "banda_resp_banda": (("banda", "resp_banda"), _TEXTO),
+    "num_convidados": (("evento_info", "num_convidados"), _INTEIRO),
+    "hora_montagem": (("evento_info", "hora_montagem"), _TEXTO),
+    "hora_show": (("evento_info", "hora_show"), _TEXTO),
+    "local_apresentacao": (("evento_info", "local_apresentacao"), _TEXTO),
+    "resp_banda": (("responsabilidades", "banda"), _TEXTO),
+    "resp_contratante": (("responsabilidades", "contratante"), _TEXTO),
+    "equipe_integrantes": (("equipe", "integrantes"), _INTEIRO),
+    "equipe_apoio": (("equipe", "apoio"), _INTEIRO),
+    "equipe_acompanhantes": (("equipe", "acompanhantes"), _INTEIRO),
+    "energia_tomada": (("energia", "tomada"), _TEXTO),
+    "energia_tensao": (("energia", "tensao"), _TEXTO),
+    "energia_aterramento": (("energia", "aterramento"), _TEXTO),
+    "energia_dist_max": (("energia", "dist_max"), _TEXTO),
+    "multa_perc": (("multa_perc",), _INTEIRO),
+    "foro": (("foro",), _TEXTO),
+}
+COLUNAS_ITEM = {
+    "Item": (("Item",), _TEXTO),
+    "Descrição": (("Descrição",), _TEXTO),
+    "Quantidade": (("Quantidade",), _REAL),   # float64 como no data_editor (CalculoIncremental.df_calc)
+    "Custo Unitário (R$)": (("Custo Unitário (R$)",), _REAL),
+    "Total (R$)": (("Total (R$)",), _REAL),
+    "Incluir": (("Incluir",), _LOGICO),
+}
+ESQUEMA_PROPOSTAS = pa.schema(
+    [(coluna, tipo) for coluna, (_, tipo) in COLUNAS_PROPOSTA.items()] + [("extras", _TEXTO)]
+)
+ESQUEMA_ITENS = pa.schema(
+    [("proposta_id", _TEXTO), ("posicao", pa.int32())]
+    + [(coluna, tipo) for coluna, (_, tipo) in COLUNAS_ITEM.items()] + [("extras", _TEXTO)]
+)
+# blocos de topo achatados em colunas
+_BLOCOS = tuple(dict.fromkeys(caminho[0] for caminho, _ in COLUNAS_PROPOSTA.values() if len(caminho) == 2))
+_CAMINHOS_PROPOSTA = frozenset(caminho for caminho, _ in COLUNAS_PROPOSTA.values())
+_CAMINHOS_ITEM = frozenset(caminho for caminho, _ in COLUNAS_ITEM.values())
+
+
+# =========================
+# Escrita
+# =========================
+def _coluna(valor, tipo):
+    """Valor convertido para a coluna, ou None se não cabe nela sem perda (vai para `extras`)"""
+    if tipo == _TEXTO:
+        return valor if isinstance(valor, str) else None
+    if tipo == _LOGICO:
+        return valor if isinstance(valor, bool) else None
+    if tipo == _INTEIRO:
+        return valor if isinstance(valor, int) and not isinstance(valor, bool) and -2**63 <= valor < 2**63 else None
+    if tipo == _REAL:
+        return valor if isinstance(valor, float) else None
+    if not isinstance(valor, str):
+        return None
+    try:
+        if tipo == _DATA:
+            convertido = date.fromisoformat(valor)
+        else:
+            convertido = datetime.fromisoformat(valor)
+            if convertido.tzinfo is not None or convertido.microsecond:
+                return None
+    except ValueError:
+        return None
+    return convertido if convertido.isoformat() == valor else None
+
+def _achatar(obj, colunas, caminhos, valores, extras, blocos=(), ignorar=()):
+    """Acrescenta em `valores` (coluna -> lista) os campos de `obj`; o que não cabe vai para `extras`"""
+    for coluna, (caminho, tipo) in colunas.items():
+        dono = obj if len(caminho) == 1 else obj.get(caminho[0])
+        if not isinstance(dono, dict) or caminho[-1] not in dono:
+            valores[coluna].append(None)
+            continue
+        valor = dono[caminho[-1]]
+        convertido = _coluna(valor, tipo)
+        valores[coluna].append(convertido)
+        if convertido is None:
+            extras.append(["=", list(caminho), valor])
+    for chave, valor in obj.items():
+        if (chave,) in caminhos or chave in ignorar:
+            continue
+        if chave in blocos:
+            # blocos achatados: guarda inteiro o que não é dict e as sub-chaves fora do formato
+            if not isinstance(valor, dict):
+                extras.append(["=", [chave], valor])
+                continue
+            if not valor:
+                extras.append(["=", [chave], {}])
+            extras.extend(["=", [chave, sub], v] for sub, v in valor.items() if (chave, sub) not in caminhos)
+        else:
+            extras.append(["=", [chave], valor])
+
+def _extras(extras):
+    return json.dumps(extras, ensure_ascii=False, default=json_default) if extras else None
+
+class _Escritor:
+    """Acumula um lote de propostas e itens e grava cada lote como um row group"""
+
+    def __init__(self, propostas, itens):
+        self._propostas = pq.ParquetWriter(propostas, ESQUEMA_PROPOSTAS, compression=COMPRESSAO)
+        self._itens = pq.ParquetWriter(itens, ESQUEMA_ITENS, compression=COMPRESSAO)
+        self._limpar()
+
+    def _limpar(self):
+        self.pendentes = 0
+        self._valores = {campo.name: [] for campo in ESQUEMA_PROPOSTAS}
+        self._valores_itens = {campo.name: [] for campo in ESQUEMA_ITENS}
+
+    def incluir(self, rec):
+        extras = []
+        _achatar(rec, COLUNAS_PROPOSTA, _CAMINHOS_PROPOSTA, self._valores, extras, _BLOCOS, ("itens",))
+        itens = rec.get("itens")
+        if "itens" not in rec:
+            extras.append(["-", ["itens"]])
+        elif not isinstance(itens, list) or not all(isinstance(item, dict) for item in itens):
+            extras.append(["=", ["itens"], itens])
+        else:
+            for posicao, item in enumerate(itens):
+                extras_item = []
+                self._valores_itens["proposta_id"].append(rec.get("id"))
+                self._valores_itens["posicao"].append(posicao)
+                _achatar(item, COLUNAS_ITEM, _CAMINHOS_ITEM, self._valores_itens, extras_item)
+                self._valores_itens["extras"].append(_extras(extras_item))
+        self._valores["extras"].append(_extras(extras))
+        self.pendentes += 1
+
+    def gravar(self):
+        if self.pendentes:
+            self._propostas.write_table(pa.table(self._valores, schema=ESQUEMA_PROPOSTAS))
+            itens = pa.table(self._valores_itens, schema=ESQUEMA_ITENS)
+            # um row group por lote também nos itens (iterar_registros lê os dois pelo número do grupo)
+            self._itens.write_table(itens, row_group_size=max(itens.num_rows, 1))
+            self._limpar()
+
+    def fechar(self):
+        self.gravar()
+        self._propostas.close()
+        self._itens.close()
+
+
+def escrever(registros, destino) -> int:
+    """Escreve os registros de make_record() em `destino` (binário) como .zip com as duas tabelas Parquet"""
+    propostas, itens = io.BytesIO(), io.BytesIO()
+    escritor = _Escritor(propostas, itens)
+    n = 0
+    for rec in registros:
+        escritor.incluir(rec)
+        n += 1
+        if escritor.pendentes >= LINHAS_POR_GRUPO:
+            escritor.gravar()
+    escritor.fechar()
+    # o Parquet já vem comprimido: o zip só empacota (e o arquivo sai idêntico para o mesmo conteúdo)
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nome, buffer in ((ARQUIVO_PROPOSTAS, propostas), (ARQUIVO_ITENS, itens)):
+            zf.writestr(zipfile.ZipInfo(nome, date_time=(1980, 1, 1, 0, 0, 0)), buffer.getvalue())
+    return n
+
+
+# =========================
+# Leitura
+# =========================
+def _tabelas(arquivo):
+    """Buffers Parquet (propostas, itens) de um .zip (caminho, bytes ou arquivo binário)"""
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = io.BytesIO(arquivo)
+    try:
+        with zipfile.ZipFile(arquivo) as zf:
+            return pa.py_buffer(zf.read(ARQUIVO_PROPOSTAS)), pa.py_buffer(zf.read(ARQUIVO_ITENS))
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f"arquivo Parquet do histórico inválido: {e}") from None
+
+def _ler(buffer, colunas, filtros):
+    return pq.read_table(pa.BufferReader(buffer), columns=colunas, filters=filtros or None)
+
+def ler_propostas(arquivo, colunas=None, filtros=None) -> pa.Table:
+    """Tabela de propostas, só com `colunas` e só as linhas que passam pelos `filtros` (formato de pq.read_table)"""
+    return _ler(_tabelas(arquivo)[0], colunas, filtros)
+
+def ler_itens(arquivo, ids=None, colunas=None) -> pa.Table:
+    """Tabela de itens, opcionalmente só das propostas `ids`"""
+    filtros = [("proposta_id", "in", list(ids))] if ids is not None else None
+    if colunas is not None and "proposta_id" not in colunas:
+        colunas = ["proposta_id", *colunas]
+    return _ler(_tabelas(arquivo)[1], colunas, filtros)
+
+def _texto(valor):
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+
+def _montar(colunas, linha):
+    """Registro (ou item) a partir dos valores das colunas"""
+    obj = {}
+    for (caminho, _), valor in zip(colunas.values(), linha):
+        if valor is None:
+            continue
+        if len(caminho) == 1:
+            obj[caminho[0]] = _texto(valor)
+        else:
+            obj.setdefault(caminho[0], {})[caminho[1]] = valor
+    return obj
+
+def _aplicar(obj, extras):
+    """Aplica as operações da coluna `extras`"""
+    for op in json.loads(extras) if extras else ():
+        *dono, chave = op[1]
+        alvo = obj.setdefault(dono[0], {}) if dono else obj
+        if op[0] == "-":
+            alvo.pop(chave, None)
+        else:
+            alvo[chave] = op[2]
+    return obj
+
+def _linhas(tabela, colunas):
+    return zip(*(tabela.column(c).to_pylist() for c in colunas))
+
+def iterar_registros(arquivo, filtros=None):
+    """Gera (nº, registro no formato de make_record()) das propostas que passam pelos `filtros`
+
+    Lê um row group por vez: o escritor grava cada lote de propostas e os itens
+    dele no row group de mesmo número das duas tabelas, então só um lote fica
+    em memória como objetos Python.
+    """
+    buffer_propostas, buffer_itens = _tabelas(arquivo)
+    filtro = pq.filters_to_expression(filtros) if filtros else None
+    propostas = ds.ParquetFileFormat().make_fragment(pa.BufferReader(buffer_propostas))
+    itens = pq.ParquetFile(pa.BufferReader(buffer_itens))
+    if itens.num_row_groups != propostas.num_row_groups:
+        raise ValueError("arquivo Parquet do histórico inválido: propostas e itens com row groups diferentes")
+
+    n = 0
+    # split_by_row_group já descarta os row groups que as estatísticas excluem
+    for grupo in propostas.split_by_row_group(filtro):
+        tabela = grupo.to_table(filter=filtro)
+        if not tabela.num_rows:
+            continue
+        ids = set(tabela.column("id").to_pylist())
+        por_proposta = {}
+        itens_grupo = itens.read_row_group(grupo.row_groups[0].id)
+        for proposta_id, *linha, extras in _linhas(itens_grupo, ["proposta_id", *COLUNAS_ITEM, "extras"]):
+            if proposta_id in ids:
+                por_proposta.setdefault(proposta_id, []).append(_aplicar(_montar(COLUNAS_ITEM, linha), extras))
+        for *linha, extras in _linhas(tabela, [*COLUNAS_PROPOSTA, "extras"]):
+            n += 1
+            rec = _montar(COLUNAS_PROPOSTA, linha)
+            rec["itens"] = por_proposta.get(rec.get("id"), [])
+            yield n, _aplicar(rec, extras)
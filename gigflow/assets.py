@@ -0,0 +1,101 @@
+# Logo da Rockbuzz em tamanhos prontos para a tela e para os PDFs
+# -------------------------------------------------------------------------------
+# O PNG original tem 4724x4724 px (~1,4 MB). As variantes geradas a partir dele
+# ficam em memória:
+#   - sidebar: PNG de 256 cores na largura da barra lateral (2x para telas
+#     retina), que o st.image repassa ao navegador sem redimensionar nem
+#     recodificar; a URL gerada é estável, então o navegador guarda em cache
+#   - impressão: JPEG pequeno sobre um selo escuro (o logo foi feito para
+#     fundo escuro) na resolução de impressão do cabeçalho dos PDFs
+# Pillow só é importado quando alguma variante precisa ser gerada.
+#
+# Decodificar e reduzir o original leva ~2 s (e ocupa ~90 MB enquanto isso), então
+# as variantes também são gravadas em disco (PASTA_CACHE), com o tamanho/mtime do original na chave: um
+# processo novo só lê o arquivo pronto. `python -m gigflow.assets` gera tudo de
+# antemão (ex.: no build da imagem do container).
+import functools
+import hashlib
+import os
+from io import BytesIO
+from pathlib import Path
+
+LOGO_PADRAO = Path(__file__).resolve().parent.parent / "LOGO DEFINITIVO FUNDO ESCURO.png"
+PASTA_CACHE = Path(os.environ.get("ROCKBUZZ_CACHE") or Path(__file__).resolve().parent.parent / ".cache" / "assets")
+
+LARGURA_SIDEBAR_PX = 600         # ~300 px de barra lateral x 2 (retina)
+LOGO_PDF_PT = 56                 # lado do logo no cabeçalho dos PDFs (pontos)
+LOGO_PDF_DPI = 200
+COR_SELO = (17, 17, 17)
+
+
+def _original(caminho=LOGO_PADRAO):
+    """Logo decodificado e recortado na área visível"""
+    from PIL import Image
+
+    with Image.open(caminho) as img:
+        img = img.convert("RGBA")
+        return img.crop(img.getbbox() or (0, 0, *img.size))
+
+def _redimensionar(img, largura: int):
+    from PIL import Image
+
+    altura = max(1, round(img.height * largura / img.width))
+    return img.resize((largura, altura), Image.LANCZOS)
+
+def _em_disco(nome: str, gerar, caminho, *parametros) -> bytes:
+    """Variante lida de PASTA_CACHE; gerada e gravada se ausente ou se o original mudou"""
+    info = Path(caminho).stat()
+    chave = hashlib.sha1(repr((str(caminho), info.st_size, info.st_mtime_ns, parametros)).encode()).hexdigest()[:16]
+    arquivo = PASTA_CACHE / f"{nome}-{chave}"
+    try:
+        return arquivo.read_bytes()
+    except OSError:
+        pass
+    dados = gerar(caminho, *parametros)
+    try:
+        PASTA_CACHE.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo.with_name(f"{arquivo.name}.{os.getpid()}.tmp")
+        temporario.write_bytes(dados)
+        temporario.replace(arquivo)
+    except OSError:
+        pass  # sem permissão de escrita: fica só o cache em memória
+    return dados
+
+@functools.lru_cache(maxsize=8)
+def logo_sidebar(largura: int = LARGURA_SIDEBAR_PX, caminho=LOGO_PADRAO) -> bytes:
+    """PNG (paleta de 256 cores, com transparência) na largura da barra lateral"""
+    return _em_disco("sidebar.png", _gerar_sidebar, caminho, largura)
+
+@functools.lru_cache(maxsize=8)
+def logo_impressao(lado_pt: int = LOGO_PDF_PT, dpi: int = LOGO_PDF_DPI, caminho=LOGO_PADRAO) -> bytes:
+    """JPEG quadrado do logo sobre selo escuro, no tamanho de impressão"""
+    return _em_disco("impressao.jpg", _gerar_impressao, caminho, lado_pt, dpi)
+
+def _gerar_sidebar(caminho, largura):
+    from PIL import Image
+
+    img = _redimensionar(_original(caminho), largura)
+    img = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+    buffer = BytesIO()
+    img.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+def _gerar_impressao(caminho, lado_pt, dpi):
+    from PIL import Image, ImageDraw
+
+    lado = round(lado_pt / 72 * dpi)
+    logo = _original(caminho).copy()
+    logo.thumbnail((round(lado * 0.86),) * 2, Image.LANCZOS)
+    selo = Image.new("RGBA", (lado, lado), (255, 255, 255, 255))
+    ImageDraw.Draw(selo).rounded_rectangle((0, 0, lado - 1, lado - 1), radius=lado // 8, fill=COR_SELO)
+    selo.alpha_composite(logo, ((lado - logo.width) // 2, (lado - logo.height) // 2))
+    buffer = BytesIO()
+    selo.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    # Pré-gera as variantes em PASTA_CACHE (build/deploy)
+    for nome, dados in (("sidebar", logo_sidebar()), ("impressao", logo_impressao())):
+        print(f"{nome}: {len(dados) / 1024:.1f} KB")
+    print(f"cache: {PASTA_CACHE}")
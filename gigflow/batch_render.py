@@ -0,0 +1,142 @@
+# Renderização em lote de Orçamentos e Contratos
+# -------------------------------------------------------------------------------
+# Uso:
+#   python -m gigflow.batch_render --saida documentos.zip --status enviado --desde 2026-01-01
+#   python -m gigflow.batch_render --entrada rockbuzz_historico.ndjson.gz --cidade "Jundiaí/SP"
+#
+# Lê as propostas do histórico persistente (padrão) ou de um arquivo exportado
+# em qualquer formato do app (JSON, NDJSON, versões em delta, Parquet), aplica
+# os filtros e renderiza os PDFs em paralelo, um processo por núcleo (o
+# ReportLab é CPU-bound e single-thread). Tudo vai para um único ZIP e o
+# progresso, com o tempo de cada arquivo, sai no stderr.
+import argparse
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+
+from gigflow import history_io, pdf
+from gigflow.store import CAMINHO_PADRAO, HistoryStore
+
+TIPOS = {
+    "orcamento": ("Rockbuzz_Orcamento", pdf.gerar_pdf_orcamento),
+    "contrato": ("Rockbuzz_Contrato", pdf.gerar_pdf_contrato),
+}
+
+
+def _nome_seguro(texto) -> str:
+    return re.sub(r"[^\w.-]+", "_", str(texto or "sem_numero")).strip("_") or "sem_numero"
+
+def renderizar(rec, tipos):
+    """Renderiza os documentos de uma proposta; retorna [(caminho no zip, bytes, segundos)]"""
+    pasta = f"{_nome_seguro(rec.get('numero_proposta'))}_{rec['id'][:8]}"
+    saida = []
+    for tipo in tipos:
+        prefixo, gerador = TIPOS[tipo]
+        inicio = time.perf_counter()
+        conteudo = gerador(rec).getvalue()
+        saida.append((f"{pasta}/{prefixo}_{_nome_seguro(rec.get('numero_proposta'))}.pdf", conteudo, time.perf_counter() - inicio))
+    return saida
+
+def _passa_filtro(rec, args) -> bool:
+    if args.status and bool(rec.get("enviado")) != (args.status == "enviado"):
+        return False
+    if args.cidade and rec.get("cidade") not in args.cidade:
+        return False
+    if args.desde and rec.get("data_evento", "") < str(args.desde):
+        return False
+    if args.ate and rec.get("data_evento", "") > str(args.ate):
+        return False
+    if args.numero and not str(rec.get("numero_proposta", "")).startswith(args.numero):
+        return False
+    return True
+
+def selecionar(args):
+    """Registros que passam pelos filtros, do arquivo de entrada ou do histórico persistente"""
+    if args.entrada:
+        with open(args.entrada, "rb") as arquivo:
+            for n, rec in history_io.ler_registros(arquivo):
+                if isinstance(rec, Exception) or history_io.validar_registro(rec):
+                    print(f"registro {n} ignorado (inválido)", file=sys.stderr)
+                elif _passa_filtro(rec, args):
+                    yield rec
+        return
+    store = HistoryStore(args.db)
+    filtros = dict(
+        enviado=None if not args.status else args.status == "enviado",
+        cidades=args.cidade, data_de=args.desde, data_ate=args.ate,
+    )
+    for rec_id in store.consultar(ordem="created_at", desc=False, limite=-1, **filtros):
+        rec = store.obter(rec_id)
+        if rec is not None and _passa_filtro(rec, args):
+            yield rec
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def executar(args) -> int:
+    registros = list(selecionar(args))
+    if not registros:
+        print("Nenhuma proposta encontrada com esses filtros.", file=sys.stderr)
+        return 1
+    total = len(registros) * len(args.documentos)
+    print(f"{len(registros)} proposta(s), {total} documento(s), {args.workers} worker(s)", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    tempos, feitos, tamanho = [], 0, 0
+    pendentes = iter(registros)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, \
+            zipfile.ZipFile(args.saida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # mantém no máximo 4 tarefas por worker em voo para não acumular PDFs em memória
+        em_voo = set()
+        while True:
+            while len(em_voo) < args.workers * 4:
+                rec = next(pendentes, None)
+                if rec is None:
+                    break
+                em_voo.add(pool.submit(renderizar, rec, args.documentos))
+            if not em_voo:
+                break
+            prontos, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                for caminho, conteudo, segundos in futuro.result():
+                    zf.writestr(caminho, conteudo)
+                    feitos += 1
+                    tamanho += len(conteudo)
+                    tempos.append(segundos)
+                    print(f"[{feitos}/{total}] {caminho} ({segundos * 1000:.0f} ms, {len(conteudo) / 1024:.1f} KB)", file=sys.stderr)
+
+    decorrido = time.perf_counter() - inicio
+    print(
+        f"Concluído em {decorrido:.2f} s ({total / decorrido:.1f} docs/s) -> {args.saida}\n"
+        f"Render por arquivo: média {sum(tempos) / len(tempos) * 1000:.0f} ms, "
+        f"p50 {_percentil(tempos, 50) * 1000:.0f} ms, p95 {_percentil(tempos, 95) * 1000:.0f} ms; "
+        f"PDFs somam {tamanho / 1024:.0f} KB",
+        file=sys.stderr,
+    )
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Renderiza em lote os PDFs de Orçamento e Contrato do histórico.")
+    fonte = parser.add_mutually_exclusive_group()
+    fonte.add_argument(
+        "--entrada", help="arquivo exportado do histórico (JSON, NDJSON, .gz, versões em delta ou Parquet .zip)",
+    )
+    fonte.add_argument("--db", default=CAMINHO_PADRAO, help="histórico persistente SQLite (padrão: %(default)s)")
+    parser.add_argument("--saida", default="rockbuzz_documentos.zip", help="ZIP de saída (padrão: %(default)s)")
+    parser.add_argument("--status", choices=["enviado", "rascunho"], help="só propostas com este status")
+    parser.add_argument("--cidade", action="append", help="só propostas desta cidade (pode repetir)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="data do evento a partir de (AAAA-MM-DD)")
+    parser.add_argument("--ate", type=date.fromisoformat, help="data do evento até (AAAA-MM-DD)")
+    parser.add_argument("--numero", help="prefixo do número da proposta")
+    parser.add_argument("--documentos", nargs="+", choices=list(TIPOS), default=list(TIPOS), help="documentos a gerar")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos em paralelo (padrão: nº de CPUs)")
+    return executar(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
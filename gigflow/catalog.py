@@ -0,0 +1,358 @@
+# Catálogo de preços de fornecedores (índice em memória)
+# -------------------------------------------------------------------------------
+# gigflow/data/catalogo.csv (ou o arquivo em ROCKBUZZ_CATALOGO) traz um preço por
+# linha: a linha da tabela de itens que ele preenche (coluna "Item" sem o número,
+# ex.: "Som/Luz Kiko"), fornecedor, descrição, custo unitário, quantidade
+# sugerida, faixa de público (convidados_min/convidados_max) e vigência
+# (valido_de/valido_ate). Campos de faixa e vigência vazios = sem limite.
+#
+# O índice é montado uma vez por processo (get_catalogo() no app, com
+# st.cache_resource) no mesmo formato do de gigflow/search.py: termos de linha,
+# fornecedor e descrição -> preços, com o vocabulário ordenado para casar cada
+# termo da busca por prefixo com bisect. Termos sem nenhum prefixo no
+# vocabulário caem na busca aproximada (difflib), para erros de digitação. Por
+# linha da tabela os preços ficam ordenados da faixa de público mais estreita
+# para a mais larga: escolher o preço para o número de convidados não varre o
+# catálogo.
+#
+# recarregar() confere a data de modificação do arquivo (no máximo a cada
+# INTERVALO_RECARGA segundos) e, se ele mudou, relê o CSV e aplica só a
+# diferença, comparando as linhas do arquivo como texto: as removidas ou
+# alteradas saem do índice e só as novas são convertidas e indexadas, sem
+# reiniciar o servidor. Um arquivo com erro (ex.: salvo pela metade) é ignorado e
+# o catálogo anterior continua valendo.
+import bisect
+import csv
+import difflib
+import functools
+import heapq
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from operator import itemgetter
+from pathlib import Path
+
+import pandas as pd
+
+from gigflow.search import termos
+from gigflow.utils import brl, normalizar, parse_data
+
+ARQUIVO_CATALOGO = Path(os.environ.get("ROCKBUZZ_CATALOGO") or Path(__file__).resolve().parent / "data" / "catalogo.csv")
+INTERVALO_RECARGA = 5.0       # segundos entre verificações do arquivo
+SIMILARIDADE_MINIMA = 0.75    # difflib, para termos com erro de digitação
+SEM_LIMITE = 10**9
+
+COLUNAS = ("linha", "fornecedor", "descricao", "custo_unitario", "quantidade",
+           "convidados_min", "convidados_max", "valido_de", "valido_ate")
+# colunas da tabela de itens que um preço do catálogo preenche
+COLUNAS_PRECO = ["Descrição", "Quantidade", "Custo Unitário (R$)", "Incluir"]
+
+_NUMERO_ITEM = re.compile(r"^\d+\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def chave_linha(item) -> str:
+    """Linha da tabela normalizada e sem o número ("8. Som/Luz Kiko" -> "som luz kiko")"""
+    return _NUMERO_ITEM.sub("", normalizar(item or ""))
+
+
+@dataclass(frozen=True)
+class Preco:
+    """Preço de um fornecedor para uma linha da tabela de itens"""
+    linha: str
+    fornecedor: str
+    descricao: str
+    custo_unitario: float
+    quantidade: int = 0
+    convidados_min: int = 0
+    convidados_max: int | None = None
+    valido_de: date | None = None
+    valido_ate: date | None = None
+
+    @property
+    def por_faixa(self) -> bool:
+        return self.convidados_min > 1 or self.convidados_max is not None
+
+    @property
+    def faixa(self) -> str:
+        if self.convidados_max is None:
+            return f"acima de {self.convidados_min - 1} pessoas" if self.convidados_min > 1 else "qualquer público"
+        if self.convidados_min <= 1:
+            return f"até {self.convidados_max} pessoas"
+        return f"{self.convidados_min} a {self.convidados_max} pessoas"
+
+    @property
+    def rotulo(self) -> str:
+        return f"{self.linha} · {self.fornecedor} · {brl(self.custo_unitario)} ({self.faixa})"
+
+    def atende(self, convidados: int) -> bool:
+        return self.convidados_min <= convidados and (self.convidados_max is None or convidados <= self.convidados_max)
+
+    def vigente(self, dia: date) -> bool:
+        return (self.valido_de is None or self.valido_de <= dia) and (self.valido_ate is None or dia <= self.valido_ate)
+
+
+def _especificidade(preco: Preco):
+    # faixa mais estreita primeiro; empate: a que começa mais alto, depois o menor custo
+    largura = (SEM_LIMITE if preco.convidados_max is None else preco.convidados_max) - preco.convidados_min
+    return largura, -preco.convidados_min, preco.custo_unitario
+
+def _inteiro(valor, padrao=None):
+    return int(valor) if valor else padrao
+
+@functools.lru_cache(maxsize=1024)
+def _data(valor):
+    return parse_data(valor) if valor else None
+
+def linhas_csv(arquivo=ARQUIVO_CATALOGO) -> list:
+    """Linhas do arquivo como tuplas de texto na ordem de COLUNAS (sem o cabeçalho; linhas em branco viram campos vazios)"""
+    with open(arquivo, encoding="utf-8", newline="") as f:
+        leitor = csv.reader(f)
+        cabecalho = [normalizar(coluna).replace(" ", "_") for coluna in next(leitor, [])]
+        faltando = [coluna for coluna in ("linha", "custo_unitario") if coluna not in cabecalho]
+        if faltando:
+            raise ValueError(f"{Path(arquivo).name}: faltam as colunas {', '.join(faltando)}")
+        # colunas ausentes (ou linhas mais curtas que o cabeçalho) leem o "" do complemento
+        vazio = [""] * (len(cabecalho) + 1)
+        pegar = itemgetter(*(cabecalho.index(coluna) if coluna in cabecalho else -1 for coluna in COLUNAS))
+        return [pegar(campos + vazio) for campos in leitor]
+
+def preco_de(campos) -> Preco:
+    """Preço de uma linha de linhas_csv()"""
+    linha, fornecedor, descricao, custo, quantidade, minimo, maximo, de, ate = (campo.strip() for campo in campos)
+    if not linha:
+        raise ValueError("linha vazia")
+    return Preco(
+        linha, fornecedor, descricao, float(custo), _inteiro(quantidade, 0), _inteiro(minimo, 0), _inteiro(maximo),
+        _data(de), _data(ate),
+    )
+
+def termos_preco(preco: Preco) -> frozenset:
+    """Termos indexáveis de um preço: linha, fornecedor e descrição"""
+    return frozenset(termos(preco.linha) + termos(preco.fornecedor) + termos(preco.descricao))
+
+
+class Catalogo:
+    """Índice dos preços do catálogo, com busca por prefixo/aproximada e recarga incremental"""
+
+    def __init__(self, arquivo=ARQUIVO_CATALOGO, intervalo: float = INTERVALO_RECARGA):
+        self.arquivo = Path(arquivo)
+        self.intervalo = intervalo
+        self.erro = None
+        self._precos = {}         # id -> Preco
+        self._origem = {}         # linha do CSV (tupla) -> id
+        self._ids = {}            # termo -> set de ids
+        self._termos = {}         # id -> frozenset de termos
+        self._vocabulario = []    # termos em ordem (para o prefixo)
+        self._linhas = {}         # chave_linha -> [id] da faixa mais estreita para a mais larga
+        self._proximo_id = 0
+        self._lock = threading.Lock()
+        self._assinatura = None   # (mtime, tamanho) do arquivo lido por último
+        self._verificado_em = 0.0
+        self.recarregar(forcar=True)
+
+    def __len__(self):
+        return len(self._precos)
+
+    def _incluir(self, campos, preco):
+        rec_id = self._proximo_id
+        self._proximo_id += 1
+        self._precos[rec_id] = preco
+        self._origem[campos] = rec_id
+        novos = self._termos[rec_id] = termos_preco(preco)
+        for termo in novos:
+            ids = self._ids.get(termo)
+            if ids is None:
+                ids = self._ids[termo] = set()
+                self._vocabulario.append(termo)
+            ids.add(rec_id)
+        self._linhas.setdefault(chave_linha(preco.linha), []).append(rec_id)
+
+    def _excluir(self, campos):
+        rec_id = self._origem.pop(campos)
+        preco = self._precos.pop(rec_id)
+        for termo in self._termos.pop(rec_id):
+            ids = self._ids[termo]
+            ids.discard(rec_id)
+            if not ids:
+                del self._ids[termo]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, termo)]
+        chave = chave_linha(preco.linha)
+        self._linhas[chave].remove(rec_id)
+        if not self._linhas[chave]:
+            del self._linhas[chave]
+
+    def aplicar(self, linhas) -> tuple[int, int]:
+        """Deixa o índice com exatamente estas linhas do CSV, mexendo só nas que mudaram; (incluídas, removidas)
+
+        Só as linhas novas são convertidas em Preco; com alguma inválida (ValueError)
+        o índice não é alterado.
+        """
+        manter = set(linhas)
+        with self._lock:
+            pendentes = manter - self._origem.keys()
+        novas = {}
+        for campos in pendentes:
+            if "".join(campos).strip():
+                try:
+                    novas[campos] = preco_de(campos)
+                except ValueError as e:
+                    raise ValueError(f"{self.arquivo.name}, linha {linhas.index(campos) + 2}: {e}") from None
+        with self._lock:
+            removidas = self._origem.keys() - manter
+            for campos in removidas:
+                self._excluir(campos)
+            for campos, preco in novas.items():
+                if campos not in self._origem:   # outra recarga simultânea já pode ter incluído
+                    self._incluir(campos, preco)
+            if novas:
+                # termos e preços novos foram acrescentados no fim: o timsort só intercala o trecho fora de ordem
+                self._vocabulario.sort()
+                for chave in {chave_linha(preco.linha) for preco in novas.values()}:
+                    self._linhas[chave].sort(key=lambda rec_id: _especificidade(self._precos[rec_id]))
+        return len(novas), len(removidas)
+
+    def recarregar(self, forcar: bool = False) -> tuple[int, int]:
+        """Relê o arquivo se ele mudou desde a última leitura; (incluídos, removidos)"""
+        agora = time.monotonic()
+        if not forcar and agora - self._verificado_em < self.intervalo:
+            return 0, 0
+        self._verificado_em = agora
+        try:
+            estado = self.arquivo.stat()
+            assinatura = (estado.st_mtime_ns, estado.st_size)
+            if not forcar and assinatura == self._assinatura:
+                return 0, 0
+            mudancas = self.aplicar(linhas_csv(self.arquivo))
+        except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+            self.erro = f"{type(e).__name__}: {e}"
+            return 0, 0
+        self.erro = None
+        self._assinatura = assinatura
+        return mudancas
+
+    def _prefixo(self, termo) -> set:
+        """Ids com algum termo que começa com `termo`"""
+        inicio = bisect.bisect_left(self._vocabulario, termo)
+        fim = bisect.bisect_left(self._vocabulario, termo + "\uffff", inicio)
+        encontrados = set()
+        for vocabulo in self._vocabulario[inicio:fim]:
+            encontrados |= self._ids[vocabulo]
+        return encontrados
+
+    def _parecidos(self, termo) -> list:
+        """Termos do vocabulário parecidos com `termo` (mesma inicial e tamanho próximo: erro de digitação)"""
+        inicio = bisect.bisect_left(self._vocabulario, termo[0])
+        fim = bisect.bisect_left(self._vocabulario, termo[0] + "\uffff", inicio)
+        candidatos = [v for v in self._vocabulario[inicio:fim] if abs(len(v) - len(termo)) <= 2]
+        return difflib.get_close_matches(termo, candidatos, n=3, cutoff=SIMILARIDADE_MINIMA)
+
+    def _pesos(self, termo, candidatos=None) -> dict:
+        """Peso de cada id para um termo da busca: 3 igual, 2 prefixo, 1 aproximado
+
+        Com `candidatos` (ids que casaram com os termos anteriores) confere só os
+        termos de cada um, sem percorrer o vocabulário.
+        """
+        if candidatos is None:
+            exatos = self._ids.get(termo, ())
+            pesos = {rec_id: 3 if rec_id in exatos else 2 for rec_id in self._prefixo(termo)}
+        else:
+            pesos = {}
+            for rec_id in candidatos:
+                proprios = self._termos[rec_id]
+                if termo in proprios:
+                    pesos[rec_id] = 3
+                elif any(t.startswith(termo) for t in proprios):
+                    pesos[rec_id] = 2
+        if not pesos:
+            for vocabulo in self._parecidos(termo):
+                ids = self._ids[vocabulo] if candidatos is None else self._ids[vocabulo] & candidatos.keys()
+                pesos.update(dict.fromkeys(ids, 1))
+        return pesos
+
+    def buscar(self, consulta: str, convidados: int = 0, dia: date | None = None, limite: int = 8) -> list:
+        """Preços vigentes em `dia` com todos os termos da consulta (por prefixo ou aproximados)
+
+        Com `convidados` informado só entram as faixas de público que o atendem.
+        Termos iguais vêm antes dos casados por prefixo, e estes antes dos aproximados.
+        """
+        dia = dia or date.today()
+        pontos = None
+        with self._lock:
+            # termos mais longos primeiro: costumam casar com menos preços
+            for termo in sorted(termos(consulta), key=len, reverse=True):
+                pesos = self._pesos(termo, pontos)
+                pontos = pesos if pontos is None else {rec_id: pontos[rec_id] + peso for rec_id, peso in pesos.items()}
+                if not pontos:
+                    return []
+            precos = [
+                (pontos[rec_id], self._precos[rec_id]) for rec_id in pontos or ()
+                if self._precos[rec_id].vigente(dia) and (not convidados or self._precos[rec_id].atende(convidados))
+            ]
+        melhores = heapq.nsmallest(
+            limite, precos, key=lambda par: (-par[0], chave_linha(par[1].linha), _especificidade(par[1])),
+        )
+        return [preco for _, preco in melhores]
+
+    def escolher(self, item, convidados: int = 0, dia: date | None = None) -> Preco | None:
+        """Preço para a linha `item` da tabela: a faixa mais estreita que atende os convidados
+
+        Sem número de convidados só valem preços sem faixa de público.
+        """
+        dia = dia or date.today()
+        with self._lock:
+            for rec_id in self._linhas.get(chave_linha(item), ()):
+                preco = self._precos[rec_id]
+                if preco.vigente(dia) and (preco.atende(convidados) if convidados else not preco.por_faixa):
+                    return preco
+        return None
+
+    def tem_precos(self, item, dia: date | None = None) -> bool:
+        """Se a linha `item` tem algum preço vigente no catálogo"""
+        dia = dia or date.today()
+        with self._lock:
+            return any(self._precos[rec_id].vigente(dia) for rec_id in self._linhas.get(chave_linha(item), ()))
+
+
+# =========================
+# Tabela de itens
+# =========================
+def _valores(preco: Preco, quantidade) -> list:
+    if pd.isna(quantidade) or not quantidade:
+        quantidade = preco.quantidade
+    return [preco.descricao, quantidade, preco.custo_unitario, True]
+
+def preencher(df: pd.DataFrame, catalogo: Catalogo, convidados: int = 0, dia: date | None = None) -> pd.DataFrame:
+    """Cópia da tabela de itens com descrição e custo unitário do catálogo
+
+    Cada linha é achada pelo nome na coluna "Item" (sem o número). Linhas com
+    preço por faixa de público recebem o da faixa de `convidados`; as que têm
+    preço no catálogo mas nenhuma faixa para esse público saem do cálculo
+    (Incluir desmarcado). A quantidade sugerida só entra em linhas zeradas.
+    """
+    df = df.reset_index(drop=True).copy()
+    for i, item in df["Item"].items():
+        preco = catalogo.escolher(item, convidados, dia)
+        if preco is not None:
+            df.loc[i, COLUNAS_PRECO] = _valores(preco, df.at[i, "Quantidade"])
+        elif convidados and catalogo.tem_precos(item, dia):
+            df.loc[i, "Incluir"] = False
+    return df
+
+def incluir_preco(df: pd.DataFrame, preco: Preco) -> pd.DataFrame:
+    """Cópia da tabela com o preço aplicado à linha do mesmo item (ou numa linha nova no fim)"""
+    df = df.reset_index(drop=True).copy()
+    chave = chave_linha(preco.linha)
+    linhas = df.index[df["Item"].map(chave_linha) == chave]
+    if len(linhas):
+        i = linhas[0]
+        df.loc[i, COLUNAS_PRECO] = _valores(preco, df.at[i, "Quantidade"])
+    else:
+        df.loc[len(df)] = pd.Series(
+            {"Item": preco.linha, "Descrição": preco.descricao, "Quantidade": preco.quantidade,
+             "Custo Unitário (R$)": preco.custo_unitario, "Incluir": True}
+        )
+    return df
@@ -0,0 +1,169 @@
+# Índice offline de cidades e estimativa de deslocamento a partir da base (Jundiaí/SP)
+# -------------------------------------------------------------------------------
+# gigflow/data/cidades.csv traz as coordenadas das cidades onde a banda costuma
+# tocar (região de Jundiaí/Campinas, Grande SP, litoral, interior e capitais
+# próximas). Na primeira consulta do processo o arquivo é lido e a matriz de
+# distâncias de todas as cidades entre si é calculada de uma vez com NumPy: a
+# distância por estrada é estimada pela distância em linha reta (haversine) x
+# FATOR_ROTA. Nenhum serviço de rede é consultado.
+#
+# localizar() acha a cidade pelo texto do campo "Cidade/Local" sem depender de
+# acentos, maiúsculas ou da UF ("campinas", "Campinas - SP", "Salão X, Itu/SP")
+# e tolera erros de digitação. estimar() converte a distância nos custos das
+# linhas "3. Transporte", "4. Pedágio" e "5. Combustível". Os dois são
+# memorizados (lru_cache).
+import csv
+import difflib
+import functools
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gigflow.pricing import default_rows
+from gigflow.utils import normalizar
+
+ARQUIVO_CIDADES = Path(__file__).resolve().parent / "data" / "cidades.csv"
+BASE = "Jundiaí/SP"
+FATOR_ROTA = 1.3              # estrada / linha reta (média das rotas a partir da base)
+RAIO_TERRA_KM = 6371.0
+SIMILARIDADE_MINIMA = 0.8     # difflib, para nomes com erro de digitação
+
+# Linhas preenchidas: termo (normalizado) procurado na coluna "Item" -> posição em default_rows()
+LINHAS_DESLOCAMENTO = {"transporte": 2, "pedagio": 3, "combustivel": 4}
+
+
+@dataclass(frozen=True)
+class Cidade:
+    nome: str
+    uf: str
+    indice: int
+
+    @property
+    def rotulo(self) -> str:
+        return f"{self.nome}/{self.uf}"
+
+
+@dataclass(frozen=True)
+class Indice:
+    """Cidades do arquivo, chaves de busca e matriz de distâncias por estrada (km)"""
+    cidades: tuple
+    chaves: dict               # nome normalizado, com e sem UF -> Cidade
+    nomes: dict                # nome normalizado sem UF -> Cidade (busca aproximada)
+    ufs: frozenset
+    distancias_km: np.ndarray  # (cidades, cidades)
+
+
+@dataclass(frozen=True)
+class Deslocamento:
+    """Estimativa de ida e volta da base até o destino (valores por veículo, em reais)"""
+    origem: Cidade
+    destino: Cidade
+    km: float                  # só ida
+    veiculos: int
+    consumo_km_l: float
+    transporte: float
+    pedagio: float
+    combustivel: float
+
+
+@functools.lru_cache(maxsize=2)
+def indice(arquivo=ARQUIVO_CIDADES) -> Indice:
+    """Lê o arquivo de cidades e calcula a matriz de distâncias (uma vez por processo)"""
+    with open(arquivo, encoding="utf-8", newline="") as f:
+        linhas = list(csv.DictReader(f))
+    cidades = tuple(Cidade(linha["cidade"], linha["uf"].upper(), i) for i, linha in enumerate(linhas))
+    chaves, nomes = {}, {}
+    for cidade in cidades:
+        nome = normalizar(cidade.nome)
+        nomes.setdefault(nome, cidade)
+        chaves.setdefault(nome, cidade)
+        chaves[f"{nome} {cidade.uf.lower()}"] = cidade
+
+    lat = np.radians([float(linha["lat"]) for linha in linhas])
+    lon = np.radians([float(linha["lon"]) for linha in linhas])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    distancias = np.round(2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * FATOR_ROTA, 1)
+    distancias.setflags(write=False)
+    return Indice(
+        cidades=cidades, chaves=chaves, nomes=nomes,
+        ufs=frozenset(cidade.uf.lower() for cidade in cidades), distancias_km=distancias,
+    )
+
+def _sem_uf(chave: str, ufs) -> tuple[str, str | None]:
+    partes = chave.rsplit(" ", 1)
+    if len(partes) == 2 and partes[1] in ufs:
+        return partes[0], partes[1]
+    return chave, None
+
+def _aproximada(chave: str, idx: Indice) -> Cidade | None:
+    nome, uf = _sem_uf(chave, idx.ufs)
+    candidatos = [n for n, cidade in idx.nomes.items() if uf is None or cidade.uf.lower() == uf]
+    prefixados = [n for n in candidatos if n.startswith(nome)]
+    if len(prefixados) == 1:
+        return idx.nomes[prefixados[0]]
+    parecidos = difflib.get_close_matches(nome, candidatos, n=1, cutoff=SIMILARIDADE_MINIMA)
+    return idx.nomes[parecidos[0]] if parecidos else None
+
+@functools.lru_cache(maxsize=1024)
+def localizar(texto: str) -> Cidade | None:
+    """Cidade do índice correspondente ao texto digitado; None se nenhuma for parecida o bastante"""
+    idx = indice()
+    chave = normalizar(texto or "")
+    if not chave:
+        return None
+    if chave in idx.chaves:
+        return idx.chaves[chave]
+    # "Salão X, Campinas/SP", "Chácara Y - Itu": procura cada trecho, da direita para a esquerda
+    trechos = [normalizar(t) for t in reversed(re.split(r"[,;()\-–]", texto))]
+    for trecho in trechos:
+        if trecho in idx.chaves:
+            return idx.chaves[trecho]
+    for trecho in [chave, *trechos]:
+        if trecho and (cidade := _aproximada(trecho, idx)):
+            return cidade
+    return None
+
+@functools.lru_cache(maxsize=256)
+def estimar(cidade: str, veiculos: int = 2, consumo_km_l: float = 13.0, preco_litro: float = 6.0,
+            pedagio_km: float = 0.12, custo_km: float = 0.40, base: str = BASE) -> Deslocamento | None:
+    """Custos de ida e volta por veículo até `cidade`; None se a cidade (ou a base) não está no índice"""
+    origem, destino = localizar(base), localizar(cidade)
+    if origem is None or destino is None:
+        return None
+    km = float(indice().distancias_km[origem.indice, destino.indice])
+    ida_volta = 2 * km
+    return Deslocamento(
+        origem=origem, destino=destino, km=km, veiculos=int(veiculos), consumo_km_l=consumo_km_l,
+        transporte=round(ida_volta * custo_km, 2),
+        pedagio=round(ida_volta * pedagio_km, 2),
+        combustivel=round(ida_volta / consumo_km_l * preco_litro, 2) if consumo_km_l > 0 else 0.0,
+    )
+
+def preencher(df: pd.DataFrame, desl: Deslocamento) -> pd.DataFrame:
+    """Cópia da tabela de itens com as linhas de transporte, pedágio e combustível estimadas
+
+    As linhas são achadas pelo nome na coluna "Item"; as que tiverem sido removidas
+    voltam ao fim da tabela.
+    """
+    df = df.reset_index(drop=True).copy()
+    trajeto = f"{desl.origem.rotulo} → {desl.destino.rotulo}, {desl.km:.0f} km"
+    valores = {
+        "transporte": (desl.transporte, f"Ida/volta {trajeto} (por veículo)"),
+        "pedagio": (desl.pedagio, f"Pedágios ida/volta {trajeto} (estimativa por km)"),
+        "combustivel": (desl.combustivel, f"Ida/volta {trajeto} (média {desl.consumo_km_l:g} km/L)"),
+    }
+    itens = df["Item"].map(lambda item: normalizar(item or "")) if "Item" in df else pd.Series(dtype=str)
+    for termo, (custo, descricao) in valores.items():
+        linhas = itens.index[itens.str.contains(termo, regex=False)]
+        if len(linhas):
+            i = linhas[0]
+        else:
+            i = len(df)
+            df.loc[i] = pd.Series(default_rows()[LINHAS_DESLOCAMENTO[termo]])
+        df.loc[i, ["Descrição", "Quantidade", "Custo Unitário (R$)", "Incluir"]] = [descricao, desl.veiculos, custo, True]
+    return df
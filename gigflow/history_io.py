@@ -0,0 +1,397 @@
+# Exportação e importação do histórico de propostas
+# -------------------------------------------------------------------------------
+# O histórico é escrito registro a registro num arquivo de destino, sem montar a
+# string JSON inteira em memória. O formato padrão é NDJSON (um registro por
+# linha), opcionalmente comprimido com gzip; o JSON indentado continua disponível
+# para compatibilidade com as exportações antigas. A exportação compacta também é
+# NDJSON com gzip, mas com cada versão de uma proposta como diferença para a
+# versão anterior e os blocos repetidos escritos uma única vez (gigflow/versions.py).
+# Para arquivar e analisar anos de histórico há ainda o arquivo colunar: um .zip
+# com as tabelas Parquet de propostas e de itens (gigflow/archive.py).
+#
+# A importação lê os mesmos formatos (array JSON ou NDJSON, com ou sem gzip, com
+# ou sem versões em delta, ou o .zip Parquet) de forma incremental, valida cada registro contra o
+# formato de make_record() e mescla no histórico por id, reportando os erros
+# registro a registro.
+import gzip
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from io import BytesIO
+
+from gigflow import archive, versions
+from gigflow.utils import json_default
+
+# formato -> (rótulo, nome do arquivo, mime)
+FORMATOS_EXPORTACAO = {
+    "ndjson.gz": ("NDJSON comprimido (.ndjson.gz)", "rockbuzz_historico.ndjson.gz", "application/gzip"),
+    "versoes.ndjson.gz": ("Compacto: versões em delta (.ndjson.gz)", "rockbuzz_historico.versoes.ndjson.gz", "application/gzip"),
+    "parquet.zip": ("Colunar: Parquet propostas + itens (.zip)", "rockbuzz_historico.parquet.zip", "application/zip"),
+    "ndjson": ("NDJSON (.ndjson)", "rockbuzz_historico.ndjson", "application/x-ndjson"),
+    "json": ("JSON indentado (compatível)", "rockbuzz_historico.json", "application/json"),
+}
+
+
+def _dumps(rec, **kwargs) -> str:
+    return json.dumps(rec, ensure_ascii=False, default=json_default, **kwargs)
+
+def escrever_ndjson(registros, destino) -> int:
+    """Escreve um registro JSON por linha em `destino` (binário); retorna a quantidade"""
+    n = 0
+    for rec in registros:
+        destino.write(_dumps(rec).encode("utf-8"))
+        destino.write(b"\n")
+        n += 1
+    return n
+
+def escrever_versoes(registros, destino) -> int:
+    """Escreve em NDJSON as versões como deltas e os blocos repetidos uma vez; retorna a quantidade de registros"""
+    codificador = versions.Codificador()
+    n = 0
+    for rec in registros:
+        for obj in codificador.linhas(rec):
+            destino.write(_dumps(obj).encode("utf-8"))
+            destino.write(b"\n")
+        n += 1
+    return n
+
+def escrever_json(registros, destino) -> int:
+    """Escreve um array JSON indentado (formato antigo), um registro por vez"""
+    n = 0
+    destino.write(b"[")
+    for rec in registros:
+        bloco = _dumps(rec, indent=2).replace("\n", "\n  ")
+        destino.write((",\n  " if n else "\n  ").encode("utf-8") + bloco.encode("utf-8"))
+        n += 1
+    destino.write(b"\n]" if n else b"]")
+    return n
+
+def exportar(registros, destino, formato: str = "ndjson.gz") -> int:
+    """Exporta `registros` para o arquivo binário `destino` no formato escolhido"""
+    if formato == "json":
+        return escrever_json(registros, destino)
+    if formato in ("ndjson.gz", "versoes.ndjson.gz"):
+        escrever = escrever_versoes if formato == "versoes.ndjson.gz" else escrever_ndjson
+        # mtime=0 deixa o arquivo idêntico para o mesmo conteúdo
+        with gzip.GzipFile(fileobj=destino, mode="wb", mtime=0) as gz:
+            return escrever(registros, gz)
+    if formato == "ndjson":
+        return escrever_ndjson(registros, destino)
+    if formato == "parquet.zip":
+        return archive.escrever(registros, destino)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
+
+def exportar_bytes(registros, formato: str = "ndjson.gz") -> bytes:
+    """Exporta para memória (para o st.download_button)"""
+    buffer = BytesIO()
+    exportar(registros, buffer, formato)
+    return buffer.getvalue()
+
+
+# =========================
+# Importação
+# =========================
+# Campos de topo gravados por make_record() e seus tipos
+ESQUEMA_REGISTRO = {
+    "id": str,
+    "created_at": str,
+    "numero_proposta": str,
+    "enviado": bool,
+    "evento": str,
+    "data_evento": str,
+    "cidade": str,
+    "custo_total": (int, float),
+    "margem_pct": (int, float),
+    "cache_proposto": (int, float),
+    "validade_ate": str,
+    "cond_pagto": str,
+    "observacoes": str,
+    "contratante": dict,
+    "banda": dict,
+    "evento_info": dict,
+    "responsabilidades": dict,
+    "equipe": dict,
+    "energia": dict,
+    "multa_perc": (int, float),
+    "foro": str,
+    "itens": list,
+}
+ESQUEMA_SUBCAMPOS = {
+    "contratante": ("nome", "doc", "email", "tel", "end"),
+    "banda": ("razao", "cnpj", "resp_legal", "resp_banda"),
+    "evento_info": ("num_convidados", "hora_montagem", "hora_show", "local_apresentacao"),
+    "responsabilidades": ("banda", "contratante"),
+    "equipe": ("integrantes", "apoio", "acompanhantes"),
+    "energia": ("tomada", "tensao", "aterramento", "dist_max"),
+}
+CAMPOS_ITEM = ("Item", "Descrição", "Quantidade", "Custo Unitário (R$)", "Incluir")
+
+# política -> rótulo
+POLITICAS_MESCLA = {
+    "mais_recente": "Manter o mais recente (created_at)",
+    "sobrescrever": "Sobrescrever existentes",
+    "pular": "Manter existentes",
+}
+
+_TAMANHO_BLOCO = 64 * 1024
+_MAX_ELEMENTO = 32 * _TAMANHO_BLOCO   # maior registro aceito num array JSON (caracteres)
+
+
+@dataclass
+class RelatorioImportacao:
+    """Resultado de uma importação (contagens e erros por registro)"""
+    inseridos: int = 0
+    atualizados: int = 0
+    ignorados: int = 0
+    erros: list = field(default_factory=list)  # [(nº do registro, mensagem)]
+
+    @property
+    def lidos(self) -> int:
+        return self.inseridos + self.atualizados + self.ignorados + len(self.erros)
+
+
+def validar_registro(rec) -> list:
+    """Lista de problemas do registro em relação ao formato de make_record() (vazia se válido)"""
+    if not isinstance(rec, dict):
+        return [f"esperado um objeto, recebido {type(rec).__name__}"]
+    problemas = []
+    for campo, tipo in ESQUEMA_REGISTRO.items():
+        if campo not in rec:
+            problemas.append(f"campo ausente: {campo}")
+            continue
+        valor = rec[campo]
+        if not isinstance(valor, tipo) or (tipo is not bool and isinstance(valor, bool)):
+            problemas.append(f"tipo inválido em {campo}: {type(valor).__name__}")
+    for campo, subcampos in ESQUEMA_SUBCAMPOS.items():
+        if isinstance(rec.get(campo), dict):
+            faltando = [c for c in subcampos if c not in rec[campo]]
+            if faltando:
+                problemas.append(f"{campo} sem: {', '.join(faltando)}")
+    for campo, conversor in (("created_at", datetime.fromisoformat), ("data_evento", date.fromisoformat), ("validade_ate", date.fromisoformat)):
+        if isinstance(rec.get(campo), str):
+            try:
+                conversor(rec[campo])
+            except ValueError:
+                problemas.append(f"data inválida em {campo}: {rec[campo]!r}")
+    if isinstance(rec.get("itens"), list):
+        for i, item in enumerate(rec["itens"], start=1):
+            if not isinstance(item, dict) or any(c not in item for c in CAMPOS_ITEM):
+                problemas.append(f"item {i} fora do formato da tabela de itens")
+                break
+    return problemas
+
+
+class _Leitor(io.RawIOBase):
+    """Adapta objetos com read() (ex.: UploadedFile) para io.BufferedReader"""
+
+    def __init__(self, origem):
+        self._origem = origem
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        dados = self._origem.read(len(b))
+        b[:len(dados)] = dados
+        return len(dados)
+
+
+def _abrir_binario(arquivo):
+    """Arquivo binário com peek(), para reconhecer o formato pelos primeiros bytes"""
+    if not hasattr(arquivo, "peek"):
+        arquivo = io.BufferedReader(arquivo if isinstance(arquivo, io.RawIOBase) else _Leitor(arquivo))
+    return arquivo
+
+def abrir_texto(arquivo):
+    """Abre um arquivo binário como texto UTF-8, descomprimindo gzip se necessário"""
+    arquivo = _abrir_binario(arquivo)
+    if arquivo.peek(2)[:2] == b"\x1f\x8b":
+        arquivo = gzip.GzipFile(fileobj=arquivo, mode="rb")
+    return io.TextIOWrapper(arquivo, encoding="utf-8-sig")
+
+_TOKENS_JSON = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\],]')
+
+def _fim_elemento(buf: str, pos: int):
+    """Fim do elemento do array que começa em buf[pos], pelas chaves/colchetes fora de strings
+
+    Retorna o índice logo após o elemento (ou da "," / "]" que o encerra) e
+    None quando ele não termina no buffer (incompleto ou desbalanceado).
+    """
+    profundidade = 0
+    for token in _TOKENS_JSON.finditer(buf, pos):
+        c = token.group()
+        if c in "{[":
+            profundidade += 1
+        elif c in "}]":
+            if profundidade == 0:
+                if c == "]":   # fim do array logo após um escalar; "}" solto é ignorado
+                    return token.start()
+                continue
+            profundidade -= 1
+            if profundidade == 0:
+                return token.end()
+        elif c == "," and profundidade == 0:
+            return token.start()
+    return None
+
+def _ressincronizar(texto, buf: str, pos: int, marcas, fim_arquivo: bool):
+    """Descarta o texto até a primeira das `marcas`, lendo em blocos; retorna (buffer a partir dela ou None, fim_arquivo)"""
+    manter = max(map(len, marcas))
+    while True:
+        achados = [i for i in (buf.find(marca, pos) for marca in marcas) if i >= 0]
+        if achados:
+            return buf[min(achados):], fim_arquivo
+        if fim_arquivo:
+            return None, fim_arquivo
+        bloco = texto.read(_TAMANHO_BLOCO)
+        fim_arquivo = not bloco
+        buf, pos = buf[max(pos, len(buf) - manter):] + bloco, 0
+
+def _iterar_array(texto, inicio: str):
+    """Decodifica os elementos de um array JSON em blocos, sem carregar o arquivo inteiro
+
+    Um elemento inválido (ou maior que _MAX_ELEMENTO) vira uma exceção no lugar
+    do registro e a leitura continua no seguinte: no JSON indentado, na próxima
+    vírgula com a indentação dos elementos seguida de "{"; no compacto, após o
+    fim do elemento pelas chaves, se estiverem balanceadas.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, fim_arquivo, n = inicio, 1, False, 0  # pos 1: pula o "["
+    indentacao, separador, virgula = "", "", False
+    while True:
+        # avança espaços e vírgulas entre elementos, guardando a indentação usada
+        while True:
+            inicio_sep = pos
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            trecho = buf[inicio_sep:pos]
+            virgula = virgula or "," in trecho
+            separador = (separador + trecho)[-64:]
+            if pos < len(buf) or fim_arquivo:
+                break
+            bloco = texto.read(_TAMANHO_BLOCO)
+            fim_arquivo = not bloco
+            buf, pos = buf[pos:] + bloco, 0
+        if pos >= len(buf):
+            n += 1
+            yield n, ValueError("array JSON não foi fechado com ']'")
+            return
+        if buf[pos] == "]":
+            return
+        if virgula or n == 0:
+            indentacao = separador.rpartition(",")[2]
+        if n and not virgula:
+            erro = "falta ',' entre os elementos"
+        else:
+            try:
+                obj, fim = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # erro no fim do buffer (ou string aberta): o elemento pode só estar incompleto
+                truncado = e.pos >= len(buf) - 5 or e.msg.startswith("Unterminated string")
+                if truncado and not fim_arquivo and len(buf) - pos < _MAX_ELEMENTO and _fim_elemento(buf, pos) is None:
+                    # lê mais (dobrando o buffer, para não redecodificar o elemento a cada 64 KB)
+                    bloco = texto.read(max(_TAMANHO_BLOCO, len(buf) - pos))
+                    fim_arquivo = not bloco
+                    buf, pos = buf[pos:] + bloco, 0
+                    continue
+                erro = e.msg
+            else:
+                n += 1
+                yield n, obj
+                pos, separador, virgula = fim, "", False
+                continue
+        n += 1
+        yield n, ValueError(f"JSON inválido: {erro}")
+        separador, virgula = "", False
+        if "\n" in indentacao:
+            buf, fim_arquivo = _ressincronizar(texto, buf, pos + 1, ("," + indentacao + "{", "\n]"), fim_arquivo)
+            if buf is None:
+                n += 1
+                yield n, ValueError("array JSON não foi fechado com ']'")
+                return
+            pos = 0
+            continue
+        fim = _fim_elemento(buf, pos)
+        if fim is None or fim <= pos:
+            n += 1
+            yield n, ValueError("JSON inválido: não foi possível achar o próximo elemento; restante do arquivo ignorado")
+            return
+        pos = fim
+
+def iterar_registros(arquivo):
+    """Gera (nº, registro) a partir de um array JSON ou NDJSON; erros de parsing vêm como exceção no lugar do registro"""
+    texto = abrir_texto(arquivo)
+    inicio = texto.read(1)
+    while inicio and inicio.isspace():
+        inicio = texto.read(1)
+    if inicio == "[":
+        yield from _iterar_array(texto, inicio)
+        return
+    primeira = inicio + texto.readline()
+    n = 0
+    for linha in _encadear(primeira, texto):
+        if not linha.strip():
+            continue
+        n += 1
+        try:
+            yield n, json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield n, ValueError(f"JSON inválido: {e.msg}")
+
+def _encadear(primeira, texto):
+    yield primeira
+    yield from texto
+
+def ler_registros(arquivo):
+    """Gera (nº, registro completo) de um arquivo em qualquer formato de exportação
+
+    JSON/NDJSON (.gz), versões em delta ou Parquet (.zip). Linhas que não puderam
+    ser lidas ou decodificadas vêm como exceção no lugar do registro.
+    """
+    arquivo = _abrir_binario(arquivo)
+    if arquivo.peek(4)[:4] == archive.ASSINATURA:
+        # o zip precisa de acesso aleatório: o arquivo colunar é lido inteiro (já vem comprimido)
+        origem = archive.iterar_registros(arquivo.read())
+    else:
+        origem = iterar_registros(arquivo)
+    decodificador = versions.Decodificador()
+    for n, rec in origem:
+        if not isinstance(rec, Exception):
+            try:
+                rec = decodificador.ler(rec)
+            except ValueError as e:
+                rec = e
+            if rec is None:   # linha de bloco da exportação em delta
+                continue
+        yield n, rec
+
+def importar(arquivo, store, politica: str = "mais_recente", lote: int = 500) -> RelatorioImportacao:
+    """Importa um arquivo de histórico para o `store`, validando e mesclando por id em lotes"""
+    if politica not in POLITICAS_MESCLA:
+        raise ValueError(f"Política de mescla desconhecida: {politica}")
+    relatorio = RelatorioImportacao()
+    pendentes = []
+
+    def gravar():
+        inseridos, atualizados, ignorados = store.mesclar(pendentes, politica)
+        relatorio.inseridos += inseridos
+        relatorio.atualizados += atualizados
+        relatorio.ignorados += ignorados
+        pendentes.clear()
+
+    for n, rec in ler_registros(arquivo):
+        if isinstance(rec, Exception):
+            relatorio.erros.append((n, str(rec)))
+            continue
+        problemas = validar_registro(rec)
+        if problemas:
+            relatorio.erros.append((n, "; ".join(problemas)))
+            continue
+        pendentes.append(rec)
+        if len(pendentes) >= lote:
+            gravar()
+    if pendentes:
+        gravar()
+    return relatorio
@@ -0,0 +1,110 @@
+# Geração de PDFs (Orçamento e Contrato) a partir de um registro de proposta
+# -------------------------------------------------------------------------------
+# Os geradores recebem um dicionário no formato de make_record(), sem depender de
+# st.session_state, e os bytes gerados ficam num cache LRU indexado pelo hash dos
+# campos que cada documento realmente usa.
+#
+# A montagem com o ReportLab fica em gigflow.pdf_layout, importado só na
+# primeira geração: abrir o app e calcular a chave do cache não carregam o
+# ReportLab.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from gigflow.utils import json_default, parse_data
+
+# Campos do registro lidos por cada documento (compõem a chave do cache)
+CAMPOS_ORCAMENTO = (
+    "numero_proposta", "enviado", "evento", "data_evento", "cidade", "validade_dias",
+    "validade_ate", "itens", "custo_total", "margem_pct", "cache_proposto",
+    "cond_pagto", "observacoes",
+)
+CAMPOS_CONTRATO = (
+    "contratante", "banda", "data_evento", "cidade", "evento_info", "responsabilidades",
+    "equipe", "cache_proposto", "cond_pagto", "energia", "multa_perc", "foro",
+)
+
+CACHE_MAX_DOCUMENTOS = 64
+
+
+class _LRUCache:
+    """Cache LRU limitado e thread-safe, compartilhado por todas as sessões do processo"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+        with self._lock:
+            if chave not in self._dados:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return self._dados[chave]
+
+    def put(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+
+_cache = _LRUCache(CACHE_MAX_DOCUMENTOS)
+
+
+def validade_dias(rec) -> int:
+    """Dias de validade do registro (deriva de created_at/validade_ate em registros antigos)"""
+    if rec.get("validade_dias") is not None:
+        return int(rec["validade_dias"])
+    try:
+        criado = datetime.fromisoformat(rec["created_at"]).date()
+        return (parse_data(rec["validade_ate"]) - criado).days
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+def chave_documento(tipo: str, rec) -> str:
+    """Hash SHA-256 dos campos do registro que entram no documento `tipo`"""
+    campos = CAMPOS_ORCAMENTO if tipo == "orcamento" else CAMPOS_CONTRATO
+    entrada = {c: rec.get(c) for c in campos}
+    if tipo == "orcamento":
+        entrada["validade_dias"] = validade_dias(rec)
+    bruto = json.dumps([tipo, entrada], sort_keys=True, ensure_ascii=False, default=json_default)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+def em_cache(chave: str) -> bytes | None:
+    """Bytes de um documento já gerado, sem gerar"""
+    return _cache.get(chave)
+
+def documento(tipo: str, rec, chave: str | None = None) -> bytes:
+    """Bytes do PDF `tipo` ("orcamento" ou "contrato"), gerando só em caso de cache miss"""
+    chave = chave or chave_documento(tipo, rec)
+    pdf = _cache.get(chave)
+    if pdf is None:
+        gerador = gerar_pdf_orcamento if tipo == "orcamento" else gerar_pdf_contrato
+        pdf = gerador(rec).getvalue()
+        _cache.put(chave, pdf)
+    return pdf
+
+def gerar_pdf_orcamento(rec):
+    """PDF do Orçamento (BytesIO)"""
+    from gigflow import pdf_layout
+    return pdf_layout.gerar_pdf_orcamento(rec)
+
+def gerar_pdf_contrato(rec):
+    """PDF do Contrato (BytesIO)"""
+    from gigflow import pdf_layout
+    return pdf_layout.gerar_pdf_contrato(rec)
@@ -0,0 +1,307 @@
+# Montagem dos PDFs de Orçamento e Contrato com o ReportLab
+# -------------------------------------------------------------------------------
+# Importado sob demanda por gigflow.pdf (o ReportLab pesa no início do app).
+#
+# Estilos e TableStyles são montados uma vez por processo; os trechos fixos
+# (títulos, cabeçalhos, cláusulas 2a–6a, rodapé) passam uma vez pelo parser XML
+# e cada render monta Paragraphs novos com os fragmentos guardados (flowables
+# guardam estado durante o desenho e não são reaproveitados entre documentos).
+# Nome, descrição e valores dos itens são escapados: marcação digitada pelo
+# usuário ("<b>", "&amp;", "<br/>") sai literalmente na tabela.
+#
+# Os dois documentos abrem com o logo (variante de impressão de gigflow.assets)
+# ao lado do título.
+#
+# Saída determinística (padrão; ROCKBUZZ_PDF_DETERMINISTICO=0 desliga): data de
+# criação e /ID fixos, então os mesmos dados geram os mesmos bytes (cache HTTP,
+# deduplicação e armazenamento por hash). Os streams saem só com Flate, sem a
+# camada ASCII85 que aumenta em 25% conteúdo de página, fontes e imagens; como a
+# opção é global no ReportLab, ela só vale durante o build (_construir) e os
+# builds deste módulo são serializados. O logo e as fontes padrão já são objetos
+# únicos referenciados por todas as páginas.
+import functools
+import os
+import threading
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus.paraparser import ParaParser
+
+from gigflow import assets
+from gigflow.pdf import validade_dias
+from gigflow.utils import brl, data_br
+
+
+# =========================
+# Modelos dos documentos (montados uma vez)
+# =========================
+PDF_DETERMINISTICO = os.environ.get("ROCKBUZZ_PDF_DETERMINISTICO", "1") != "0"
+_lock_a85 = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def _pdf_doc_setup():
+    doc_kwargs = dict(pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
+    if PDF_DETERMINISTICO:
+        doc_kwargs.update(invariant=1, pageCompression=1, creator="GigFlow", author="Rockbuzz", producer="GigFlow")
+    styles = getSampleStyleSheet()
+    small = ParagraphStyle(name="small", parent=styles["Normal"], fontSize=9, leading=11)
+    small_bold = ParagraphStyle(name="small_bold", parent=styles["Normal"], fontSize=9, leading=11, fontName="Helvetica-Bold")
+    title_style = ParagraphStyle(name="title", parent=styles["Title"], fontSize=18, leading=22, textColor=colors.HexColor("#FF4B4B"))
+    return doc_kwargs, small, small_bold, title_style
+
+def _construir(doc, elementos):
+    """doc.build() com streams só em Flate, restaurando o useA85 do ReportLab ao terminar"""
+    if not PDF_DETERMINISTICO:
+        doc.build(elementos)
+        return
+    # useA85 é global do ReportLab (não há opção por documento): o lock serializa os
+    # builds deste módulo para que um não restaure o valor no meio de outro
+    with _lock_a85:
+        anterior = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            doc.build(elementos)
+        finally:
+            rl_config.useA85 = anterior
+
+@functools.lru_cache(maxsize=None)
+def _tabela_styles():
+    """TableStyles da tabela de itens e do bloco de assinaturas"""
+    itens = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FF4B4B")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (2, 1), (-1, -1), "CENTER"),
+        ("ALIGN", (1, 1), (1, -1), "LEFT"),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.gray),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -4), [colors.whitesmoke, colors.white]),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ])
+    assinatura = TableStyle([
+        ("LINEABOVE", (0, 0), (0, 0), 1, colors.black),
+        ("LINEABOVE", (1, 0), (1, 0), 1, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ])
+    return itens, assinatura
+
+@functools.lru_cache(maxsize=None)
+def _frag_base(estilo):
+    """Fragmento de texto já resolvido para o estilo (base dos parágrafos de texto literal)"""
+    return ParaParser().parse("x", estilo)[1][0]
+
+def _texto(texto, estilo):
+    """Paragraph(escape(texto)): texto do usuário ou valor; "<b>", "&amp;" etc. saem literalmente"""
+    texto = str(texto)
+    if "<" in texto or ">" in texto or "&" in texto:
+        return Paragraph(escape(texto), estilo)
+    # sem caracteres de marcação o parser devolveria um único fragmento com o próprio
+    # texto: monta direto (mesmos bytes; conferido em benchmarks/suite.py, caso texto_literal)
+    return Paragraph(texto, estilo, frags=[_frag_base(estilo).clone(text=texto)])
+
+@functools.lru_cache(maxsize=None)
+def _frags_fixos(texto, estilo):
+    """Fragmentos de um texto fixo já passados pelo parser XML (só leitura)"""
+    return tuple(ParaParser().parse(texto, estilo)[1])
+
+def _fixo(texto, estilo):
+    """Paragraph novo de um texto fixo, montado com os fragmentos guardados em vez do parser"""
+    return Paragraph(texto, estilo, frags=list(_frags_fixos(texto, estilo)))
+
+
+def _cabecalho(titulo):
+    """Título com o logo à esquerda (só o título se o logo não puder ser lido)"""
+    try:
+        logo = Image(BytesIO(assets.logo_impressao()), width=assets.LOGO_PDF_PT, height=assets.LOGO_PDF_PT)
+    except OSError:
+        return titulo
+    lateral = assets.LOGO_PDF_PT + 12
+    # coluna vazia à direita com a mesma largura mantém o título centralizado na página
+    tabela = Table([[logo, titulo, ""]], colWidths=[lateral, None, lateral])
+    tabela.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ALIGN", (0, 0), (0, 0), "LEFT"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+    ]))
+    return tabela
+
+
+def _fixos():
+    """Parágrafos fixos dos dois documentos (flowables novos a cada render)"""
+    _, small, small_bold, title_style = _pdf_doc_setup()
+    return {
+        "cabecalho_orcamento": _cabecalho(_fixo("<b>Rockbuzz Pay – Orçamento</b>", title_style)),
+        "cabecalho_itens": [
+            _fixo(f"<b>{titulo}</b>", small_bold)
+            for titulo in ("Item", "Descrição", "Qtd", "Valor Unit.", "Total")
+        ],
+        "rotulo_custo": _fixo("<b>Custo Total</b>", small_bold),
+        "rotulo_cache": _fixo("<b>Cache Proposto</b>", small_bold),
+        "cabecalho_contrato": _cabecalho(_fixo("<b>Contrato de Prestação de Serviços Musicais</b>", title_style)),
+        "equipamentos": _fixo("<b>EQUIPAMENTOS E RESPONSABILIDADES</b>", small_bold),
+        "clausulas_titulo": _fixo("<b>CLAUSULAS CONTRATUAIS</b>", small_bold),
+        "clausulas_fixas": [
+            _fixo(c, small) for c in (
+                "<b>2a.</b> Despesas de transporte: responsabilidade da Contratada.",
+                "<b>3a.</b> Alimentacao de banda e equipe: responsabilidade da Contratante.",
+                "<b>4a.</b> Alteracao de data: deve ser comunicada por escrito ao responsavel indicado.",
+                "<b>5a.</b> O responsavel que assina pela Contratante e fiador solidario.",
+                "<b>6a.</b> A Contratante responde por danos aos equipamentos ou integrantes por problemas no local.",
+            )
+        ],
+        "rodape": _fixo("<i>Desenvolvido por Aditivo Media</i>", small),
+    }
+
+def gerar_pdf_orcamento(rec):
+    buffer = BytesIO()
+    doc_kwargs, small, small_bold, _ = _pdf_doc_setup()
+    fixos = _fixos()
+    doc = SimpleDocTemplate(buffer, **doc_kwargs)
+
+    custo_total = rec["custo_total"]
+    cache_proposto = rec["cache_proposto"]
+    margem_valor = cache_proposto - custo_total
+
+    elementos = []
+    elementos.append(fixos["cabecalho_orcamento"])
+    elementos.append(Spacer(1, 6))
+
+    status_text = "ENVIADO" if rec["enviado"] else "RASCUNHO"
+    topo = (
+        f"<b>No Proposta:</b> {rec['numero_proposta']} &nbsp;&nbsp; "
+        f"<b>Status:</b> {status_text}<br/>"
+        f"<b>Evento:</b> {rec['evento'] or '-'} &nbsp;&nbsp; "
+        f"<b>Data:</b> {data_br(rec['data_evento'])} &nbsp;&nbsp; "
+        f"<b>Cidade:</b> {rec['cidade'] or '-'}<br/>"
+        f"<b>Validade:</b> {validade_dias(rec)} dia(s) (ate {data_br(rec['validade_ate'])})"
+    )
+    elementos.append(Paragraph(topo, small))
+    elementos.append(Spacer(1, 10))
+
+    dados = [fixos["cabecalho_itens"]]
+
+    for row in rec["itens"]:
+        if not row.get("Incluir"):
+            continue
+        dados.append([
+            _texto(row["Item"], small),
+            _texto(row["Descrição"], small),
+            _texto(f"{row['Quantidade']:.0f}", small),
+            _texto(brl(row["Custo Unitário (R$)"]), small),
+            _texto(brl(row["Total (R$)"]), small),
+        ])
+
+    dados += [
+        ["", "", "", fixos["rotulo_custo"], _texto(brl(custo_total), small_bold)],
+        ["", "", "", _texto("Margem de Lucro ({:.0f}%)".format(rec["margem_pct"]), small_bold), _texto(brl(margem_valor), small_bold)],
+        ["", "", "", fixos["rotulo_cache"], _texto(brl(cache_proposto), small_bold)],
+    ]
+
+    col_widths = [60, 210, 40, 90, 90]
+    tabela = Table(dados, colWidths=col_widths, repeatRows=1)
+    tabela.setStyle(_tabela_styles()[0])
+    elementos += [tabela, Spacer(1, 12)]
+
+    elementos.append(Paragraph(f"<b>Condicoes de Pagamento:</b> {rec['cond_pagto'] or '-'}", small))
+    if rec["observacoes"]:
+        elementos.append(Spacer(1, 6))
+        elementos.append(Paragraph(f"<b>Observacoes:</b> {rec['observacoes']}", small))
+
+    elementos.append(Spacer(1, 20))
+    elementos.append(fixos["rodape"])
+
+    _construir(doc, elementos)
+    buffer.seek(0)
+    return buffer
+
+def gerar_pdf_contrato(rec):
+    buffer = BytesIO()
+    doc_kwargs, small, _, _ = _pdf_doc_setup()
+    fixos = _fixos()
+    doc = SimpleDocTemplate(buffer, **doc_kwargs)
+
+    contratante = rec["contratante"]
+    banda = rec["banda"]
+    ev = rec["evento_info"]
+    resp = rec["responsabilidades"]
+    equipe_rec = rec["equipe"]
+    eng = rec["energia"]
+
+    elementos = []
+    elementos.append(fixos["cabecalho_contrato"])
+    elementos.append(Spacer(1, 8))
+
+    partes = (
+        f"<b>CONTRATANTE:</b> {contratante['nome'] or '-'} - CPF/CNPJ: {contratante['doc'] or '-'}<br/>"
+        f"Endereco: {contratante['end'] or '-'}<br/>"
+        f"E-mail: {contratante['email'] or '-'} - Telefone: {contratante['tel'] or '-'}<br/><br/>"
+        f"<b>CONTRATADA:</b> {banda['razao']} - CNPJ: {banda['cnpj']}<br/>"
+        f"Representante Legal: {banda['resp_legal'] or '-'}<br/>"
+        f"Responsavel pela Banda: {banda['resp_banda'] or '-'}"
+    )
+    elementos.append(Paragraph(partes, small))
+    elementos.append(Spacer(1, 10))
+
+    info_evento = (
+        f"<b>INFORMACOES DO EVENTO</b><br/>"
+        f"Data: {data_br(rec['data_evento'])} | Local: {rec['cidade'] or '-'} | No Convidados: {ev['num_convidados']}<br/>"
+        f"Horario Montagem: {ev['hora_montagem'] or '-'} | Horario Show: {ev['hora_show'] or '-'}<br/>"
+        f"Local de Apresentacao: {ev['local_apresentacao'] or '-'}"
+    )
+    elementos.append(Paragraph(info_evento, small))
+    elementos.append(Spacer(1, 8))
+
+    elementos.append(fixos["equipamentos"])
+    elementos.append(Paragraph(f"<b>Responsabilidade da Banda:</b> {resp['banda']}", small))
+    elementos.append(Paragraph(f"<b>Responsabilidade da Contratante:</b> {resp['contratante']}", small))
+    elementos.append(Spacer(1, 8))
+
+    equipe = (
+        f"<b>COMPOSICAO DA EQUIPE:</b> Integrantes: {equipe_rec['integrantes']} | "
+        f"Apoio: {equipe_rec['apoio']} | Acompanhantes: {equipe_rec['acompanhantes']}"
+    )
+    elementos.append(Paragraph(equipe, small))
+    elementos.append(Spacer(1, 10))
+
+    elementos.append(fixos["clausulas_titulo"])
+    elementos.append(Spacer(1, 4))
+
+    clausulas = [
+        Paragraph(f"<b>1a.</b> Valor total do servico: <b>{brl(rec['cache_proposto'])}</b> - Pagamento: {rec['cond_pagto'] or '-'}.", small),
+        *fixos["clausulas_fixas"],
+        Paragraph(f"<b>7a.</b> Energia eletrica conforme NBR 5410: tomada {eng['tomada']}, {eng['tensao']}, "
+                  f"aterramento {eng['aterramento']}; distancia maxima do palco: {eng['dist_max']}.", small),
+        Paragraph(f"<b>8a.</b> Multa por descumprimento: {rec['multa_perc']}% do valor total.", small),
+        Paragraph(f"<b>9a.</b> Foro: {rec['foro']}.", small),
+    ]
+
+    for c in clausulas:
+        elementos.append(c)
+        elementos.append(Spacer(1, 3))
+
+    elementos.append(Spacer(1, 15))
+
+    assinatura_tbl = Table(
+        [
+            [Paragraph(f"<b>Contratante:</b><br/><br/>{contratante['nome'] or '________________________________'}<br/>{contratante['doc'] or ''}", small),
+             Paragraph(f"<b>Banda RockBuzz / {banda['razao']}:</b><br/><br/>{banda['resp_banda'] or '________________________________'}", small)]
+        ],
+        colWidths=[240, 240]
+    )
+    assinatura_tbl.setStyle(_tabela_styles()[1])
+    elementos.append(assinatura_tbl)
+
+    elementos.append(Spacer(1, 15))
+    elementos.append(fixos["rodape"])
+
+    _construir(doc, elementos)
+    buffer.seek(0)
+    return buffer
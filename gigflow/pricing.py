@@ -0,0 +1,310 @@
+# Motor de cálculo do cachê, independente do Streamlit
+# -------------------------------------------------------------------------------
+# Todo o cálculo é feito em centavos inteiros (int64) para que os totais exibidos
+# na tela, gravados no histórico e impressos nos PDFs sejam sempre os mesmos:
+#   total do item  = quantidade x custo unitário (arredondado ao centavo)
+#   custo total    = soma dos itens incluídos
+#   margem         = custo total x margem % (arredondamento meio-para-cima)
+#   cachê proposto = custo total + margem
+# calcular() precifica uma proposta; calcular_lote() precifica milhares de uma vez
+# com NumPy, recebendo os itens de todas as propostas concatenados.
+# CalculoIncremental mantém os totais da tabela do editor entre reruns e só
+# recalcula as linhas que o st.data_editor reporta como editadas/adicionadas/removidas.
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_NUMERICAS = ("Quantidade", "Custo Unitário (R$)")
+
+
+@dataclass(frozen=True)
+class Orcamento:
+    """Resultado do cálculo de uma proposta (valores em centavos)"""
+    itens: np.ndarray          # total de cada item (0 quando não incluído)
+    custo_total: int
+    margem_valor: int
+    cache_proposto: int
+    data_validade: date | None = None
+
+    def em_reais(self):
+        """(custo_total, margem_valor, cache_proposto) em reais"""
+        return self.custo_total / 100, self.margem_valor / 100, self.cache_proposto / 100
+
+
+@dataclass(frozen=True)
+class Lote:
+    """Resultado de calcular_lote() (arrays em centavos, um valor por proposta)"""
+    itens: np.ndarray
+    custo_total: np.ndarray
+    margem_valor: np.ndarray
+    cache_proposto: np.ndarray
+
+
+def default_rows():
+    """Retorna template padrão de itens do orçamento"""
+    return [
+        {"Item": "1. Músicos",              "Descrição": "Pagamento músicos",                                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "2. Ajudantes/Staff",      "Descrição": "Pagamento de ajudantes (roadies)",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "3. Transporte",           "Descrição": "Aluguel/combustível de carros próprios",           "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "4. Pedágio",              "Descrição": "Custos com pedágios (ida e volta)",                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "5. Combustível",          "Descrição": "Estimativa ida/volta (média 13 km/L)",             "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "6. Alimentação",          "Descrição": "Refeição completa para equipe",                    "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "7. Hospedagem",           "Descrição": "Caso haja necessidade de pernoite",                "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "8. Som/Luz Kiko",         "Descrição": "PA até 100 pessoas + Monitoramento + Luz",         "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "9. PA Guilherme",         "Descrição": "PA para eventos acima de 100 pessoas",             "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "10. Estrutura Evento",    "Descrição": "Palco, som, luz, telão, treliças",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "11. Técnico de Som",      "Descrição": "Palco/FOH",                                        "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+        {"Item": "12. Outros Custos",       "Descrição": "Equipamentos extras, imprevistos",                 "Quantidade": 0, "Custo Unitário (R$)": 0.00, "Incluir": True},
+    ]
+
+def centavos(valores) -> np.ndarray:
+    """Converte valores em reais para centavos inteiros"""
+    return np.rint(np.asarray(valores, dtype=np.float64) * 100).astype(np.int64)
+
+def data_validade(validade_dias: int, hoje: date | None = None) -> date:
+    """Último dia de validade da proposta"""
+    return (hoje or date.today()) + timedelta(days=int(validade_dias))
+
+def calcular_lote(quantidades, custos_unitarios, incluir, margens_pct, proposta) -> Lote:
+    """Precifica várias propostas de uma vez
+
+    `quantidades`, `custos_unitarios` e `incluir` trazem os itens de todas as
+    propostas concatenados; `proposta` diz a qual proposta (0..n-1) cada item
+    pertence e `margens_pct` tem uma margem por proposta.
+    """
+    qtd = np.nan_to_num(np.asarray(quantidades, dtype=np.float64))
+    unit = centavos(np.nan_to_num(np.asarray(custos_unitarios, dtype=np.float64)))
+    incl = np.asarray(incluir, dtype=bool)
+    margens_bp = np.rint(np.asarray(margens_pct, dtype=np.float64) * 100).astype(np.int64)
+    proposta = np.asarray(proposta, dtype=np.int64)
+
+    itens = np.where(incl, np.rint(qtd * unit).astype(np.int64), 0)
+    custo = np.zeros(len(margens_bp), dtype=np.int64)
+    np.add.at(custo, proposta, itens)
+    margem = _margem(custo, margens_bp)
+    return Lote(itens=itens, custo_total=custo, margem_valor=margem, cache_proposto=custo + margem)
+
+def _margem(custo, margens_bp):
+    # custo x (margem em pontos-base) / 10000, arredondando meio centavo para cima
+    return (custo * margens_bp + 5000) // 10000
+
+def _margem_bp(margem_pct) -> int:
+    return int(np.rint(np.float64(margem_pct) * 100))
+
+def calcular(quantidades, custos_unitarios, incluir, margem_pct, validade_dias=None, hoje=None) -> Orcamento:
+    """Precifica uma proposta a partir dos arrays de itens e da margem (%)"""
+    n = len(quantidades)
+    lote = calcular_lote(quantidades, custos_unitarios, incluir, [margem_pct], np.zeros(n, dtype=np.int64))
+    return Orcamento(
+        itens=lote.itens,
+        custo_total=int(lote.custo_total[0]),
+        margem_valor=int(lote.margem_valor[0]),
+        cache_proposto=int(lote.cache_proposto[0]),
+        data_validade=None if validade_dias is None else data_validade(validade_dias, hoje),
+    )
+
+def calcular_df(df, margem_pct, validade_dias=None, hoje=None):
+    """Normaliza a tabela do editor (NaN, tipos) e calcula; retorna (df_calc, Orcamento)"""
+    df_calc = df.copy()
+    for coluna in COLUNAS_NUMERICAS:
+        df_calc[coluna] = pd.to_numeric(df_calc[coluna], errors="coerce").fillna(0)
+    df_calc["Incluir"] = df_calc["Incluir"].fillna(False).astype(bool)
+    orc = calcular(
+        df_calc["Quantidade"].to_numpy(), df_calc["Custo Unitário (R$)"].to_numpy(),
+        df_calc["Incluir"].to_numpy(), margem_pct, validade_dias, hoje,
+    )
+    df_calc["Total (R$)"] = orc.itens / 100
+    return df_calc, orc
+
+def reprecificar(registros, novos_custos=None):
+    """Recalcula registros do histórico (ex.: após reajuste de fornecedores)
+
+    `novos_custos` mapeia o nome do item (coluna "Item") para o novo custo
+    unitário. Retorna novos registros com itens e totais atualizados; os
+    originais não são alterados.
+    """
+    registros = list(registros)
+    novos_custos = novos_custos or {}
+    qtd, unit, incl, proposta = [], [], [], []
+    for i, rec in enumerate(registros):
+        for item in rec["itens"]:
+            qtd.append(item.get("Quantidade") or 0)
+            unit.append(novos_custos.get(item.get("Item"), item.get("Custo Unitário (R$)") or 0))
+            incl.append(bool(item.get("Incluir")))
+            proposta.append(i)
+    lote = calcular_lote(qtd, unit, incl, [rec.get("margem_pct", 0.0) for rec in registros], proposta)
+
+    novos, k = [], 0
+    for i, rec in enumerate(registros):
+        itens = []
+        for item in rec["itens"]:
+            itens.append({**item, "Custo Unitário (R$)": unit[k], "Total (R$)": lote.itens[k] / 100})
+            k += 1
+        novos.append({
+            **rec,
+            "itens": itens,
+            "custo_total": int(lote.custo_total[i]) / 100,
+            "cache_proposto": int(lote.cache_proposto[i]) / 100,
+        })
+    return novos
+
+
+# =========================
+# Recalculo incremental (tabela do st.data_editor)
+# =========================
+def _numero(valor, inteiro: bool = False) -> float:
+    """Valor de célula numérica como float (vazio/inválido -> 0, como no cálculo completo)
+
+    Em colunas inteiras o st.data_editor converte o valor editado com int().
+    """
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(numero):
+        return 0.0
+    return float(int(numero)) if inteiro and math.isfinite(numero) else numero
+
+def _marcado(valor) -> bool:
+    return False if valor is None or (isinstance(valor, float) and math.isnan(valor)) else bool(valor)
+
+
+class CalculoIncremental:
+    """Totais por linha e custo total da tabela do editor, atualizados só nas linhas alteradas
+
+    Parte de um cálculo completo da tabela base (a passada ao st.data_editor) e, a
+    cada rerun, recebe o estado de edição do editor (edited_rows, added_rows,
+    deleted_rows, sempre relativos à base) e recalcula só as linhas cujo estado
+    mudou desde a última aplicação. Uma base nova (ex.: "Carregar no Editor")
+    pede um CalculoIncremental novo.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        df_base, orc = calcular_df(base, 0)
+        self._qtd = df_base["Quantidade"].to_numpy(dtype=np.float64).copy()
+        self._unit = df_base["Custo Unitário (R$)"].to_numpy(dtype=np.float64).copy()
+        self._incl = df_base["Incluir"].to_numpy(dtype=bool).copy()
+        self._qtd_base, self._unit_base, self._incl_base = self._qtd.copy(), self._unit.copy(), self._incl.copy()
+        self._totais = orc.itens.copy()
+        self._inteiras = {c: pd.api.types.is_integer_dtype(base[c]) for c in COLUNAS_NUMERICAS}
+        self._editadas = {}
+        self._adicionadas = []        # [(linha, (qtd, unit, incl), total)]
+        self._removidas = frozenset()
+        self.custo_total = int(orc.custo_total)
+        self.linhas_recalculadas = len(self._totais)
+        self._df_calc = None
+
+    def _valores(self, linha, qtd, unit, incl):
+        """(qtd, unit, incl) normalizados sobrepondo `linha` (células alteradas) aos valores dados"""
+        return (
+            _numero(linha["Quantidade"], self._inteiras["Quantidade"]) if "Quantidade" in linha else qtd,
+            _numero(linha["Custo Unitário (R$)"], self._inteiras["Custo Unitário (R$)"]) if "Custo Unitário (R$)" in linha else unit,
+            _marcado(linha["Incluir"]) if "Incluir" in linha else incl,
+        )
+
+    @staticmethod
+    def _totais_de(valores):
+        if not valores:
+            return []
+        qtd, unit, incl = zip(*valores)
+        return calcular_lote(qtd, unit, incl, [0], np.zeros(len(valores), dtype=np.int64)).itens.tolist()
+
+    def _total_visivel(self, posicao, total, removidas):
+        return 0 if posicao in removidas else total
+
+    def aplicar(self, estado) -> int:
+        """Aplica o estado de edição do st.data_editor; retorna quantas linhas foram recalculadas"""
+        estado = estado or {}
+        editadas = {int(i): dict(v) for i, v in (estado.get("edited_rows") or {}).items()}
+        adicionadas = [dict(linha) for linha in estado.get("added_rows") or ()]
+        removidas = frozenset(int(i) for i in estado.get("deleted_rows") or ())
+        n_base = len(self._totais)
+
+        # linhas da base com edição nova, alterada ou desfeita
+        mudaram = [i for i in editadas.keys() | self._editadas.keys() if editadas.get(i) != self._editadas.get(i)]
+        valores = [
+            self._valores(editadas.get(i, {}), self._qtd_base[i], self._unit_base[i], self._incl_base[i])
+            for i in mudaram
+        ]
+        for i, (qtd, unit, incl), total in zip(mudaram, valores, self._totais_de(valores)):
+            self.custo_total += self._total_visivel(i, total, self._removidas) - self._total_visivel(i, self._totais[i], self._removidas)
+            self._qtd[i], self._unit[i], self._incl[i] = qtd, unit, incl
+            self._totais[i] = total
+
+        # linhas adicionadas: só as posições que mudaram (ou sumiram)
+        novas = [k for k, linha in enumerate(adicionadas) if k >= len(self._adicionadas) or self._adicionadas[k][0] != linha]
+        valores = [self._valores(adicionadas[k], 0.0, 0.0, False) for k in novas]
+        recalculadas = dict(zip(novas, zip(valores, self._totais_de(valores))))
+        anteriores = self._adicionadas
+        self._adicionadas = []
+        for k, linha in enumerate(adicionadas):
+            if k in recalculadas:
+                (valores_k, total) = recalculadas[k]
+                if k < len(anteriores):
+                    self.custo_total -= self._total_visivel(n_base + k, anteriores[k][2], self._removidas)
+                self.custo_total += self._total_visivel(n_base + k, total, self._removidas)
+                self._adicionadas.append((linha, valores_k, total))
+            else:
+                self._adicionadas.append(anteriores[k])
+        for k in range(len(adicionadas), len(anteriores)):
+            self.custo_total -= self._total_visivel(n_base + k, anteriores[k][2], self._removidas)
+
+        # remoções (posições na tabela com as adicionadas no fim)
+        alternadas = removidas ^ self._removidas
+        for posicao in alternadas:
+            if posicao < n_base:
+                total = self._totais[posicao]
+            elif posicao - n_base < len(self._adicionadas):
+                total = self._adicionadas[posicao - n_base][2]
+            else:
+                continue
+            self.custo_total += -total if posicao in removidas else total
+
+        self._editadas = editadas
+        self._removidas = removidas
+        self.linhas_recalculadas = len(mudaram) + len(novas) + len(alternadas) + max(0, len(anteriores) - len(adicionadas))
+        if self.linhas_recalculadas:
+            self._df_calc = None
+        return self.linhas_recalculadas
+
+    def _visiveis(self):
+        """Máscara das linhas da tabela (base + adicionadas) que não foram removidas"""
+        n = len(self._totais) + len(self._adicionadas)
+        mascara = np.ones(n, dtype=bool)
+        if self._removidas:
+            mascara[[p for p in self._removidas if p < n]] = False
+        return mascara
+
+    def itens(self) -> np.ndarray:
+        """Total de cada linha visível, na ordem da tabela editada (centavos)"""
+        adicionados = np.array([total for _, _, total in self._adicionadas], dtype=np.int64)
+        return np.concatenate([self._totais, adicionados])[self._visiveis()]
+
+    def orcamento(self, margem_pct, validade_dias=None, hoje=None) -> Orcamento:
+        """Orçamento com o custo total corrente (sem somar as linhas de novo)"""
+        margem = int(_margem(np.int64(self.custo_total), _margem_bp(margem_pct)))
+        return Orcamento(
+            itens=self.itens(),
+            custo_total=self.custo_total,
+            margem_valor=margem,
+            cache_proposto=self.custo_total + margem,
+            data_validade=None if validade_dias is None else data_validade(validade_dias, hoje),
+        )
+
+    def df_calc(self, edited_df):
+        """Tabela normalizada com "Total (R$)" (como a de calcular_df), montada só quando algo mudou"""
+        if self._df_calc is None:
+            visiveis = self._visiveis()
+            adicionados = [valores for _, valores, _ in self._adicionadas]
+            qtd_a, unit_a, incl_a = zip(*adicionados) if adicionados else ((), (), ())
+            df = edited_df.copy()
+            df["Quantidade"] = np.concatenate([self._qtd, np.asarray(qtd_a, dtype=np.float64)])[visiveis]
+            df["Custo Unitário (R$)"] = np.concatenate([self._unit, np.asarray(unit_a, dtype=np.float64)])[visiveis]
+            df["Incluir"] = np.concatenate([self._incl, np.asarray(incl_a, dtype=bool)])[visiveis]
+            df["Total (R$)"] = self.itens() / 100
+            self._df_calc = df
+        return self._df_calc
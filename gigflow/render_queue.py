@@ -0,0 +1,141 @@
+# Fila de geração de PDFs em segundo plano
+# -------------------------------------------------------------------------------
+# Gerar um Orçamento ou Contrato (ReportLab) leva de dezenas a centenas de ms e
+# não deve travar o script da sessão. A fila tem um pool fixo de threads,
+# compartilhado por todas as sessões do servidor (get_fila() no app com
+# st.cache_resource):
+#   - enviar() devolve na hora um Trabalho; os bytes vão para o cache LRU de
+#     gigflow.pdf, de onde qualquer sessão os pega pela chave do documento;
+#   - pedidos com a mesma chave (mesmos dados) enquanto o primeiro ainda está na
+#     fila ou gerando são agrupados no mesmo Trabalho;
+#   - com MAX_PENDENTES trabalhos na fila/gerando, novos pedidos recebem FilaCheia
+#     em vez de acumular (a sessão mostra um aviso e o booker tenta de novo).
+# gerar() é a versão bloqueante, para quem precisa dos bytes na mesma chamada
+# (a API HTTP, gigflow/api.py): envia e espera o trabalho terminar.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from gigflow import pdf
+
+MAX_TRABALHADORES = int(os.environ.get("ROCKBUZZ_PDF_TRABALHADORES") or 2)
+MAX_PENDENTES = int(os.environ.get("ROCKBUZZ_PDF_FILA") or 16)
+
+NA_FILA, GERANDO, PRONTO, ERRO = "na_fila", "gerando", "pronto", "erro"
+
+
+class FilaCheia(RuntimeError):
+    """Fila de PDFs no limite de trabalhos pendentes"""
+
+
+@dataclass
+class Trabalho:
+    """Geração de um documento; `dados` tem os bytes quando ele fica pronto"""
+    chave: str
+    tipo: str
+    estado: str = NA_FILA
+    enviado_em: float = field(default_factory=time.perf_counter)
+    inicio: float | None = None
+    fim: float | None = None
+    erro: str | None = None
+    dados: bytes | None = None
+    concluido: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def pendente(self) -> bool:
+        return self.estado in (NA_FILA, GERANDO)
+
+    @property
+    def segundos(self) -> float:
+        """Tempo desde o envio (ou até o fim, se concluído)"""
+        return (self.fim or time.perf_counter()) - self.enviado_em
+
+
+def _pronto(chave, tipo, dados) -> Trabalho:
+    trabalho = Trabalho(chave, tipo, PRONTO, fim=time.perf_counter(), dados=dados)
+    trabalho.concluido.set()
+    return trabalho
+
+
+class FilaPDF:
+    """Pool de threads para gerar PDFs, com agrupamento por chave e limite de pendentes"""
+
+    def __init__(self, trabalhadores: int = MAX_TRABALHADORES, max_pendentes: int = MAX_PENDENTES):
+        self.trabalhadores = trabalhadores
+        self.max_pendentes = max_pendentes
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="gigflow-pdf")
+        self._trabalhos = {}   # chave -> Trabalho pendente (ou com erro, até o próximo enviar() da chave)
+        self._lock = threading.Lock()
+        self.agrupados = 0
+        self.recusados = 0
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return sum(t.pendente for t in self._trabalhos.values())
+
+    def posicao(self, trabalho: Trabalho) -> int:
+        """Quantos trabalhos ainda na fila foram enviados antes deste (0 se já está gerando)"""
+        with self._lock:
+            if trabalho.estado != NA_FILA:
+                return 0
+            return sum(t.estado == NA_FILA and t.enviado_em < trabalho.enviado_em for t in self._trabalhos.values())
+
+    def enviar(self, tipo: str, rec, chave: str | None = None) -> Trabalho:
+        """Enfileira a geração do documento `tipo`; devolve o trabalho já pendente para a mesma chave, se houver"""
+        chave = chave or pdf.chave_documento(tipo, rec)
+        with self._lock:
+            trabalho = self._trabalhos.get(chave)
+            if trabalho is not None and trabalho.pendente:
+                self.agrupados += 1
+                return trabalho
+            dados = pdf.em_cache(chave)
+            if dados is not None:
+                return _pronto(chave, tipo, dados)
+            if sum(t.pendente for t in self._trabalhos.values()) >= self.max_pendentes:
+                self.recusados += 1
+                raise FilaCheia(f"{self.max_pendentes} documentos já estão na fila")
+            trabalho = self._trabalhos[chave] = Trabalho(chave, tipo)
+            self._executor.submit(self._gerar, trabalho, rec)
+            return trabalho
+
+    def _gerar(self, trabalho: Trabalho, rec):
+        trabalho.inicio = time.perf_counter()
+        trabalho.estado = GERANDO
+        try:
+            trabalho.dados = pdf.documento(trabalho.tipo, rec, trabalho.chave)
+        except Exception as e:
+            trabalho.erro = f"{type(e).__name__}: {e}"
+        finally:
+            trabalho.fim = time.perf_counter()
+            with self._lock:
+                if trabalho.erro is None:
+                    trabalho.estado = PRONTO
+                    # pronto: os bytes ficam no cache de gigflow.pdf
+                    if self._trabalhos.get(trabalho.chave) is trabalho:
+                        del self._trabalhos[trabalho.chave]
+                else:
+                    trabalho.estado = ERRO
+            trabalho.concluido.set()
+
+    def situacao(self, chave: str) -> Trabalho | None:
+        """Trabalho pendente ou com erro para a chave, trabalho pronto com os bytes do cache, ou None"""
+        with self._lock:
+            trabalho = self._trabalhos.get(chave)
+            if trabalho is not None:
+                return trabalho
+        dados = pdf.em_cache(chave)
+        return None if dados is None else _pronto(chave, "", dados)
+
+    def gerar(self, tipo: str, rec, chave: str | None = None, timeout: float | None = None) -> bytes:
+        """Bytes do documento, esperando a fila; TimeoutError se não ficar pronto a tempo, RuntimeError se falhar"""
+        trabalho = self.enviar(tipo, rec, chave)
+        if not trabalho.concluido.wait(timeout):
+            raise TimeoutError(f"documento não ficou pronto em {timeout:g} s")
+        if trabalho.estado == ERRO:
+            raise RuntimeError(trabalho.erro)
+        return trabalho.dados
+
+    def encerrar(self, esperar: bool = True):
+        self._executor.shutdown(wait=esperar)
@@ -0,0 +1,138 @@
+# Agenda de shows: conflitos de data/horário entre propostas enviadas
+# -------------------------------------------------------------------------------
+# Cada proposta enviada ocupa a banda numa janela que vai do horário de montagem
+# até o fim do show (horário do show + DURACAO_SHOW). Sem horários informados a
+# janela é o dia inteiro do evento; com só um dos dois, a outra ponta é estimada.
+#
+# O índice guarda, por banda, as janelas ordenadas pelo início. Como nenhuma
+# janela passa de JANELA_MAXIMA, as que cruzam um intervalo [início, fim) estão
+# todas entre início - JANELA_MAXIMA e fim na ordem dos inícios: cada consulta é
+# uma busca binária mais os conflitos encontrados, sem varrer o histórico.
+# Gravar ou apagar uma proposta só insere/remove a janela dela.
+import bisect
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from operator import attrgetter
+
+from gigflow.utils import normalizar, parse_data
+
+DURACAO_SHOW = timedelta(hours=3)
+ANTECEDENCIA_MONTAGEM = timedelta(hours=3)   # montagem não informada: horas antes do show
+JANELA_MAXIMA = timedelta(hours=36)
+
+_HORA = re.compile(r"^\s*(\d{1,2})\s*(?:[:h]\s*(\d{2})?)?\s*(?:min)?\s*$", re.IGNORECASE)
+_inicio = attrgetter("inicio")
+
+
+@dataclass(frozen=True, order=True)
+class Reserva:
+    """Janela ocupada por uma proposta enviada"""
+    inicio: datetime
+    fim: datetime
+    rec_id: str
+    numero_proposta: str = ""
+    evento: str = ""
+    cidade: str = ""
+
+
+def parse_hora(texto) -> time | None:
+    """Horário digitado ("18:00", "18h", "18h30", "21") ou None se vazio/inválido"""
+    m = _HORA.match(str(texto or ""))
+    if not m:
+        return None
+    hora, minuto = int(m.group(1)), int(m.group(2) or 0)
+    if hora > 23 or minuto > 59:
+        return None
+    return time(hora, minuto)
+
+def janela(data_evento, hora_montagem=None, hora_show=None) -> tuple[datetime, datetime]:
+    """(início, fim) da ocupação da banda num evento"""
+    dia = datetime.combine(parse_data(data_evento), time())
+    montagem, show = parse_hora(hora_montagem), parse_hora(hora_show)
+    if montagem is None and show is None:
+        return dia, dia + timedelta(days=1)
+    if show is None:
+        inicio = dia + timedelta(hours=montagem.hour, minutes=montagem.minute)
+        return inicio, inicio + ANTECEDENCIA_MONTAGEM + DURACAO_SHOW
+    inicio_show = dia + timedelta(hours=show.hour, minutes=show.minute)
+    if montagem is None:
+        inicio = inicio_show - ANTECEDENCIA_MONTAGEM
+    else:
+        inicio = dia + timedelta(hours=montagem.hour, minutes=montagem.minute)
+        if inicio_show < inicio:   # show depois da meia-noite
+            inicio_show += timedelta(days=1)
+    return inicio, inicio_show + DURACAO_SHOW
+
+def chave_banda(banda) -> str:
+    """Identifica a banda pelo CNPJ (só dígitos) ou, sem ele, pela razão social normalizada"""
+    banda = banda or {}
+    cnpj = re.sub(r"\D", "", str(banda.get("cnpj") or ""))
+    return cnpj or normalizar(banda.get("razao") or "")
+
+def reserva(rec) -> Reserva | None:
+    """Janela de um registro de make_record(), ou None se não está enviado ou não tem data válida"""
+    if not rec.get("enviado"):
+        return None
+    info = rec.get("evento_info") or {}
+    try:
+        inicio, fim = janela(rec.get("data_evento"), info.get("hora_montagem"), info.get("hora_show"))
+    except (TypeError, ValueError):
+        return None
+    return Reserva(inicio, fim, rec["id"], rec.get("numero_proposta") or "", rec.get("evento") or "", rec.get("cidade") or "")
+
+
+class Agenda:
+    """Janelas das propostas enviadas por banda, ordenadas pelo início"""
+
+    def __init__(self, registros=()):
+        self._bandas = {}     # banda -> lista de Reserva ordenada
+        self._reservas = {}   # id -> (banda, Reserva)
+        self._lock = threading.Lock()
+        for rec in registros:
+            self._incluir(rec, ordenar=False)
+        for reservas in self._bandas.values():
+            reservas.sort()
+
+    def __len__(self):
+        return len(self._reservas)
+
+    def _incluir(self, rec, ordenar=True):
+        nova = reserva(rec)
+        if nova is None:
+            return
+        banda = chave_banda(rec.get("banda"))
+        reservas = self._bandas.setdefault(banda, [])
+        if ordenar:
+            bisect.insort(reservas, nova)
+        else:
+            reservas.append(nova)
+        self._reservas[nova.rec_id] = (banda, nova)
+
+    def _excluir(self, rec_id):
+        banda, antiga = self._reservas.pop(rec_id, (None, None))
+        if antiga is not None:
+            reservas = self._bandas[banda]
+            del reservas[bisect.bisect_left(reservas, antiga)]
+
+    def atualizar(self, rec):
+        """Inclui (ou troca) a janela de uma proposta; propostas não enviadas saem da agenda"""
+        with self._lock:
+            self._excluir(rec["id"])
+            self._incluir(rec)
+
+    def remover(self, rec_id):
+        with self._lock:
+            self._excluir(rec_id)
+
+    def conflitos(self, banda, inicio: datetime, fim: datetime, ignorar_numero: str = "") -> list:
+        """Reservas da banda que cruzam [inicio, fim), exceto as da própria proposta"""
+        with self._lock:
+            reservas = self._bandas.get(banda) or []
+            primeiro = bisect.bisect_left(reservas, inicio - JANELA_MAXIMA, key=_inicio)
+            ultimo = bisect.bisect_left(reservas, fim, primeiro, key=_inicio)
+            return [
+                r for r in reservas[primeiro:ultimo]
+                if r.fim > inicio and not (ignorar_numero and r.numero_proposta == ignorar_numero)
+            ]
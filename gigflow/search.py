@@ -0,0 +1,123 @@
+# Busca textual no histórico de propostas (índice invertido em memória)
+# -------------------------------------------------------------------------------
+# Cada proposta é quebrada em termos a partir de evento, cidade, número da
+# proposta, contratante (nome, documento, e-mail), observações e descrições dos
+# itens. Os termos são normalizados (minúsculas, sem acentos nem pontuação) e as
+# palavras muito comuns do português são descartadas. O índice guarda termo ->
+# ids e id -> termos, então gravar ou apagar uma proposta só mexe nos termos
+# dela. O vocabulário fica ordenado para que cada termo da busca case por
+# prefixo com uma busca binária ("camp" acha "Campinas" e "Campo Limpo").
+#
+# Uma busca devolve os ids que têm todos os termos (E); a ordenação e os demais
+# filtros continuam no SQLite (HistoryStore.consultar).
+import bisect
+import functools
+import re
+import threading
+
+from gigflow.utils import normalizar
+
+STOPWORDS = frozenset(
+    "a o e as os um uma de da do das dos em no na nos nas para por com sem ao aos "
+    "que se ou the".split()
+)
+_NAO_DIGITO = re.compile(r"\D")
+
+
+@functools.lru_cache(maxsize=8192)
+def termos(texto) -> tuple:
+    """Termos indexáveis de um texto (normalizados, sem stopwords, sem repetição)"""
+    vistos = dict.fromkeys(t for t in normalizar(texto).split() if t not in STOPWORDS)
+    # documentos/telefones também entram só com os dígitos ("12.345.678/0001-90" -> "12345678000190")
+    digitos = _NAO_DIGITO.sub("", str(texto))
+    if len(digitos) >= 5:
+        vistos.setdefault(digitos)
+    return tuple(vistos)
+
+@functools.lru_cache(maxsize=1024)
+def _termos_itens(descricoes: tuple) -> frozenset:
+    # a maioria das propostas repete as descrições do modelo padrão: uma consulta ao cache por proposta
+    return frozenset(t for descricao in descricoes if descricao for t in termos(descricao))
+
+def termos_registro(rec) -> frozenset:
+    """Termos de um registro de make_record(): evento, cidade, nº, observações, contratante e itens"""
+    contratante = rec.get("contratante") or {}
+    encontrados = set(_termos_itens(tuple(item.get("Descrição") for item in rec.get("itens") or ())))
+    for texto in (
+        rec.get("evento"), rec.get("cidade"), rec.get("numero_proposta"), rec.get("observacoes"),
+        contratante.get("nome"), contratante.get("doc"), contratante.get("email"),
+    ):
+        if texto:
+            encontrados.update(termos(texto))
+    return frozenset(encontrados)
+
+class IndiceTexto:
+    """Índice invertido termo -> ids, com atualização incremental e busca por prefixo"""
+
+    def __init__(self, registros=()):
+        self._ids = {}           # termo -> set de ids
+        self._termos = {}        # id -> frozenset de termos
+        self._vocabulario = []   # termos em ordem (para o prefixo)
+        self._lock = threading.Lock()
+        for rec in registros:
+            self._incluir(rec["id"], termos_registro(rec), ordenar=False)
+        self._vocabulario = sorted(self._ids)
+
+    def __len__(self):
+        return len(self._termos)
+
+    def _incluir(self, rec_id, novos, ordenar=True):
+        self._termos[rec_id] = novos
+        for termo in novos:
+            ids = self._ids.get(termo)
+            if ids is None:
+                ids = self._ids[termo] = set()
+                if ordenar:
+                    bisect.insort(self._vocabulario, termo)
+            ids.add(rec_id)
+
+    def _excluir(self, rec_id):
+        for termo in self._termos.pop(rec_id, ()):
+            ids = self._ids[termo]
+            ids.discard(rec_id)
+            if not ids:
+                del self._ids[termo]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, termo)]
+
+    def atualizar(self, rec):
+        """Indexa (ou reindexa) uma proposta"""
+        novos = termos_registro(rec)
+        with self._lock:
+            if self._termos.get(rec["id"]) != novos:
+                self._excluir(rec["id"])
+                self._incluir(rec["id"], novos)
+
+    def remover(self, rec_id):
+        with self._lock:
+            self._excluir(rec_id)
+
+    def _prefixo(self, termo) -> set:
+        """Ids com algum termo que começa com `termo`"""
+        inicio = bisect.bisect_left(self._vocabulario, termo)
+        fim = bisect.bisect_left(self._vocabulario, termo + "\uffff", inicio)
+        if fim - inicio == 1:
+            return self._ids[self._vocabulario[inicio]]
+        encontrados = set()
+        for vocabulo in self._vocabulario[inicio:fim]:
+            encontrados |= self._ids[vocabulo]
+        return encontrados
+
+    def buscar(self, consulta: str):
+        """Ids que casam com todos os termos da consulta (cada um por prefixo); None se a consulta não tem termos"""
+        consulta_termos = termos(consulta)
+        if not consulta_termos:
+            return None
+        with self._lock:
+            resultado = None
+            # termos mais longos primeiro: costumam casar com menos propostas
+            for termo in sorted(consulta_termos, key=len, reverse=True):
+                ids = self._prefixo(termo)
+                resultado = set(ids) if resultado is None else resultado & ids
+                if not resultado:
+                    return set()
+            return resultado
@@ -0,0 +1,82 @@
+# Simulador de cenários: cachê proposto para uma grade de margens x variações de itens
+# -------------------------------------------------------------------------------
+# Cada cenário aplica um fator ao total de alguns itens (0 = retirar o item,
+# 1,5 = 50% a mais...) e todos os cenários são combinados com todas as margens de
+# uma vez com NumPy, com o mesmo arredondamento em centavos de gigflow.pricing.
+# A grade depende só dos totais dos itens, dos itens variados e dos fatores: fica
+# memorizada por hash da tabela, então mudar a faixa exibida, o valor alvo ou
+# os cenários no gráfico não recalcula nada.
+import functools
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+from gigflow.pricing import _margem
+
+MARGENS_PCT = np.arange(0, 101, dtype=np.float64)   # 0% a 100%, de 1 em 1
+MAX_VARIAVEIS = 6
+MAX_CURVAS = 8                                       # cenários desenhados no gráfico
+FATORES = (0.0, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+
+@dataclass(frozen=True)
+class Grade:
+    """Cachê proposto por cenário (linhas) e margem (colunas), em centavos"""
+    fatores: np.ndarray        # (cenários, itens variados)
+    custo_total: np.ndarray    # (cenários,)
+    margens_pct: np.ndarray    # (margens,)
+    cache_proposto: np.ndarray  # (cenários, margens)
+
+    def margem_para(self, alvo: int) -> np.ndarray:
+        """Menor margem (%) com que cada cenário atinge o cachê `alvo` (centavos); NaN se o custo é zero
+
+        Negativa quando o alvo fica abaixo do custo (o cenário dá prejuízo nesse valor).
+        """
+        custo = self.custo_total.astype(np.float64)
+        falta = alvo - custo
+        # custo + (custo x bp + 5000) // 10000 >= alvo  <=>  bp >= (10000 x falta - 5000) / custo
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bp = np.ceil((10000 * falta - 5000) / custo)
+        return np.where(custo > 0, bp / 100, np.nan)
+
+
+def cenarios(variaveis, fatores) -> np.ndarray:
+    """Todas as combinações de `fatores` para os itens `variaveis`: matriz (cenários, itens variados)"""
+    if not variaveis:
+        return np.ones((1, 0), dtype=np.float64)
+    return np.array(list(itertools.product(fatores, repeat=len(variaveis))), dtype=np.float64)
+
+def rotulo(nomes, variaveis, fatores_cenario) -> str:
+    """Descrição curta do cenário, ex.: "sem 9. PA Guilherme · 6. Alimentação ×1,5" """
+    partes = []
+    for i, fator in zip(variaveis, fatores_cenario):
+        if fator == 0:
+            partes.append(f"sem {nomes[i]}")
+        elif fator != 1:
+            partes.append(f"{nomes[i]} ×" + f"{fator:g}".replace(".", ","))
+    return " · ".join(partes) or "Atual"
+
+def simular(itens, variaveis=(), fatores=(0.0, 1.0), margens_pct=None) -> Grade:
+    """Grade de cachês para os totais `itens` (centavos, 0 nos não incluídos); memorizada por tabela"""
+    itens = np.ascontiguousarray(itens, dtype=np.int64)
+    margens = MARGENS_PCT if margens_pct is None else np.asarray(margens_pct, dtype=np.float64)
+    return _simular(itens.tobytes(), tuple(int(i) for i in variaveis), tuple(float(f) for f in fatores),
+                    margens.tobytes())
+
+@functools.lru_cache(maxsize=32)
+def _simular(itens, variaveis, fatores, margens) -> Grade:
+    itens = np.frombuffer(itens, dtype=np.int64)
+    margens_pct = np.frombuffer(margens, dtype=np.float64)
+    if len(variaveis) > MAX_VARIAVEIS:
+        raise ValueError(f"no máximo {MAX_VARIAVEIS} itens variados por vez")
+    matriz = cenarios(variaveis, fatores)
+    variados = itens[list(variaveis)]
+    # itens fixos somam igual em todos os cenários; os variados são reescalados e arredondados ao centavo
+    fixo = int(itens.sum() - variados.sum())
+    custo = fixo + np.rint(matriz * variados).astype(np.int64).sum(axis=1)
+    custo_col = custo[:, None]
+    cache = custo_col + _margem(custo_col, np.rint(margens_pct * 100).astype(np.int64)[None, :])
+    for array in (matriz, custo, margens_pct, cache):
+        array.setflags(write=False)
+    return Grade(fatores=matriz, custo_total=custo, margens_pct=margens_pct, cache_proposto=cache)
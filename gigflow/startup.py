@@ -0,0 +1,38 @@
+# Medição do tempo de início de sessão
+# -------------------------------------------------------------------------------
+# O script do app marca três fases na primeira execução de cada sessão: imports
+# (módulos do gigflow, pandas, NumPy), inicialização do estado (ensure_state) e
+# primeiro render (do fim do estado até o fim do script). O relatório vai para o
+# stderr do servidor e indica se a sessão foi a primeira do processo (imports a
+# frio, logo após um deploy ou scale-up) e se o ReportLab já estava carregado.
+#
+# Para medir um processo novo do zero: python -m benchmarks.bench_startup
+import sys
+import threading
+
+_lock = threading.Lock()
+_sessoes = 0
+
+
+def registrar(inicio: float, fim_imports: float, fim_estado: float, fim_render: float) -> dict:
+    """Registra os tempos (perf_counter) da primeira execução de uma sessão; retorna o relatório em ms"""
+    global _sessoes
+    with _lock:
+        _sessoes += 1
+        sessao = _sessoes
+    relatorio = {
+        "sessao_no_processo": sessao,
+        "imports_ms": round((fim_imports - inicio) * 1000, 1),
+        "estado_ms": round((fim_estado - fim_imports) * 1000, 1),
+        "primeiro_render_ms": round((fim_render - fim_estado) * 1000, 1),
+        "total_ms": round((fim_render - inicio) * 1000, 1),
+        "reportlab_carregado": "reportlab" in sys.modules,
+    }
+    print(
+        f"[gigflow] início da sessão {sessao}{' (processo novo)' if sessao == 1 else ''}: "
+        f"imports {relatorio['imports_ms']:.0f} ms · estado {relatorio['estado_ms']:.0f} ms · "
+        f"primeiro render {relatorio['primeiro_render_ms']:.0f} ms · total {relatorio['total_ms']:.0f} ms"
+        f"{' · ReportLab já carregado' if relatorio['reportlab_carregado'] else ''}",
+        file=sys.stderr,
+    )
+    return relatorio
@@ -0,0 +1,452 @@
+# Histórico de propostas persistido em SQLite
+# -------------------------------------------------------------------------------
+# Cada proposta é uma linha com as colunas usadas em buscas/ordenação (indexadas)
+# e o registro completo de make_record() em JSON na coluna `dados`. O banco roda
+# em modo WAL para que vários bookers leiam e gravem ao mesmo tempo.
+#
+# Além do banco, o store mantém em memória um índice id -> registro e os rótulos
+# de exibição já prontos, atualizados a cada gravação/remoção, para que seleção,
+# carga e remoção custem O(1) sem varrer o histórico. O índice vale para o
+# processo atual (o app roda com um único processo por servidor).
+#
+# A listagem é paginada: filtros e ordenação rodam no SQLite (consultar) e só as
+# linhas da página visível são formatadas, com cache por id (linhas_tabela).
+# As versões de uma mesma proposta (numero_proposta) formam uma cadeia na ordem
+# em que foram salvas: a coluna `dados` guarda um retrato completo (com os blocos
+# repetidos, como banda e energia, na tabela `blocos`) ou só a diferença para a
+# versão anterior (gigflow/versions.py). O índice em memória tem os registros já
+# reconstruídos, compartilhando os sub-objetos que não mudaram entre versões
+# (obter() devolve uma cópia).
+# Apagar ou substituir uma versão recodifica a seguinte contra a anterior.
+#
+# A busca textual (filtro `texto`) usa um índice invertido em memória
+# (gigflow/search.py), montado na primeira busca e depois atualizado nas mesmas
+# gravações/remoções do índice por id; os ids encontrados viram mais um filtro do SQL.
+#
+# A agenda (gigflow/schedule.py) segue o mesmo padrão: montada na primeira consulta
+# de conflitos, com a janela de data/horário da versão atual (última salva) de
+# cada proposta enviada, e atualizada nas gravações/remoções.
+import copy
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from gigflow import versions
+from gigflow.schedule import Agenda, chave_banda, janela
+from gigflow.search import IndiceTexto
+from gigflow.utils import brl, data_br, json_default
+
+CAMINHO_PADRAO = os.environ.get("ROCKBUZZ_DB") or str(Path(__file__).resolve().parent.parent / "rockbuzz_historico.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS propostas (
+    id              TEXT PRIMARY KEY,
+    numero_proposta TEXT,
+    created_at      TEXT,
+    data_evento     TEXT,
+    cidade          TEXT,
+    evento          TEXT,
+    enviado         INTEGER,
+    custo_total     REAL,
+    margem_pct      REAL,
+    cache_proposto  REAL,
+    validade_ate    TEXT,
+    dados           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_propostas_numero      ON propostas (numero_proposta);
+CREATE INDEX IF NOT EXISTS idx_propostas_created_at  ON propostas (created_at);
+CREATE INDEX IF NOT EXISTS idx_propostas_data_evento ON propostas (data_evento);
+CREATE INDEX IF NOT EXISTS idx_propostas_cidade      ON propostas (cidade);
+CREATE INDEX IF NOT EXISTS idx_propostas_cache       ON propostas (cache_proposto);
+CREATE TABLE IF NOT EXISTS blocos (
+    chave TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+"""
+
+# coluna -> rótulo (ordenações aceitas por consultar)
+ORDENACOES = {
+    "created_at": "Criado em",
+    "data_evento": "Data do evento",
+    "cache_proposto": "Cachê",
+    "cidade": "Cidade",
+    "numero_proposta": "Nº da proposta",
+}
+
+_COLUNAS = (
+    "id", "numero_proposta", "created_at", "data_evento", "cidade", "evento", "enviado",
+    "custo_total", "margem_pct", "cache_proposto", "validade_ate", "dados",
+)
+_INSERT = f"INSERT OR REPLACE INTO propostas ({', '.join(_COLUNAS)}) VALUES ({', '.join('?' * len(_COLUNAS))})"
+
+
+def rotulo_proposta(rec) -> str:
+    """Texto exibido no seletor de propostas"""
+    return f"{rec.get('numero_proposta') or '-'} - {rec.get('evento') or '-'}"
+
+COLUNAS_TABELA = (
+    "Criado em", "No Proposta", "Evento", "Data", "Cidade", "Status",
+    "Custo Total", "Margem", "Cache", "Validade", "id",
+)
+
+
+def linha_tabela(rec) -> dict:
+    """Linha formatada da tabela de histórico"""
+    created_dt = datetime.fromisoformat(rec["created_at"])
+    return {
+        "Criado em": created_dt.strftime("%d/%m/%Y %H:%M"),
+        "No Proposta": rec["numero_proposta"],
+        "Evento": rec["evento"] or "-",
+        "Data": data_br(rec["data_evento"]),
+        "Cidade": rec["cidade"] or "-",
+        "Status": "Enviado" if rec["enviado"] else "Rascunho",
+        "Custo Total": brl(rec["custo_total"]),
+        "Margem": f"{rec['margem_pct']:.0f}%",
+        "Cache": brl(rec["cache_proposto"]),
+        "Validade": data_br(rec["validade_ate"]),
+        "id": rec["id"],
+    }
+
+def _criado_em(rec) -> datetime:
+    return datetime.fromisoformat(rec["created_at"])
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=json_default)
+
+def _linha(rec, codificado):
+    """Tupla de colunas da tabela para um registro de make_record() e sua versão codificada"""
+    return (
+        rec["id"], rec.get("numero_proposta"), rec.get("created_at"), rec.get("data_evento"),
+        rec.get("cidade"), rec.get("evento"), int(bool(rec.get("enviado"))),
+        rec.get("custo_total"), rec.get("margem_pct"), rec.get("cache_proposto"),
+        rec.get("validade_ate"),
+        _dumps(codificado),
+    )
+
+
+class HistoricoCorrompido(ValueError):
+    """Versão em delta cuja base (ou bloco internado) não está no banco"""
+
+
+class HistoryStore:
+    """Histórico de propostas em SQLite (WAL), com uma conexão por thread e índice por id"""
+
+    def __init__(self, caminho: str = CAMINHO_PADRAO):
+        self.caminho = str(caminho)
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._indice = None
+        self._rotulos = {}
+        self._linhas = {}
+        self._busca = None
+        self._agenda = None
+        self._blocos = None
+        self._cadeias = {}       # numero_proposta -> ids na ordem em que foram salvos
+        self._bases = {}         # id -> id da versão base (None: retrato completo)
+        self._profundidade = {}  # id -> deltas desde o último retrato
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _index(self):
+        """Índice id -> registro, carregado do banco na primeira consulta"""
+        if self._indice is None:
+            with self._lock:
+                if self._indice is None:
+                    self._carregar()
+        return self._indice
+
+    def _carregar(self):
+        conn = self._conn()
+        blocos = versions.Blocos({chave: json.loads(dados) for chave, dados in conn.execute("SELECT chave, dados FROM blocos")})
+        linhas = conn.execute("SELECT id, numero_proposta, dados FROM propostas ORDER BY rowid").fetchall()
+        codificados = {rec_id: json.loads(dados) for rec_id, _, dados in linhas}
+        indice, bases, profundidade, cadeias = {}, {}, {}, {}
+        for rec_id, numero, _ in linhas:
+            # reconstrói primeiro as bases ainda não decodificadas (sem recursão: cadeias longas)
+            pendentes = []
+            atual = rec_id
+            while atual not in indice:
+                if atual not in codificados:
+                    raise HistoricoCorrompido(
+                        f"{self.caminho}: versão base {atual} de {pendentes[-1]} não está no banco")
+                pendentes.append(atual)
+                atual = versions.base_de(codificados[atual])
+                if atual is None:
+                    break
+            for pendente in reversed(pendentes):
+                base = bases[pendente] = versions.base_de(codificados[pendente])
+                try:
+                    indice[pendente] = versions.decodificar(codificados.pop(pendente), indice.get(base), blocos)
+                except KeyError as e:
+                    raise HistoricoCorrompido(
+                        f"{self.caminho}: bloco {e.args[0]} de {pendente} não está no banco") from None
+                profundidade[pendente] = profundidade[base] + 1 if base else 0
+            if numero:
+                cadeias.setdefault(numero, []).append(rec_id)
+        self._blocos, self._bases, self._profundidade, self._cadeias = blocos, bases, profundidade, cadeias
+        self._rotulos = {rec_id: rotulo_proposta(rec) for rec_id, rec in indice.items()}
+        self._indice = indice
+
+    def _invalidar(self):
+        """Descarta o estado em memória (recarregado do banco na próxima consulta)"""
+        self._indice = None
+        self._busca = None
+        self._agenda = None
+        self._linhas.clear()
+
+    def _codificar(self, conn, rec_id, anterior):
+        """Grava a codificação de `rec_id` como retrato ou delta para `anterior`; retorna o registro em memória"""
+        rec = self._indice[rec_id]
+        if anterior is not None and self._profundidade[anterior] + 1 < versions.MAX_CADEIA:
+            codificado, memoria = versions.delta(rec, anterior, self._indice[anterior])
+            self._profundidade[rec_id] = self._profundidade[anterior] + 1
+        else:
+            codificado, memoria, novos = versions.retrato(rec, self._blocos)
+            conn.executemany("INSERT OR IGNORE INTO blocos (chave, dados) VALUES (?, ?)",
+                             [(chave, _dumps(bloco)) for chave, bloco in novos])
+            anterior = None
+            self._profundidade[rec_id] = 0
+        self._bases[rec_id] = anterior
+        return codificado, memoria
+
+    def _desencadear(self, conn, rec_id):
+        """Tira uma versão da cadeia, recodificando a seguinte contra a anterior"""
+        numero = self._indice[rec_id].get("numero_proposta")
+        cadeia = self._cadeias.get(numero) or []
+        if rec_id in cadeia:
+            posicao = cadeia.index(rec_id)
+            if posicao + 1 < len(cadeia) and self._bases.get(cadeia[posicao + 1]) == rec_id:
+                seguinte = cadeia[posicao + 1]
+                codificado, _ = self._codificar(conn, seguinte, cadeia[posicao - 1] if posicao else None)
+                conn.execute("UPDATE propostas SET dados = ? WHERE id = ?", (_dumps(codificado), seguinte))
+            del cadeia[posicao]
+            if not cadeia:
+                del self._cadeias[numero]
+        self._bases.pop(rec_id, None)
+        self._profundidade.pop(rec_id, None)
+
+    def _gravar(self, registros):
+        """Grava registros como novas últimas versões das suas cadeias, numa transação"""
+        try:
+            with self._conn() as conn:
+                for rec in registros:
+                    # a versão indexada é a serializada, igual à que seria lida do banco
+                    rec = json.loads(_dumps(rec))
+                    rec_id = rec["id"]
+                    if rec_id in self._indice:
+                        self._desencadear(conn, rec_id)
+                    numero = rec.get("numero_proposta")
+                    cadeia = self._cadeias.setdefault(numero, []) if numero else []
+                    self._indice[rec_id] = rec
+                    codificado, memoria = self._codificar(conn, rec_id, cadeia[-1] if cadeia else None)
+                    conn.execute(_INSERT, _linha(rec, codificado))
+                    if self._agenda is not None and cadeia:
+                        self._agenda.remover(cadeia[-1])
+                    if numero:
+                        cadeia.append(rec_id)
+                    self._indice[rec_id] = memoria
+                    self._rotulos[rec_id] = rotulo_proposta(memoria)
+                    if self._busca is not None:
+                        self._busca.atualizar(memoria)
+                    if self._agenda is not None:
+                        self._agenda.atualizar(memoria)
+                    self._linhas.pop(rec_id, None)
+        except BaseException:
+            self._invalidar()
+            raise
+
+    def salvar(self, rec):
+        """Grava (ou substitui) uma proposta"""
+        with self._lock:
+            self._index()
+            self._gravar([rec])
+
+    def obter(self, rec_id):
+        """Cópia do registro completo pelo id, ou None
+
+        As versões em memória compartilham blocos e sub-objetos iguais (e servem
+        de base para os deltas): quem chama pode alterar a cópia à vontade.
+        """
+        rec = self._index().get(rec_id)
+        return copy.deepcopy(rec) if rec is not None else None
+
+    def rotulo(self, rec_id) -> str:
+        """Rótulo pré-calculado de uma proposta (para o format_func do seletor)"""
+        self._index()
+        return self._rotulos.get(rec_id, "-")
+
+    def apagar(self, rec_id) -> bool:
+        """Remove uma proposta; retorna False se o id não existia"""
+        with self._lock:
+            indice = self._index()
+            numero = indice[rec_id].get("numero_proposta") if rec_id in indice else None
+            try:
+                with self._conn() as conn:
+                    removido = conn.execute("DELETE FROM propostas WHERE id = ?", (rec_id,)).rowcount > 0
+                    if rec_id in indice:
+                        self._desencadear(conn, rec_id)
+            except BaseException:
+                self._invalidar()
+                raise
+            indice.pop(rec_id, None)
+            self._rotulos.pop(rec_id, None)
+            if self._busca is not None:
+                self._busca.remover(rec_id)
+            if self._agenda is not None:
+                self._agenda.remover(rec_id)
+                # apagada a versão atual, a anterior volta a ocupar a agenda
+                cadeia = self._cadeias.get(numero)
+                if cadeia:
+                    self._agenda.atualizar(indice[cadeia[-1]])
+            self._linhas.pop(rec_id, None)
+        return removido
+
+    def versoes(self, rec_id):
+        """Ids das versões da mesma proposta (numero_proposta), da mais antiga para a mais recente"""
+        rec = self._index().get(rec_id)
+        if rec is None:
+            return []
+        ids = self._cadeias.get(rec.get("numero_proposta")) or [rec_id]
+        # sorted é estável: versões do mesmo segundo ficam na ordem em que foram salvas
+        return sorted(ids, key=lambda i: self._indice[i].get("created_at") or "")
+
+    def ids(self):
+        """Ids das propostas, das mais recentes para as mais antigas (índice de created_at)"""
+        cur = self._conn().execute("SELECT id FROM propostas ORDER BY created_at DESC")
+        return [rec_id for (rec_id,) in cur]
+
+    def buscar(self, texto: str):
+        """Ids das propostas que contêm todos os termos de `texto` (por prefixo, sem acentos); None se não há termos"""
+        if self._busca is None:
+            indice = self._index()
+            with self._lock:
+                if self._busca is None:
+                    self._busca = IndiceTexto(indice.values())
+        return self._busca.buscar(texto)
+
+    def _atuais(self):
+        """Versão atual (última salva) de cada proposta"""
+        indice = self._index()
+        anteriores = {rec_id for cadeia in self._cadeias.values() for rec_id in cadeia[:-1]}
+        return [rec for rec_id, rec in indice.items() if rec_id not in anteriores]
+
+    def conflitos(self, banda, data_evento, hora_montagem=None, hora_show=None, ignorar_numero: str = ""):
+        """Propostas enviadas da mesma banda cuja janela de data/horário cruza a informada (gigflow/schedule.py)"""
+        if self._agenda is None:
+            atuais = self._atuais()
+            with self._lock:
+                if self._agenda is None:
+                    self._agenda = Agenda(atuais)
+        inicio, fim = janela(data_evento, hora_montagem, hora_show)
+        return self._agenda.conflitos(chave_banda(banda), inicio, fim, ignorar_numero)
+
+    def _where(self, texto=None, enviado=None, cidades=None, data_de=None, data_ate=None, valor_min=None, valor_max=None):
+        """Cláusula WHERE (e parâmetros) dos filtros da listagem"""
+        where, params = [], []
+        encontrados = self.buscar(texto) if texto else None
+        # uma busca que casa com o histórico inteiro não restringe nada
+        if encontrados is not None and len(encontrados) < len(self._indice):
+            where.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(encontrados)))
+        if enviado is not None:
+            where.append("enviado = ?")
+            params.append(int(enviado))
+        if cidades:
+            where.append(f"cidade IN ({', '.join('?' * len(cidades))})")
+            params.extend(cidades)
+        if data_de is not None:
+            where.append("data_evento >= ?")
+            params.append(str(data_de))
+        if data_ate is not None:
+            where.append("data_evento <= ?")
+            params.append(str(data_ate))
+        if valor_min is not None:
+            where.append("cache_proposto >= ?")
+            params.append(valor_min)
+        if valor_max is not None:
+            where.append("cache_proposto <= ?")
+            params.append(valor_max)
+        return (f" WHERE {' AND '.join(where)}" if where else ""), params
+
+    def contar(self, **filtros) -> int:
+        """Quantidade de propostas que passam pelos filtros"""
+        sql_where, params = self._where(**filtros)
+        return self._conn().execute(f"SELECT COUNT(*) FROM propostas{sql_where}", params).fetchone()[0]
+
+    def consultar(self, *, ordem="created_at", desc=True, limite=50, offset=0, **filtros):
+        """Ids de uma página da listagem, com filtros e ordenação aplicados no SQLite"""
+        if ordem not in ORDENACOES:
+            raise ValueError(f"Ordenação desconhecida: {ordem}")
+        sql_where, params = self._where(**filtros)
+        cur = self._conn().execute(
+            f"SELECT id FROM propostas{sql_where} ORDER BY {ordem} {'DESC' if desc else 'ASC'}, id LIMIT ? OFFSET ?",
+            params + [limite, offset],
+        )
+        return [rec_id for (rec_id,) in cur]
+
+    def linhas_tabela(self, ids):
+        """Linhas formatadas para os ids informados (formatação em cache por id)"""
+        linhas = []
+        for rec_id in ids:
+            linha = self._linhas.get(rec_id)
+            if linha is None:
+                rec = self._index().get(rec_id)
+                if rec is None:
+                    continue
+                linha = self._linhas[rec_id] = linha_tabela(rec)
+            linhas.append(linha)
+        return linhas
+
+    def cidades(self):
+        """Cidades distintas do histórico (para o filtro)"""
+        cur = self._conn().execute("SELECT DISTINCT cidade FROM propostas WHERE cidade <> '' ORDER BY cidade")
+        return [cidade for (cidade,) in cur]
+
+    def listar(self):
+        """Todas as propostas, das mais recentes para as mais antigas (objetos do índice: somente leitura)"""
+        indice = self._index()
+        return [indice[rec_id] for rec_id in self.ids() if rec_id in indice]
+
+    def mesclar(self, registros, politica: str = "mais_recente"):
+        """Mescla registros por id numa única transação; retorna (inseridos, atualizados, ignorados)
+
+        Políticas para ids já existentes: "pular" mantém o atual, "sobrescrever"
+        troca pelo importado e "mais_recente" fica com o de created_at maior.
+        """
+        indice = self._index()
+        inseridos = atualizados = ignorados = 0
+        with self._lock:
+            novos = {}
+            for rec in registros:
+                atual = novos.get(rec["id"]) or indice.get(rec["id"])
+                if atual is not None:
+                    if politica == "pular" or (
+                        politica == "mais_recente" and _criado_em(rec) <= _criado_em(atual)
+                    ):
+                        ignorados += 1
+                        continue
+                    if rec["id"] in novos:
+                        # id repetido no lote: já contado (inserido ou atualizado); a cópia anterior é descartada
+                        ignorados += 1
+                    else:
+                        atualizados += 1
+                else:
+                    inseridos += 1
+                novos[rec["id"]] = rec
+            self._gravar(novos.values())
+        return inseridos, atualizados, ignorados
+
+    def __len__(self):
+        return len(self._index())
@@ -0,0 +1,130 @@
+# Instrumentação das fases de cada rerun
+# -------------------------------------------------------------------------------
+# O app marca as fases de cada execução (estado, data_editor, cálculo, cada PDF,
+# consulta/serialização/render do histórico, fragmentos) num Rastro por sessão,
+# que guarda os spans das execuções recentes. Com a instrumentação desligada a
+# sessão usa DESLIGADO: fase() devolve sempre o mesmo contexto vazio e medir()
+# devolve a própria função, então o custo é de uma chamada de método.
+#
+# Liga com a variável de ambiente ROCKBUZZ_PERFIL=1 (todas as sessões) ou com
+# ?perfil=1 na URL (só a sessão atual). Os spans saem no formato Trace Event do
+# Chrome, que abre no chrome://tracing, no Perfetto ou no speedscope.
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_SPANS = 5000
+_NULO = contextlib.nullcontext()
+
+
+def ativo(query_params=None) -> bool:
+    """Se a instrumentação deve ser ligada (variável de ambiente ou ?perfil=1)"""
+    if os.environ.get("ROCKBUZZ_PERFIL", "").lower() in ("1", "true", "sim"):
+        return True
+    return bool(query_params) and query_params.get("perfil") == "1"
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class _Desligado:
+    """Rastro nulo: nada é medido nem guardado"""
+    ativo = False
+
+    def fase(self, nome):
+        return _NULO
+
+    def medir(self, nome):
+        return lambda funcao: funcao
+
+    def abrir(self, nome):
+        pass
+
+    def fechar(self):
+        pass
+
+
+DESLIGADO = _Desligado()
+
+
+class Rastro:
+    """Spans das execuções recentes de uma sessão: (nome, início µs, duração µs, profundidade, thread)"""
+    ativo = True
+
+    def __init__(self, maximo: int = MAX_SPANS):
+        self.spans = deque(maxlen=maximo)
+        self._pilha = []
+
+    def abrir(self, nome):
+        """Abre um span que envolve o resto da execução (fechado por fechar())"""
+        if nome == "rerun":
+            # um rerun interrompido (st.rerun, exceção) deixa spans abertos: descarta
+            self._pilha.clear()
+        self._pilha.append((nome, time.perf_counter_ns()))
+
+    def fechar(self):
+        if self._pilha:
+            nome, inicio = self._pilha.pop()
+            self._registrar(nome, inicio)
+
+    def _registrar(self, nome, inicio):
+        fim = time.perf_counter_ns()
+        self.spans.append((nome, inicio // 1000, (fim - inicio) // 1000, len(self._pilha), threading.get_ident()))
+
+    @contextlib.contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter_ns()
+        self._pilha.append((nome, inicio))
+        try:
+            yield
+        finally:
+            self._pilha.pop()
+            self._registrar(nome, inicio)
+
+    def medir(self, nome):
+        """Decorador: a chamada inteira vira uma fase"""
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.fase(nome):
+                    return funcao(*args, **kwargs)
+            return medida
+        return decorador
+
+    def execucoes(self, n: int = 20):
+        """Últimas `n` execuções (spans de nível 0: rerun completo ou só de um fragmento), mais recentes primeiro"""
+        topo = [s for s in self.spans if s[3] == 0]
+        return [{"execucao": nome, "duracao_ms": dur / 1000} for nome, _, dur, _, _ in reversed(topo[-n:])]
+
+    def percentis(self):
+        """Estatísticas por fase (ms) sobre os spans guardados"""
+        por_fase = {}
+        for nome, _, dur, _, _ in self.spans:
+            por_fase.setdefault(nome, []).append(dur / 1000)
+        linhas = []
+        for nome, duracoes in por_fase.items():
+            duracoes.sort()
+            linhas.append({
+                "fase": nome,
+                "n": len(duracoes),
+                "p50_ms": _percentil(duracoes, 50),
+                "p95_ms": _percentil(duracoes, 95),
+                "p99_ms": _percentil(duracoes, 99),
+                "max_ms": duracoes[-1],
+            })
+        return sorted(linhas, key=lambda linha: -linha["p95_ms"])
+
+    def chrome_trace(self) -> bytes:
+        """Spans no formato Trace Event do Chrome (JSON)"""
+        pid = os.getpid()
+        eventos = [
+            {"name": nome, "cat": "gigflow", "ph": "X", "ts": inicio, "dur": dur, "pid": pid, "tid": tid}
+            for nome, inicio, dur, _, tid in self.spans
+        ]
+        for tid in {evento["tid"] for evento in eventos}:
+            eventos.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"script runner {tid}"}})
+        return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"}).encode("utf-8")
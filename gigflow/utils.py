@@ -0,0 +1,41 @@
+# Helpers compartilhados entre o app, os PDFs e as rotinas de apoio
+import re
+import unicodedata
+from datetime import date, datetime
+
+
+def brl(x: float) -> str:
+    """Formata valor em Real Brasileiro"""
+    try:
+        return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except Exception:
+        return "R$ 0,00"
+
+def parse_data(valor) -> date:
+    """Converte data ISO (str), datetime ou date em date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.fromisoformat(str(valor)).date()
+
+def data_br(valor) -> str:
+    """Formata data no padrão dd/mm/aaaa"""
+    return parse_data(valor).strftime("%d/%m/%Y")
+
+def json_default(o):
+    """Serializa tipos que o json não conhece (numpy, datas) ao gravar registros"""
+    if hasattr(o, "item"):
+        return o.item()
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    return str(o)
+
+_NAO_PALAVRA = re.compile(r"[\W_]+")
+
+def normalizar(texto) -> str:
+    """Texto em minúsculas, sem acentos nem pontuação e com espaços simples (para buscas)"""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_NAO_PALAVRA.sub(" ", texto.lower()).split())
@@ -0,0 +1,237 @@
+# Versões de propostas codificadas como diferenças (deltas)
+# -------------------------------------------------------------------------------
+# Cada "Salvar no Histórico" gera um registro completo de make_record(), mas entre
+# uma versão e a seguinte da mesma proposta (mesmo numero_proposta) quase nada
+# muda: a margem, uma quantidade, as observações. O histórico guarda então uma
+# cadeia por proposta:
+#   - a primeira versão (e uma a cada MAX_CADEIA) é um retrato completo, com os
+#     blocos que se repetem entre propostas (banda, energia, responsabilidades,
+#     itens...) trocados por referências a blocos internados (um por conteúdo);
+#   - as demais guardam só a diferença campo a campo para a versão anterior.
+#
+# Formato gravado (JSON):
+#   retrato: {"$v": 1, "s": {..., "banda": {"$bloco": chave}, ...}}
+#   delta:   {"$v": 1, "b": id_da_base, "d": {campo: operação}}
+# Operações: ["=", valor] troca, ["-"] remove, {"d": {...}} entra num objeto e
+# {"l": tamanho, "d": {"i": operação}} entra numa lista. Registros antigos (JSON
+# puro, sem "$v") continuam legíveis.
+#
+# aplicar() reaproveita os sub-objetos que não mudaram, então as versões
+# reconstruídas em memória compartilham os blocos iguais em vez de copiá-los.
+import hashlib
+import json
+
+from gigflow.utils import json_default
+
+VERSAO_FORMATO = 1
+MAX_CADEIA = 32            # deltas seguidos antes de um novo retrato completo
+BLOCOS = ("contratante", "banda", "evento_info", "responsabilidades", "equipe", "energia", "itens")
+
+
+def _canonico(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=json_default)
+
+def chave_bloco(obj) -> str:
+    """Chave de um bloco pelo conteúdo"""
+    return hashlib.sha1(_canonico(obj).encode("utf-8")).hexdigest()[:20]
+
+
+# =========================
+# Diferenças
+# =========================
+def _iguais(a, b) -> bool:
+    """Igualdade que também exige o mesmo tipo em cada nível (1 e 1.0 diferem dentro de objetos e listas)"""
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, dict):
+        return all(_iguais(valor, b[chave]) for chave, valor in a.items())
+    if isinstance(a, list):
+        return all(map(_iguais, a, b))
+    return True
+
+def diferenca(anterior, atual):
+    """Operação que transforma `anterior` em `atual` (None se forem iguais)"""
+    if _iguais(anterior, atual):
+        return None
+    if isinstance(anterior, dict) and isinstance(atual, dict):
+        ops = {chave: ["-"] for chave in anterior if chave not in atual}
+        for chave, valor in atual.items():
+            if chave not in anterior:
+                ops[chave] = ["=", valor]
+            elif (op := diferenca(anterior[chave], valor)) is not None:
+                ops[chave] = op
+        return {"d": ops}
+    if isinstance(anterior, list) and isinstance(atual, list):
+        ops = {}
+        for i, valor in enumerate(atual):
+            if i >= len(anterior):
+                ops[str(i)] = ["=", valor]
+            elif (op := diferenca(anterior[i], valor)) is not None:
+                ops[str(i)] = op
+        return {"l": len(atual), "d": ops}
+    return ["=", atual]
+
+def aplicar(base, op):
+    """Aplica uma operação de diferenca(); o que não mudou é compartilhado com `base`"""
+    if op is None:
+        return base
+    if isinstance(op, list):
+        return op[1]
+    if "l" in op:
+        novo = base[:op["l"]]
+        novo.extend([None] * (op["l"] - len(novo)))
+        for i, sub in op["d"].items():
+            i = int(i)
+            novo[i] = aplicar(novo[i], sub)
+        return novo
+    novo = dict(base)
+    for chave, sub in op["d"].items():
+        if sub == ["-"]:
+            novo.pop(chave, None)
+        else:
+            novo[chave] = aplicar(novo.get(chave), sub)
+    return novo
+
+def comparar(anterior, atual, caminho: str = ""):
+    """Lista (campo, antes, depois) das folhas que mudaram, ex.: ("itens[2].Quantidade", 1, 3)"""
+    if _iguais(anterior, atual):
+        return []
+    if isinstance(anterior, dict) and isinstance(atual, dict):
+        mudancas = []
+        for chave in [*anterior, *(c for c in atual if c not in anterior)]:
+            sub = f"{caminho}.{chave}" if caminho else str(chave)
+            mudancas.extend(comparar(anterior.get(chave), atual.get(chave), sub))
+        return mudancas
+    if isinstance(anterior, list) and isinstance(atual, list):
+        mudancas = []
+        for i in range(max(len(anterior), len(atual))):
+            mudancas.extend(comparar(
+                anterior[i] if i < len(anterior) else None, atual[i] if i < len(atual) else None, f"{caminho}[{i}]",
+            ))
+        return mudancas
+    return [(caminho, anterior, atual)]
+
+
+# =========================
+# Codificação
+# =========================
+class Blocos:
+    """Blocos internados (chave -> objeto): conteúdos iguais viram o mesmo objeto"""
+
+    def __init__(self, existentes=None):
+        self._blocos = dict(existentes or {})
+
+    def __contains__(self, chave):
+        return chave in self._blocos
+
+    def __getitem__(self, chave):
+        return self._blocos[chave]
+
+    def __len__(self):
+        return len(self._blocos)
+
+    def registrar(self, chave, obj):
+        self._blocos.setdefault(chave, obj)
+
+    def internar(self, obj):
+        """(chave, objeto compartilhado, novo?) para o conteúdo de `obj`"""
+        chave = chave_bloco(obj)
+        existente = self._blocos.get(chave)
+        if existente is not None:
+            return chave, existente, False
+        self._blocos[chave] = obj
+        return chave, obj, True
+
+
+def retrato(rec, blocos: Blocos):
+    """Codifica `rec` completo, com os blocos internados; retorna (codificado, registro em memória, blocos novos)"""
+    guardado, memoria, novos = dict(rec), dict(rec), []
+    for campo in BLOCOS:
+        if isinstance(rec.get(campo), (dict, list)):
+            chave, compartilhado, novo = blocos.internar(rec[campo])
+            guardado[campo] = {"$bloco": chave}
+            memoria[campo] = compartilhado
+            if novo:
+                novos.append((chave, compartilhado))
+    return {"$v": VERSAO_FORMATO, "s": guardado}, memoria, novos
+
+def delta(rec, base_id, base):
+    """Codifica `rec` como diferença para a versão `base`; retorna (codificado, registro em memória)"""
+    op = diferenca(base, rec) or {"d": {}}
+    return {"$v": VERSAO_FORMATO, "b": base_id, "d": op["d"]}, aplicar(base, op)
+
+def base_de(codificado):
+    """Id da versão base de um registro codificado (None para retratos e registros antigos)"""
+    return codificado.get("b") if codificado.get("$v") else None
+
+def decodificar(codificado, base, blocos: Blocos):
+    """Registro completo a partir do codificado e, para deltas, da versão base já decodificada"""
+    if not codificado.get("$v"):
+        return codificado
+    if "b" in codificado:
+        return aplicar(base, {"d": codificado["d"]})
+    rec = dict(codificado["s"])
+    for campo in BLOCOS:
+        ref = rec.get(campo)
+        if isinstance(ref, dict) and "$bloco" in ref:
+            rec[campo] = blocos[ref["$bloco"]]
+    return rec
+
+
+# =========================
+# Arquivos de exportação
+# =========================
+# Na exportação compacta cada bloco sai uma vez numa linha {"$bloco": chave,
+# "dados": ...} antes do primeiro registro que o usa, e cada versão sai como
+# delta para a versão da mesma proposta exportada logo antes dela.
+class Codificador:
+    """Codifica registros completos, em sequência, para a exportação compacta"""
+
+    def __init__(self):
+        self.blocos = Blocos()
+        self._ultimos = {}   # numero_proposta -> (id, registro)
+
+    def linhas(self, rec):
+        """Objetos a escrever para `rec`: blocos novos e depois o registro codificado"""
+        numero = rec.get("numero_proposta")
+        anterior = self._ultimos.get(numero) if numero else None
+        if anterior is not None:
+            codificado, memoria = delta(rec, *anterior)
+            novos = []
+        else:
+            codificado, memoria, novos = retrato(rec, self.blocos)
+        if numero:
+            self._ultimos[numero] = (rec.get("id"), memoria)
+        return [{"$bloco": chave, "dados": bloco} for chave, bloco in novos] + [codificado]
+
+
+class Decodificador:
+    """Lê, em sequência, as linhas de uma exportação compacta (ou registros completos)"""
+
+    def __init__(self):
+        self.blocos = Blocos()
+        self._registros = {}  # id -> registro, só a última versão de cada proposta
+        self._por_numero = {}
+
+    def ler(self, obj):
+        """Registro completo; None para linhas de bloco"""
+        if not isinstance(obj, dict):
+            return obj
+        if "$bloco" in obj and "dados" in obj:
+            self.blocos.registrar(obj["$bloco"], obj["dados"])
+            return None
+        base = None
+        if obj.get("$v") and "b" in obj:
+            base = self._registros.get(obj["b"])
+            if base is None:
+                raise ValueError(f"versão base {obj['b']} não encontrada no arquivo")
+        try:
+            rec = decodificar(obj, base, self.blocos)
+        except KeyError as e:
+            raise ValueError(f"bloco {e.args[0]} não encontrado no arquivo") from None
+        numero = rec.get("numero_proposta") if isinstance(rec, dict) else None
+        if numero and "id" in rec:
+            self._registros.pop(self._por_numero.get(numero), None)
+            self._registros[rec["id"]] = rec
+            self._por_numero[numero] = rec["id"]
+        return rec